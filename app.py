@@ -13,11 +13,24 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import os
+import hashlib
+import inspect
+import uuid
 from utils.data_processor import DataProcessor
+from utils.aggregate_cube import FACETS
+from utils.bootstrap import COMPARISONS
+from utils.data_cache import DataCache
+from utils.dataset_store import DatasetStore
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands
+from utils.result_cache import ResultCache
+from utils.shared_store import SharedArrowStore
 from utils.chart_generator import ChartGenerator  
 from utils.report_generator import ReportGenerator
 from utils.auth_handler import AuthHandler
 
+# حالة فتح المجموعة القابلة للطي (expanded + on_change) متاحة في إصدارات Streamlit الأحدث فقط
+EXPANDER_STATE_AVAILABLE = 'on_change' in inspect.signature(st.expander).parameters
+
 # إعداد الصفحة مع دعم RTL
 st.set_page_config(
     page_title="منصة تحليل درجات الطلاب",
@@ -52,6 +65,322 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_data_cache() -> DataCache:
+    """ذاكرة تخزين مؤقت مشتركة للبيانات المنظفة تبقى عبر إعادة تشغيل الصفحة"""
+    # طبقة القرص اختيارية وتُفعّل بتحديد المجلد في متغير البيئة
+    return DataCache(disk_dir=os.environ.get('GRADES_CACHE_DIR'))
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """ذاكرة نتائج التحليل المشتقة المشتركة (حجمها بالميغابايت من GRADES_RESULTS_MB)"""
+    return ResultCache(max_bytes=int(os.environ.get('GRADES_RESULTS_MB', '256')) * 1024 * 1024)
+
+@st.cache_resource
+def get_figure_cache() -> ResultCache:
+    """ذاكرة المخططات المبنية بصيغة JSON المشتركة (حجمها بالميغابايت من GRADES_FIGURES_MB)"""
+    return ResultCache(max_bytes=int(os.environ.get('GRADES_FIGURES_MB', '64')) * 1024 * 1024)
+
+@st.cache_resource
+def get_shared_store():
+    """مخزن Arrow مربوط بالذاكرة يتشارك فيه جميع المستخدمين نسخة واحدة من كل مجموعة بيانات"""
+    store_dir = os.environ.get('GRADES_SHARED_DIR')
+    return SharedArrowStore(store_dir) if store_dir else None
+
+@st.cache_resource
+def get_grade_bands() -> GradeBands:
+    """جدول نطاقات التقدير الخاص بالمدرسة من متغير البيئة GRADES_BANDS (JSON: {التسمية: الحد الأدنى})"""
+    config = os.environ.get('GRADES_BANDS')
+    if not config:
+        return DEFAULT_GRADE_BANDS
+    try:
+        return GradeBands.from_config(config)
+    except (ValueError, TypeError, AttributeError):
+        st.warning("إعداد GRADES_BANDS غير صالح، تم استخدام النطاقات الافتراضية")
+        return DEFAULT_GRADE_BANDS
+
+@st.cache_resource
+def get_dataset_store(owner: str) -> DatasetStore:
+    """مجموعة البيانات المحفوظة للتحليل التراكمي عبر الفصول الدراسية في مجلد خاص بكل مالك"""
+    # اسم المجلد بصمة المعرف حتى لا يؤثر محتواه على المسار
+    owner_dir = hashlib.sha256(owner.encode('utf-8')).hexdigest()[:16]
+    store_dir = os.path.join(os.environ.get('GRADES_STORE_DIR', '.grades_store'), owner_dir)
+    return DatasetStore(store_dir, grade_bands=get_grade_bands())
+
+def get_store_owner(auth_handler: AuthHandler) -> str:
+    """معرف مالك البيانات المحفوظة: المستخدم المصادق، أو الجلسة عند المستخدم الافتراضي المشترك"""
+    user_id = auth_handler.get_user_info().get('id')
+    if user_id and user_id not in ('system_user', 'unknown'):
+        return str(user_id)
+    if 'store_session_id' not in st.session_state:
+        st.session_state['store_session_id'] = uuid.uuid4().hex
+    return st.session_state['store_session_id']
+
+def get_group_statistics(data_processor: DataProcessor, df: pd.DataFrame, source_key):
+    """إحصائيات المجموعات محسوبة مرة واحدة لكل مجموعة بيانات ومحفوظة في الجلسة للتصفح"""
+    cached = st.session_state.get('group_statistics')
+    if cached is not None and cached[0] == source_key:
+        return cached[1]
+    
+    group_stats = data_processor.get_group_statistics(df)
+    st.session_state['group_statistics'] = (source_key, group_stats)
+    return group_stats
+
+def show_group_analytics(group_stats):
+    """عرض التحليل حسب المجموعات مع التنقل في التسلسل الهرمي (الصف ← الفصل ← المادة)"""
+    tab_names = []
+    if group_stats.hierarchy:
+        tab_names.append(" ← ".join(group_stats.hierarchy))
+    tab_names += [f"حسب {dimension}" for dimension in group_stats.dimensions]
+    if not tab_names:
+        return
+    
+    tabs = st.tabs(tab_names)
+    offset = 0
+    
+    if group_stats.hierarchy:
+        offset = 1
+        with tabs[0]:
+            path = []
+            for depth, column in enumerate(group_stats.hierarchy):
+                children = group_stats.drilldown(path)
+                st.markdown(f"**{' / '.join(map(str, path)) or 'جميع الطلاب'} - حسب {column}**")
+                st.dataframe(children, use_container_width=True, hide_index=True)
+                
+                if depth == len(group_stats.hierarchy) - 1:
+                    break
+                choice = st.selectbox(f"اختر {column} للتفاصيل", ['-'] + children[column].tolist(),
+                                      key=f"drilldown_{column}")
+                if choice == '-':
+                    break
+                path.append(choice)
+    
+    for tab, dimension in zip(tabs[offset:], group_stats.dimensions):
+        with tab:
+            st.dataframe(group_stats.level([dimension]), use_container_width=True, hide_index=True)
+
+def show_bootstrap_intervals(data_processor: DataProcessor, df: pd.DataFrame, chart_generator: ChartGenerator, stats):
+    """مقارنة المعلمين والفصول بفترات ثقة bootstrap بدلاً من المتوسطات الخام"""
+    comparisons = [(name, columns) for name, columns, required in COMPARISONS if required in df.columns]
+    if not comparisons:
+        st.info("لا توجد أعمدة المعلم أو الفصل للمقارنة")
+        return
+    
+    names = [name for name, _ in comparisons]
+    col1, col2 = st.columns(2)
+    with col1:
+        choice = st.selectbox("المقارنة حسب", names, key="bootstrap_dimension")
+    with col2:
+        metric = st.radio("المقياس", ['المتوسط', 'نسبة النجاح %'], horizontal=True, key="bootstrap_metric")
+    columns = comparisons[names.index(choice)][1]
+    
+    if not st.checkbox("حساب فترات الثقة", key="bootstrap_run"):
+        return
+    
+    with st.spinner("جاري حساب فترات الثقة..."):
+        intervals = data_processor.get_bootstrap_intervals(df, columns)
+    
+    if metric == 'المتوسط':
+        reference = stats.get('percentage_mean', stats['mean'])
+    else:
+        reference = stats['pass_rate']
+    st.plotly_chart(chart_generator.create_interval_chart(intervals, [c for c in columns if c in intervals.columns], metric, reference),
+                    use_container_width=True)
+    st.dataframe(intervals, use_container_width=True, hide_index=True)
+
+def show_facets(cube, chart_generator: ChartGenerator, grade_bands: GradeBands, unit: str, figure_key=None):
+    """مخططات مصغرة لكل فصل أو مادة أو معلم، والمخططات الكاملة تُبنى فقط عند فتح مجموعتها"""
+    facets = [(name, columns) for name, columns in FACETS if columns[-1] in cube.dimensions]
+    if not facets:
+        return
+    
+    names = [name for name, _ in facets]
+    choice = st.selectbox("المخططات حسب", names, key="facet_dimension")
+    columns = [c for c in facets[names.index(choice)][1] if c in cube.dimensions]
+    
+    groups = cube.group_by(columns)
+    histograms = cube.group_histograms(columns).to_numpy()
+    labels = [' '.join(str(value) for value in row) for row in groups[columns].itertuples(index=False)]
+    
+    overview = chart_generator.cached(figure_key, f"facets-{choice}", chart_generator.create_facet_overview,
+                                      labels, histograms, cube.bin_edges)
+    st.plotly_chart(overview, use_container_width=True)
+    
+    titles = [f"{label} — {group['عدد الطلاب']} طالب، النجاح {group['نسبة النجاح %']:.1f}%"
+              for label, (_, group) in zip(labels, groups.iterrows())]
+    
+    if not EXPANDER_STATE_AVAILABLE:
+        # الإصدارات الأقدم: اختيار مجموعة واحدة لعرض مخططاتها الكاملة
+        selected = st.selectbox("عرض مخططات", ["—"] + titles, key=f"facet_group_{choice}")
+        if selected != "—":
+            i = titles.index(selected)
+            show_facet_group(labels[i], groups.iloc[i], histograms[i], cube, chart_generator, grade_bands, unit)
+        return
+    
+    for i, label in enumerate(labels):
+        expander = st.expander(titles[i], key=f"facet_{choice}_{label}", on_change="rerun")
+        if not expander.open:
+            continue
+        with expander:
+            show_facet_group(label, groups.iloc[i], histograms[i], cube, chart_generator, grade_bands, unit)
+
+def show_facet_group(label: str, group: pd.Series, histogram: np.ndarray, cube, chart_generator: ChartGenerator,
+                     grade_bands: GradeBands, unit: str):
+    """المدرج التكراري وتوزيع التقديرات لمجموعة واحدة من مخططات المجموعات"""
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(chart_generator.create_facet_histogram(label, histogram, cube.bin_edges, unit),
+                        use_container_width=True)
+    with col2:
+        band_counts = [int(group[band]) for band in cube.band_labels]
+        st.plotly_chart(chart_generator.create_bar_chart(grade_bands.summary(band_counts, unit)),
+                        use_container_width=True)
+
+def show_cube_slicer(cube, chart_generator: ChartGenerator, grade_bands: GradeBands, unit: str):
+    """شريحة مخصصة بأي تركيبة من الأبعاد تُجاب من مكعب المجاميع دون تصفية البيانات"""
+    if not cube.dimensions:
+        return
+    
+    filters = {}
+    columns = st.columns(len(cube.dimensions))
+    for column, dimension in zip(columns, cube.dimensions):
+        with column:
+            filters[dimension] = st.multiselect(dimension, cube.options(dimension, filters), key=f"cube_{dimension}")
+    
+    result = cube.slice(filters)
+    if not result['count']:
+        st.info("لا توجد بيانات لهذه الشريحة")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("عدد الطلاب", result['count'])
+    with col2:
+        st.metric("المتوسط", f"{result['mean']:.2f}")
+    with col3:
+        st.metric("الانحراف المعياري", f"{result['std']:.2f}")
+    with col4:
+        st.metric("النجاح (%)", f"{result['pass_rate']:.1f}%")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        bar_fig = chart_generator.create_bar_chart(cube.band_summary(filters, unit, grade_bands))
+        st.plotly_chart(bar_fig, use_container_width=True)
+    with col2:
+        breakdown = st.selectbox("التوزيع حسب", cube.dimensions, key="cube_breakdown")
+        st.dataframe(cube.group_by([breakdown], filters), use_container_width=True, hide_index=True)
+
+def show_streaming_stats(accumulator, chart_generator: ChartGenerator):
+    """عرض الإحصائيات المحسوبة تدفقياً دون تحميل الملف كاملاً"""
+    stats = accumulator.to_stats_dict()
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("عدد الطلاب", stats['count'])
+    with col2:
+        st.metric("المتوسط", f"{stats['mean']:.2f}")
+    with col3:
+        st.metric("الانحراف المعياري", f"{stats['std']:.2f}")
+    with col4:
+        st.metric("النجاح (%)", f"{stats['pass_rate']:.1f}%")
+    
+    col5, col6, col7, col8 = st.columns(4)
+    with col5:
+        st.metric("الوسيط (تقريبي)", f"{stats['median']:.2f}")
+    with col6:
+        st.metric("الربع الأول (تقريبي)", f"{stats['q1']:.2f}")
+    with col7:
+        st.metric("الربع الثالث (تقريبي)", f"{stats['q3']:.2f}")
+    with col8:
+        st.metric("أعلى / أقل درجة", f"{stats['max']:g} / {stats['min']:g}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(chart_generator.create_pie_chart(stats), use_container_width=True)
+    with col2:
+        st.plotly_chart(chart_generator.create_bar_chart(accumulator.grade_ranges()), use_container_width=True)
+
+def show_region_summary(summaries, region, chart_generator: ChartGenerator):
+    """عرض ملخص المنطقة المدموج من ملخصات المدارس مع مقارنة بينها"""
+    show_streaming_stats(region, chart_generator)
+    
+    boxes = {}
+    rows = []
+    for name, accumulator in summaries.items():
+        box = boxes[name] = accumulator.box_summary()
+        rows.append({
+            'المدرسة': name,
+            'عدد الطلاب': box['count'],
+            'المتوسط': round(box['mean'], 2),
+            'الوسيط': round(box['median'], 2),
+            'الربع الأول': round(box['q1'], 2),
+            'الربع الثالث': round(box['q3'], 2),
+            'نسبة النجاح %': round(accumulator.to_stats_dict()['pass_rate'], 1),
+        })
+    
+    st.subheader("🏫 مقارنة المدارس")
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+    boxes['المنطقة'] = region.box_summary()
+    st.plotly_chart(chart_generator.create_quantile_box_plot(boxes), use_container_width=True)
+
+def show_longitudinal(analysis, chart_generator: ChartGenerator):
+    """عرض مقارنة الفصول الدراسية: الملخص، الاتجاهات، الأكثر تحسناً وتراجعاً، وتغير الفصول"""
+    st.dataframe(analysis.summary.round(2), use_container_width=True, hide_index=True)
+    
+    students = analysis.students
+    matched = int((students['عدد الفصول الدراسية'] >= 2).sum())
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("الطلاب المرتبطون", f"{matched} / {len(students)}")
+    with col2:
+        st.metric("تحسنوا", int((students['التغير'] > 0).sum()))
+    with col3:
+        st.metric("تراجعوا", int((students['التغير'] < 0).sum()))
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        if not analysis.classes.empty:
+            st.plotly_chart(chart_generator.create_trend_chart(analysis.summary, analysis.classes, analysis.terms), use_container_width=True)
+    with col2:
+        st.plotly_chart(chart_generator.create_change_histogram(students), use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("📈 الأكثر تحسناً")
+        st.dataframe(analysis.improvement(10), use_container_width=True)
+    with col2:
+        st.subheader("📉 الأكثر تراجعاً")
+        st.dataframe(analysis.decline(10), use_container_width=True)
+    
+    if not analysis.classes.empty:
+        st.subheader("🏫 تغير الفصول")
+        st.dataframe(analysis.classes.sort_values('التغير', ascending=False), use_container_width=True, hide_index=True)
+
+def show_rejections(data_processor: DataProcessor, report_generator: ReportGenerator):
+    """عرض ملخص الصفوف المستبعدة مع إمكانية تحميلها"""
+    rejections = data_processor.rejections
+    summary = data_processor.get_rejection_summary()
+    
+    with st.expander(f"⚠️ تم استبعاد {len(rejections)} صف أثناء التحقق من البيانات"):
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        st.dataframe(rejections.head(1000), use_container_width=True, hide_index=True)
+        
+        if st.button("📋 تقرير الصفوف المستبعدة"):
+            try:
+                report_file = report_generator.generate_rejections_report(rejections, summary)
+                with open(report_file, "rb") as file:
+                    excel_data = file.read()
+                os.unlink(report_file)
+                
+                st.download_button(
+                    label="⬇️ تحميل الصفوف المستبعدة (Excel)",
+                    data=excel_data,
+                    file_name=f"الصفوف_المستبعدة_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+            except Exception as e:
+                st.error(f"خطأ في إنتاج التقرير: {str(e)}")
+
 def main():
     # التحقق من المصادقة
     auth_handler = AuthHandler()
@@ -82,12 +411,15 @@ def main():
         st.info("💡 **نصائح الاستخدام:**\n\n"
                 "• تأكد من أن ملف Excel يحتوي على أعمدة: اسم الطالب، الدرجة\n"
                 "• الدرجات يجب أن تكون رقمية\n"
-                "• يمكن رفع ملفات .xlsx و .xls")
+                "• يمكن رفع ملفات .xlsx و .xls و .csv و .parquet و .arrow\n"
+                "• يمكن رفع عدة ملفات دفعة واحدة لدمجها")
     
     # تهيئة معالج البيانات
-    data_processor = DataProcessor()
-    chart_generator = ChartGenerator()
+    data_processor = DataProcessor(cache=get_data_cache(), shared_store=get_shared_store(), results=get_result_cache())
+    chart_generator = ChartGenerator(figures=get_figure_cache())
     report_generator = ReportGenerator()
+    data_processor.grade_bands = report_generator.grade_bands = get_grade_bands()
+    report_generator.rank_method = data_processor.rank_method
     
     # قسم رفع الملف
     st.header("📁 رفع ملف البيانات")
@@ -135,17 +467,79 @@ def main():
                 st.error("الملف غير موجود")
     
     with col1:
-        uploaded_file = st.file_uploader(
+        uploaded_files = st.file_uploader(
             "اختر ملف Excel يحتوي على درجات الطلاب",
-            type=['xlsx', 'xls'],
-            help="يجب أن يحتوي الملف على عمودين على الأقل: اسم الطالب والدرجة"
+            type=['xlsx', 'xls', 'csv', 'parquet', 'arrow', 'feather'],
+            accept_multiple_files=True,
+            help="يجب أن يحتوي الملف على عمودين على الأقل: اسم الطالب والدرجة. يمكن رفع عدة ملفات لدمجها"
         )
+        read_all_sheets = st.checkbox("📑 قراءة جميع أوراق العمل", help="دمج جميع الأوراق في كل ملف بدلاً من الورقة الأولى فقط")
+        append_to_store = st.checkbox("➕ إضافة إلى البيانات المحفوظة", help="دمج الملف مع البيانات المرفوعة سابقاً وتحليل المجموعة الكاملة")
+        if append_to_store and st.button("🗑️ حذف البيانات المحفوظة", type="secondary"):
+            get_dataset_store(get_store_owner(auth_handler)).clear()
+            st.session_state['store_appended'] = set()
+            st.success("تم حذف البيانات المحفوظة")
+        streaming_only = st.checkbox("📏 إحصائيات تدفقية فقط", help="للملفات الكبيرة جداً: حساب الإحصائيات دفعة بدفعة دون تحميل البيانات في الذاكرة (الوسيط والربيعيات تقريبية)")
+        region_only = st.checkbox("🗺️ ملخص المنطقة (ملف لكل مدرسة)", help="تلخيص كل ملف في عملية منفصلة ودمج الملخصات دون تجميع الدرجات الخام (الوسيط والربيعيات تقريبية)")
+        longitudinal = st.checkbox("📅 مقارنة الفصول الدراسية (ملف لكل فصل دراسي)", help="ربط الطلاب عبر الملفات بالاسم والصف والفصل ومقارنة النتائج بترتيب رفع الملفات")
+    
+    if uploaded_files and longitudinal:
+        with st.spinner("جاري ربط الفصول الدراسية..."):
+            terms = data_processor.load_terms(uploaded_files)
+            analysis = data_processor.get_longitudinal_analysis(terms) if terms is not None else None
+        if analysis is not None:
+            st.subheader("📅 مقارنة الفصول الدراسية")
+            show_longitudinal(analysis, chart_generator)
+    
+    elif uploaded_files and region_only:
+        with st.spinner("جاري تلخيص الملفات ودمجها..."):
+            result = data_processor.summarize_files(uploaded_files)
+        if result is not None:
+            summaries, region = result
+            st.subheader("📈 إحصائيات المنطقة")
+            show_region_summary(summaries, region, chart_generator)
     
-    if uploaded_file is not None:
+    elif uploaded_files and streaming_only:
+        if len(uploaded_files) > 1:
+            st.warning(f"الإحصائيات التدفقية تُحسب لملف واحد: {uploaded_files[0].name}. "
+                       "لتلخيص عدة ملفات معاً استخدم خيار ملخص المنطقة")
+        with st.spinner("جاري حساب الإحصائيات على دفعات..."):
+            accumulator = data_processor.calculate_streaming_stats(uploaded_files[0])
+        if not data_processor.rejections.empty:
+            show_rejections(data_processor, report_generator)
+        if accumulator is not None:
+            st.subheader("📈 الإحصائيات الأساسية")
+            show_streaming_stats(accumulator, chart_generator)
+    
+    elif uploaded_files:
         try:
             # قراءة البيانات
             with st.spinner("جاري تحليل البيانات..."):
-                df = data_processor.load_excel_file(uploaded_file)
+                if len(uploaded_files) == 1 and not read_all_sheets:
+                    df = data_processor.load_excel_file(uploaded_files[0])
+                else:
+                    df = data_processor.load_excel_files(uploaded_files)
+                
+                # الصفوف المستبعدة أثناء التحقق من البيانات
+                if not data_processor.rejections.empty:
+                    show_rejections(data_processor, report_generator)
+                
+                # الدمج التراكمي مع البيانات المحفوظة
+                dataset_store = None
+                if df is not None and not df.empty and append_to_store:
+                    dataset_store = get_dataset_store(get_store_owner(auth_handler))
+                    appended = st.session_state.setdefault('store_appended', set())
+                    # إعادة تشغيل الصفحة بنفس الملف لا تعيد دمجه
+                    if data_processor.dataset_key in appended:
+                        df = dataset_store.df
+                    else:
+                        df = dataset_store.append(df)
+                        if df is not None:
+                            appended.add(data_processor.dataset_key)
+                    if df is not None:
+                        changes = dataset_store.last_changes
+                        st.info(f"➕ صفوف جديدة: {changes['new']} | صفوف محدثة: {changes['changed']} | "
+                                f"دون تغيير: {changes['unchanged']} | إجمالي البيانات المحفوظة: {len(df)}")
                 
                 if df is not None and not df.empty:
                     st.success("✅ تم تحميل البيانات بنجاح!")
@@ -156,7 +550,13 @@ def main():
                     
                     # الإحصائيات الأساسية
                     st.subheader("📈 الإحصائيات الأساسية")
-                    stats = data_processor.calculate_basic_stats(df)
+                    # التوزيع الكامل (الدرجات المرتبة) متاح للجدول المحمل فقط
+                    grade_statistics = None
+                    if dataset_store is not None:
+                        stats = dataset_store.stats()
+                    else:
+                        grade_statistics = data_processor.compute_statistics(df)
+                        stats = grade_statistics.to_stats_dict()
                     
                     col1, col2, col3, col4 = st.columns(4)
                     with col1:
@@ -189,29 +589,62 @@ def main():
                     # التحليل التفصيلي
                     st.subheader("📊 التحليل التفصيلي")
                     
+                    # مكعب المجاميع (محفوظ مع الملف): فئات المدرج التكراري والشرائح المخصصة
+                    cube = data_processor.get_aggregate_cube(df, persist=dataset_store is None)
+                    
+                    # المخططات محفوظة بصيغة JSON لكل ملف ومعاملات تحليل (None للبيانات المدمجة)
+                    figure_key = data_processor.result_key(df)
+                    
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        # مخطط توزيع الدرجات
-                        hist_fig = chart_generator.create_histogram(df)
+                        # مخطط توزيع الدرجات من فئات المكعب
+                        hist_fig = chart_generator.cached(
+                            figure_key, 'histogram', chart_generator.create_histogram,
+                            df, stats, bins=(cube.histogram()['عدد الطلاب'].to_numpy(), cube.bin_edges)
+                        )
                         st.plotly_chart(hist_fig, use_container_width=True)
                         
                         # مخطط دائري للنجاح والرسوب
-                        pie_fig = chart_generator.create_pie_chart(stats)
+                        pie_fig = chart_generator.cached(figure_key, 'pie', chart_generator.create_pie_chart, stats)
                         st.plotly_chart(pie_fig, use_container_width=True)
                     
                     with col2:
                         # مخطط الدرجات حسب النطاق
-                        grade_ranges = data_processor.categorize_grades(df)
-                        bar_fig = chart_generator.create_bar_chart(grade_ranges)
+                        if dataset_store is not None:
+                            grade_ranges = dataset_store.grade_ranges()
+                        else:
+                            grade_ranges = data_processor.categorize_grades(df)
+                        bar_fig = chart_generator.cached(figure_key, 'bar', chart_generator.create_bar_chart, grade_ranges)
                         st.plotly_chart(bar_fig, use_container_width=True)
                         
                         # مخطط صندوقي
-                        box_fig = chart_generator.create_box_plot(df)
+                        box_grades = grade_statistics.grades if grade_statistics is not None else None
+                        box_fig = chart_generator.cached(figure_key, 'box', chart_generator.create_box_plot, df, stats,
+                                                         grades=box_grades)
                         st.plotly_chart(box_fig, use_container_width=True)
                     
+                    # التحليل حسب الصف والفصل والمادة والمعلم والمدير
+                    st.subheader("🏫 التحليل حسب المجموعات")
+                    source_key = (data_processor.dataset_key, dataset_store is not None, len(df))
+                    group_stats = get_group_statistics(data_processor, df, source_key)
+                    show_group_analytics(group_stats)
+                    
+                    with st.expander("📏 فترات الثقة للمعلمين والفصول (bootstrap)"):
+                        show_bootstrap_intervals(data_processor, df, chart_generator, stats)
+                    
+                    unit = '%' if 'النسبة المئوية' in df.columns else ''
+                    with st.expander("🔎 شريحة مخصصة (الفصل × المادة × المعلم...)"):
+                        show_cube_slicer(cube, chart_generator, data_processor.grade_bands, unit)
+                    
+                    # مخططات لكل فصل ومادة ومعلم من مجاميع المكعب
+                    st.subheader("🧩 مخططات المجموعات")
+                    show_facets(cube, chart_generator, data_processor.grade_bands, unit, figure_key)
+                    
                     # جدول التفاصيل حسب النطاق
                     st.subheader("📋 تفاصيل الدرجات حسب النطاق")
+                    # ترتيب واحد للتفاصيل والقوائم والتقارير (محفوظ مع الملف)
+                    ranking = data_processor.get_ranking_index(df, persist=dataset_store is None)
                     grade_details = data_processor.get_grade_details(df)
                     st.dataframe(grade_details, use_container_width=True)
                     
@@ -225,7 +658,8 @@ def main():
                         if st.button("📊 تقرير Excel", type="primary"):
                             with st.spinner("جاري إنتاج التقرير..."):
                                 try:
-                                    report_file = report_generator.generate_comprehensive_report(df, stats, grade_ranges)
+                                    report_file = report_generator.generate_comprehensive_report(
+                                        df, stats, grade_ranges, ranking, grade_details, grade_statistics=grade_statistics)
                                     with open(report_file, "rb") as file:
                                         excel_data = file.read()
                                     os.unlink(report_file)
@@ -243,7 +677,7 @@ def main():
                         if st.button("📄 تقرير PDF", type="secondary"):
                             with st.spinner("جاري إنتاج التقرير..."):
                                 try:
-                                    pdf_file = report_generator.generate_pdf_report(df, stats, grade_ranges)
+                                    pdf_file = report_generator.generate_pdf_report(df, stats, grade_ranges, ranking)
                                     with open(pdf_file, "rb") as file:
                                         pdf_data = file.read()
                                     os.unlink(pdf_file)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# تشغيل الاختبارات من أي مجلد: جذر المستودع في مسار الاستيراد لحزمة utils
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.aggregate_cube import AggregateCube
+from utils.grade_bands import DEFAULT_GRADE_BANDS
+
+FILTERS = {'الصف': 'الأول', 'المادة': ['رياضيات', 'علوم'], 'المعلم': None}
+
+
+@pytest.fixture
+def grades_df() -> pd.DataFrame:
+    rng = np.random.default_rng(8)
+    n = 4_000
+    return pd.DataFrame({
+        'الصف': pd.Categorical(rng.choice(['الأول', 'الثاني'], n)),
+        'الفصل': pd.Categorical(rng.choice(['أ', 'ب', 'ج'], n)),
+        'المادة': pd.Categorical(rng.choice(['رياضيات', 'علوم', 'لغتي'], n)),
+        'المعلم': pd.Categorical(rng.choice([f"معلم {i}" for i in range(6)], n)),
+        'الدرجة': rng.integers(0, 101, n).astype(float),
+    })
+
+
+def _filtered(df: pd.DataFrame) -> pd.DataFrame:
+    return df[(df['الصف'] == 'الأول') & df['المادة'].isin(['رياضيات', 'علوم'])]
+
+
+def _reference_bins(values: np.ndarray, bin_width: float = 5) -> np.ndarray:
+    values = values[~np.isnan(values)]
+    return np.bincount(np.clip(np.floor(values / bin_width), 0, 100 // bin_width - 1).astype(int),
+                       minlength=int(100 // bin_width))
+
+
+def test_multi_dimension_slice_matches_filtered_frame(grades_df):
+    cube = AggregateCube.build(grades_df, passing_grade=50)
+    subset = _filtered(grades_df)['الدرجة']
+    result = cube.slice(FILTERS)
+    
+    assert result['count'] == len(subset)
+    assert result['mean'] == pytest.approx(subset.mean(), rel=1e-12)
+    assert result['std'] == pytest.approx(subset.std(), rel=1e-9)
+    assert (result['min'], result['max']) == (subset.min(), subset.max())
+    assert result['passing_count'] == int((subset >= 50).sum())
+    assert result['pass_rate'] == pytest.approx((subset >= 50).mean() * 100)
+
+
+def test_band_summary_and_histogram_match_filtered_frame(grades_df):
+    cube = AggregateCube.build(grades_df)
+    subset = _filtered(grades_df)['الدرجة'].to_numpy()
+    
+    expected_bands = DEFAULT_GRADE_BANDS.classify(subset, 50).counts
+    assert cube.band_summary(FILTERS)['عدد الطلاب'].tolist() == [int(c) for c in expected_bands]
+    np.testing.assert_array_equal(cube.histogram(FILTERS)['عدد الطلاب'], _reference_bins(subset))
+
+
+def test_group_by_matches_groupby(grades_df):
+    cube = AggregateCube.build(grades_df)
+    result = cube.group_by(['الفصل', 'المادة'], {'الصف': 'الثاني'})
+    subset = grades_df[grades_df['الصف'] == 'الثاني']
+    expected = subset.groupby(['الفصل', 'المادة'], observed=True)['الدرجة'].agg(['count', 'mean', 'std', 'min', 'max'])
+    
+    assert list(zip(result['الفصل'], result['المادة'])) == expected.index.tolist()
+    np.testing.assert_array_equal(result['عدد الطلاب'], expected['count'])
+    np.testing.assert_allclose(result['المتوسط'], expected['mean'], rtol=1e-12)
+    np.testing.assert_allclose(result['الانحراف المعياري'], expected['std'], rtol=1e-9)
+    np.testing.assert_array_equal(result['أقل درجة'], expected['min'])
+    np.testing.assert_array_equal(result['أعلى درجة'], expected['max'])
+
+
+def test_missing_values_are_not_binned(grades_df):
+    df = grades_df.assign(**{'النسبة المئوية': grades_df['الدرجة']})
+    df.loc[df.index[::7], 'النسبة المئوية'] = np.nan
+    cube = AggregateCube.build(df)
+    
+    histogram = cube.histogram()['عدد الطلاب'].to_numpy()
+    assert histogram.sum() == df['النسبة المئوية'].notna().sum()
+    np.testing.assert_array_equal(histogram, _reference_bins(df['النسبة المئوية'].to_numpy()))
+    
+    by_class = cube.group_histograms(['الفصل'])
+    expected = df.groupby('الفصل', observed=True)['النسبة المئوية'].count()
+    np.testing.assert_array_equal(by_class.sum(axis=1), expected)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import bootstrap
+from utils.bootstrap import INTERVAL_COLUMNS, _resample, bootstrap_intervals
+
+
+@pytest.fixture
+def grades_df() -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    n = 900
+    df = pd.DataFrame({
+        'المعلم': rng.choice([f"معلم {i}" for i in range(6)], n),
+        'الدرجة': rng.integers(20, 101, n).astype(float),
+    })
+    single = pd.DataFrame({'المعلم': ['معلم وحيد'], 'الدرجة': [64.0]})
+    return pd.concat([df, single], ignore_index=True)
+
+
+def test_fixed_seed_is_reproducible(grades_df):
+    first = bootstrap_intervals(grades_df, ['المعلم'], n_resamples=2000, seed=7)
+    second = bootstrap_intervals(grades_df, ['المعلم'], n_resamples=2000, seed=7)
+    pd.testing.assert_frame_equal(first, second)
+    
+    other = bootstrap_intervals(grades_df, ['المعلم'], n_resamples=2000, seed=8)
+    assert not first[INTERVAL_COLUMNS].equals(other[INTERVAL_COLUMNS])
+
+
+def test_parallel_matches_serial(grades_df, monkeypatch):
+    serial = bootstrap_intervals(grades_df, ['المعلم'], n_resamples=500, seed=3, max_workers=1)
+    monkeypatch.setattr(bootstrap, '_PARALLEL_WORK', 0)
+    parallel = bootstrap_intervals(grades_df, ['المعلم'], n_resamples=500, seed=3, max_workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+
+def test_intervals_contain_point_estimates(grades_df):
+    result = bootstrap_intervals(grades_df, ['المعلم'], passing_grade=60, n_resamples=2000)
+    expected = grades_df.groupby('المعلم')['الدرجة'].agg(['size', 'mean'])
+    expected['rate'] = grades_df['الدرجة'].ge(60).groupby(grades_df['المعلم']).mean() * 100
+    expected = expected.reindex(result['المعلم'])
+    
+    assert result['عدد الطلاب'].tolist() == expected['size'].tolist()
+    np.testing.assert_allclose(result['المتوسط'], expected['mean'].round(2))
+    np.testing.assert_allclose(result['نسبة النجاح %'], expected['rate'].round(2))
+    assert (result['الحد الأدنى للمتوسط'] <= result['المتوسط']).all()
+    assert (result['المتوسط'] <= result['الحد الأعلى للمتوسط']).all()
+    assert (result['الحد الأدنى للنجاح %'] <= result['نسبة النجاح %']).all()
+    assert (result['نسبة النجاح %'] <= result['الحد الأعلى للنجاح %']).all()
+    assert result['المتوسط'].is_monotonic_decreasing
+
+
+def test_single_student_group_has_zero_width_interval(grades_df):
+    result = bootstrap_intervals(grades_df, ['المعلم'], passing_grade=60, n_resamples=1000)
+    row = result.set_index('المعلم').loc['معلم وحيد']
+    assert row['عدد الطلاب'] == 1
+    assert row['الحد الأدنى للمتوسط'] == row['المتوسط'] == row['الحد الأعلى للمتوسط'] == 64
+    assert row['الحد الأدنى للنجاح %'] == row['نسبة النجاح %'] == row['الحد الأعلى للنجاح %'] == 100
+
+
+def test_missing_values_and_empty_frame():
+    df = pd.DataFrame({'المعلم': ['أ', 'أ', 'ب'], 'الدرجة': [70.0, np.nan, np.nan]})
+    result = bootstrap_intervals(df, ['المعلم'], n_resamples=100)
+    assert result['المعلم'].tolist() == ['أ']
+    assert result['عدد الطلاب'].tolist() == [1]
+    
+    empty = bootstrap_intervals(df.iloc[:0], ['المعلم'], n_resamples=100)
+    assert empty.empty
+    assert list(empty.columns) == ['المعلم'] + INTERVAL_COLUMNS
+
+
+def test_multinomial_and_index_paths_agree(monkeypatch):
+    values = np.random.default_rng(11).integers(0, 11, 2_000).astype(float) * 10
+    n_resamples = 20_000
+    
+    # 11 قيمة مختلفة لـ 2000 طالب: المسار الافتراضي هو multinomial
+    assert 11 * bootstrap._MULTINOMIAL_RATIO < len(values)
+    multinomial, _ = _resample(values, 50, n_resamples, np.random.default_rng(1))
+    monkeypatch.setattr(bootstrap, '_MULTINOMIAL_RATIO', len(values))
+    indexed, _ = _resample(values, 50, n_resamples, np.random.default_rng(2))
+    
+    standard_error = values.std() / np.sqrt(len(values))
+    for means in (multinomial, indexed):
+        assert means.mean() == pytest.approx(values.mean(), abs=0.05 * standard_error)
+        assert means.std() == pytest.approx(standard_error, rel=0.03)
+    np.testing.assert_allclose(
+        np.quantile(multinomial, [0.025, 0.5, 0.975]),
+        np.quantile(indexed, [0.025, 0.5, 0.975]),
+        atol=0.1 * standard_error
+    )
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.dataset_store import DatasetStore
+from utils.stats_kernel import compute_statistics
+
+
+def _frame(names, grades, subject='رياضيات') -> pd.DataFrame:
+    return pd.DataFrame({
+        'اسم الطالب': names,
+        'الصف': ['الأول'] * len(names),
+        'الفصل': ['أ' if i % 2 else 'ب' for i in range(len(names))],
+        'المادة': [subject] * len(names),
+        'الدرجة': np.asarray(grades, dtype=float),
+    })
+
+
+def _assert_matches_kernel(store: DatasetStore):
+    expected = compute_statistics(store.df, passing_grade=store.passing_grade,
+                                  grade_bands=store.grade_bands).to_stats_dict()
+    stats = store.stats()
+    assert set(stats) == set(expected)
+    for name, value in expected.items():
+        assert stats[name] == pytest.approx(value, rel=1e-9), name
+
+
+@pytest.fixture
+def first_file() -> pd.DataFrame:
+    rng = np.random.default_rng(4)
+    return _frame([f"طالب {i}" for i in range(200)], rng.integers(0, 101, 200))
+
+
+def test_append_reappend_and_changed_rows(tmp_path, first_file):
+    store = DatasetStore(str(tmp_path))
+    store.append(first_file)
+    assert store.last_changes == {'new': 200, 'changed': 0, 'unchanged': 0}
+    _assert_matches_kernel(store)
+    
+    # إعادة رفع نفس الملف لا تغير شيئاً
+    store.append(first_file)
+    assert store.last_changes == {'new': 0, 'changed': 0, 'unchanged': 200}
+    assert len(store.df) == 200
+    _assert_matches_kernel(store)
+    
+    # صف معدل وصفان جديدان
+    second_file = pd.concat([first_file.iloc[:10], _frame(['جديد 1', 'جديد 2'], [12, 99])], ignore_index=True)
+    second_file.loc[3, 'الدرجة'] = 100 - second_file.loc[3, 'الدرجة'] + 0.5
+    store.append(second_file)
+    assert store.last_changes == {'new': 2, 'changed': 1, 'unchanged': 9}
+    assert len(store.df) == 202
+    updated = store.df[store.df['اسم الطالب'] == first_file.loc[3, 'اسم الطالب']]
+    assert updated['الدرجة'].tolist() == [second_file.loc[3, 'الدرجة']]
+    _assert_matches_kernel(store)
+    
+    bands = store.grade_ranges()
+    assert bands['عدد الطلاب'].sum() == 202
+
+
+def test_reload_uses_saved_aggregates(tmp_path, first_file):
+    store = DatasetStore(str(tmp_path))
+    store.append(first_file)
+    reloaded = DatasetStore(str(tmp_path))
+    assert reloaded.aggregates == store.aggregates
+    _assert_matches_kernel(reloaded)
+
+
+def test_changed_passing_grade_recomputes_aggregates(tmp_path, first_file):
+    DatasetStore(str(tmp_path), passing_grade=50).append(first_file)
+    
+    stricter = DatasetStore(str(tmp_path), passing_grade=80)
+    assert stricter.stats()['passing_count'] == int((first_file['الدرجة'] >= 80).sum())
+    _assert_matches_kernel(stricter)
+    
+    # تغيير درجة النجاح بعد التحميل يعيد الحساب أيضاً
+    stricter.passing_grade = 30
+    assert stricter.stats()['passing_count'] == int((first_file['الدرجة'] >= 30).sum())
+
+
+def test_clear_removes_saved_files(tmp_path, first_file):
+    store = DatasetStore(str(tmp_path))
+    store.append(first_file)
+    store.clear()
+    assert store.df.empty
+    assert DatasetStore(str(tmp_path)).df.empty
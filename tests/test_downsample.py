@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.downsample import lttb
+
+
+def reference_lttb(x, y, n_out):
+    """التطبيق المرجعي بحلقة لكل نقطة (Steinarsson 2013)"""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return list(range(n))
+    
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        # متوسط الحاوية التالية (أو النقطة الأخيرة بعد آخر حاوية)
+        avg_start = math.floor((i + 1) * every) + 1
+        avg_end = min(math.floor((i + 2) * every) + 1, n)
+        avg_x = sum(x[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(y[avg_start:avg_end]) / (avg_end - avg_start)
+        
+        max_area = -1.0
+        chosen = None
+        for b in range(math.floor(i * every) + 1, math.floor((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[b] - y[a]) - (x[a] - x[b]) * (avg_y - y[a])) * 0.5
+            if area > max_area:
+                max_area = area
+                chosen = b
+        selected.append(chosen)
+        a = chosen
+    selected.append(n - 1)
+    return selected
+
+
+@pytest.mark.parametrize('n, n_out', [(10, 3), (10, 9), (100, 7), (1_000, 100), (1_001, 250), (5_000, 2_000), (4_097, 64)])
+def test_matches_reference_loop(n, n_out):
+    rng = np.random.default_rng(n + n_out)
+    x = np.sort(rng.uniform(0, 100, n))
+    y = np.cumsum(rng.normal(size=n))
+    
+    result = lttb(x, y, n_out)
+    assert result.tolist() == reference_lttb(x.tolist(), y.tolist(), n_out)
+    assert len(result) == n_out
+    assert result[0] == 0
+    assert result[-1] == n - 1
+    assert np.all(np.diff(result) > 0)
+
+
+def test_keeps_peaks():
+    x = np.arange(1_000, dtype=float)
+    y = np.zeros(1_000)
+    y[[137, 512, 901]] = [50, -40, 30]
+    assert {137, 512, 901} <= set(lttb(x, y, 20).tolist())
+
+
+@pytest.mark.parametrize('n_out', [10, 11, 50, 2, 0])
+def test_returns_every_point_when_not_reducing(n_out):
+    x = np.arange(10, dtype=float)
+    np.testing.assert_array_equal(lttb(x, x ** 2, n_out), np.arange(10))
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.group_analytics import DIMENSIONS, HIERARCHY, compute_group_statistics
+
+
+@pytest.fixture
+def grades_df() -> pd.DataFrame:
+    rng = np.random.default_rng(21)
+    n = 3_000
+    df = pd.DataFrame({
+        'الصف': rng.choice(['الأول', 'الثاني', 'الثالث'], n),
+        'الفصل': rng.choice(['أ', 'ب', 'ج', 'د'], n),
+        'المادة': pd.Categorical(rng.choice(['رياضيات', 'علوم', 'لغتي', 'إنجليزي'], n)),
+        'المعلم': rng.choice([f"معلم {i}" for i in range(12)], n),
+        'المدير': rng.choice(['مدير 1', 'مدير 2'], n),
+        'الدرجة': rng.integers(0, 201, n) / 2,
+    })
+    # مجموعات بطالب واحد في كل مستوى
+    single = pd.DataFrame({
+        'الصف': ['الرابع', 'الأول'], 'الفصل': ['هـ', 'أ'], 'المادة': ['رياضيات', 'فنية'],
+        'المعلم': ['معلم وحيد', 'معلم 1'], 'المدير': ['مدير 3', 'مدير 1'], 'الدرجة': [77.5, 12.0],
+    })
+    return pd.concat([df, single], ignore_index=True)
+
+
+def _levels():
+    levels = [HIERARCHY[:depth] for depth in range(1, len(HIERARCHY) + 1)]
+    return levels + [[dimension] for dimension in DIMENSIONS]
+
+
+@pytest.mark.parametrize('columns', _levels())
+def test_group_statistics_match_pandas_groupby(grades_df, columns):
+    result = compute_group_statistics(grades_df, passing_grade=50).level(columns).set_index(columns)
+    grouped = grades_df.groupby(columns, observed=True)['الدرجة']
+    expected = grouped.agg(['count', 'mean', 'std', 'median', 'min', 'max'])
+    expected['q1'] = grouped.quantile(0.25)
+    expected['q3'] = grouped.quantile(0.75)
+    expected['passing'] = grades_df['الدرجة'].ge(50).groupby([grades_df[c] for c in columns], observed=True).sum()
+    
+    assert result.index.tolist() == expected.index.tolist()
+    assert (expected['count'] == 1).any()
+    pairs = {
+        'عدد الطلاب': 'count', 'المتوسط': 'mean', 'الانحراف المعياري': 'std', 'الوسيط': 'median',
+        'أقل درجة': 'min', 'أعلى درجة': 'max', 'الربع الأول': 'q1', 'الربع الثالث': 'q3',
+        'عدد الناجحين': 'passing',
+    }
+    for column, reference in pairs.items():
+        np.testing.assert_allclose(result[column].to_numpy(dtype=float), expected[reference].to_numpy(dtype=float),
+                                   rtol=1e-12, err_msg=column)
+    np.testing.assert_allclose(result['نسبة النجاح %'], expected['passing'] / expected['count'] * 100, rtol=1e-12)
+
+
+def test_total_and_band_counts(grades_df):
+    statistics = compute_group_statistics(grades_df)
+    total = statistics.total
+    
+    assert total['عدد الطلاب'] == len(grades_df)
+    assert total['المتوسط'] == pytest.approx(grades_df['الدرجة'].mean(), rel=1e-12)
+    assert total['الوسيط'] == pytest.approx(grades_df['الدرجة'].median())
+    assert total[statistics.band_labels].sum() == len(grades_df)
+    
+    classes = statistics.level(HIERARCHY[:2])
+    assert (classes[statistics.band_labels].sum(axis=1) == classes['عدد الطلاب']).all()
+
+
+def test_drilldown_returns_children_of_path(grades_df):
+    statistics = compute_group_statistics(grades_df)
+    children = statistics.drilldown(('الأول',))
+    expected = grades_df[grades_df['الصف'] == 'الأول'].groupby('الفصل')['الدرجة'].mean()
+    
+    assert children['الفصل'].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(children['المتوسط'], expected.to_numpy(), rtol=1e-12)
+    assert statistics.drilldown(('الأول', 'أ', 'رياضيات')) is None
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import longitudinal
+from utils.longitudinal import LongitudinalAnalysis, _first_to_last, normalize_values
+from utils.schema_detector import normalize_header
+
+
+NAMES = [
+    'محمد-علي', 'محمد علي', ' أحمد  بن\tسعيد ', '\xa0فاطمة　الزهراء\x1c', 'مُحَمَّد',
+    'ABC. def', 'عبد / الله', 'عبد_الله:', 'نورة  ', 'ليلى', 'x\x85y', ' a ',
+    '- محمد -', 'إيمان', None, 3,
+]
+
+
+def test_normalize_values_matches_normalize_header(monkeypatch):
+    expected = [normalize_header('' if value is None else str(value)) for value in NAMES]
+    assert list(normalize_values(NAMES)) == expected
+    
+    monkeypatch.setattr(longitudinal, 'PYARROW_AVAILABLE', False)
+    assert list(normalize_values(NAMES)) == expected
+
+
+def _term(rows):
+    return pd.DataFrame(rows, columns=['اسم الطالب', 'الصف', 'الفصل', 'الدرجة'])
+
+
+@pytest.fixture
+def terms():
+    first = _term([
+        ['أحمد علي', 'الأول', 'أ', 60],
+        ['فاطمة', 'الأول', 'أ', 80],
+        ['فاطمة', 'الأول', 'أ', 90],
+        ['سارة', 'الأول', 'ب', 40],
+        ['خالد', 'الثاني', 'أ', 70],
+    ])
+    second = _term([
+        ['احمد-علي', 'الأول', 'أ', 75],
+        ['فاطمه', 'الأول', 'أ', 70],
+        ['سارة', 'الأول', 'ب', np.nan],
+        ['نورة', 'الثاني', 'أ', 55],
+    ])
+    third = _term([
+        ['أحمد علي', 'الأول', 'أ', 50],
+        ['سارة', 'الأول', 'ب', 65],
+        ['خالد', 'الثاني', 'أ', 90],
+        ['نورة', 'الثاني', 'أ', 60],
+    ])
+    return {'الأول': first, 'الثاني': second, 'الثالث': third}
+
+
+def test_build_joins_students_across_terms(terms):
+    result = LongitudinalAnalysis.build(terms, passing_grade=50)
+    assert result.column == 'الدرجة'
+    students = result.students.set_index('اسم الطالب')
+    
+    # أحمد وفاطمة يُطابقان رغم اختلاف الهمزة والتاء المربوطة والشرطة، والاسم المعروض من آخر فصل دراسي
+    assert len(students) == 5
+    assert students.loc['أحمد علي', ['الأول', 'الثاني', 'الثالث']].tolist() == [60, 75, 50]
+    assert students.loc['فاطمه', ['الأول', 'الثاني']].tolist() == [85, 70]
+    assert np.isnan(students.loc['فاطمه', 'الثالث'])
+    assert students['عدد الفصول الدراسية'].to_dict() == {
+        'أحمد علي': 3, 'فاطمه': 2, 'سارة': 2, 'خالد': 2, 'نورة': 2,
+    }
+    assert students['التغير'].to_dict() == {
+        'أحمد علي': -10, 'فاطمه': -15, 'سارة': 25, 'خالد': 20, 'نورة': 5,
+    }
+    assert students.loc['نورة', 'التغير الأخير'] == 5
+    assert np.isnan(students.loc['فاطمه', 'التغير الأخير'])
+    
+    summary = result.summary.set_index('الفصل الدراسي')
+    assert summary['عدد الطلاب'].tolist() == [4, 4, 4]
+    assert summary.loc['الأول', 'المتوسط'] == pytest.approx(68)
+    assert summary.loc['الثاني', 'نسبة النجاح %'] == pytest.approx(100)
+
+
+def test_build_class_deltas(terms):
+    result = LongitudinalAnalysis.build(terms, passing_grade=50)
+    classes = result.classes.set_index(['الصف', 'الفصل'])
+    
+    for name, df in terms.items():
+        expected = df.groupby(['الصف', 'الفصل'])['الدرجة'].mean().round(2).dropna()
+        pd.testing.assert_series_equal(
+            classes[name].dropna(), expected.rename(name), check_names=False, check_index_type=False
+        )
+    
+    # الفصل الأول/أ: 76.67 ثم 72.5 ثم 50 (أول وآخر فصل دراسي متاح)
+    assert classes.loc[('الأول', 'أ'), 'التغير'] == pytest.approx(50 - 230 / 3, abs=0.01)
+    # الفصل الأول/ب: سارة بلا درجة في الفصل الثاني فلا يظهر الفصل فيه
+    assert np.isnan(classes.loc[('الأول', 'ب'), 'الثاني'])
+    assert classes.loc[('الأول', 'ب'), 'التغير'] == 25
+    
+    assert classes.loc[('الأول', 'أ'), 'متوسط تغير الطلاب'] == -12.5
+    assert classes.loc[('الأول', 'أ'), 'الطلاب المرتبطون'] == 2
+    assert classes.loc[('الثاني', 'أ'), 'متوسط تغير الطلاب'] == 12.5
+    assert classes.loc[('الثاني', 'أ'), 'الطلاب المرتبطون'] == 2
+
+
+def test_build_prefers_percentage_when_every_term_has_it(terms):
+    percent = {name: df.assign(**{'النسبة المئوية': df['الدرجة'] / 2}) for name, df in terms.items()}
+    assert LongitudinalAnalysis.build(percent).column == 'النسبة المئوية'
+    
+    percent['الثالث'] = terms['الثالث']
+    assert LongitudinalAnalysis.build(percent).column == 'الدرجة'
+
+
+def test_first_to_last_skips_gaps():
+    scores = np.array([
+        [10.0, 20.0, 35.0],
+        [np.nan, 40.0, 30.0],
+        [50.0, np.nan, np.nan],
+        [np.nan, np.nan, np.nan],
+        [60.0, np.nan, 45.0],
+        [np.nan, 70.0, np.nan],
+    ])
+    change = _first_to_last(scores)
+    np.testing.assert_array_equal(change, [25.0, -10.0, np.nan, np.nan, -15.0, np.nan])
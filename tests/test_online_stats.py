@@ -0,0 +1,128 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.online_stats import KeyHashSet, OnlineStatistics, QuantileSketch, RunningMoments
+
+
+def _chunks(values: np.ndarray, size: int):
+    """تقسيم المصفوفة إلى دفعات بحجم ثابت (الأخيرة أصغر)"""
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+@pytest.fixture
+def grades() -> np.ndarray:
+    rng = np.random.default_rng(7)
+    values = rng.normal(65, 15, 50_000).clip(0, 100)
+    values[rng.choice(len(values), 500, replace=False)] = np.nan
+    return values
+
+
+def test_running_moments_match_numpy(grades):
+    moments = RunningMoments()
+    for chunk in _chunks(grades, 3_333):
+        moments.update(chunk)
+    
+    valid = grades[~np.isnan(grades)]
+    assert moments.count == len(valid)
+    assert moments.mean == pytest.approx(valid.mean(), rel=1e-12)
+    assert moments.variance == pytest.approx(valid.var(ddof=1), rel=1e-10)
+    assert moments.min == valid.min()
+    assert moments.max == valid.max()
+
+
+def test_running_moments_merge_equals_whole(grades):
+    whole = RunningMoments()
+    whole.update(grades)
+    
+    merged = RunningMoments()
+    for chunk in _chunks(grades, 7_000):
+        part = RunningMoments()
+        part.update(chunk)
+        merged.merge(part)
+    merged.merge(RunningMoments())
+    
+    assert merged.count == whole.count
+    assert merged.mean == pytest.approx(whole.mean, rel=1e-12)
+    assert merged.m2 == pytest.approx(whole.m2, rel=1e-10)
+    assert (merged.min, merged.max) == (whole.min, whole.max)
+
+
+def test_exact_sketch_matches_pandas_quantiles():
+    rng = np.random.default_rng(1)
+    values = rng.integers(0, 101, 20_000).astype(float)
+    sketch = QuantileSketch()
+    for chunk in _chunks(values, 1_500):
+        sketch.update(chunk)
+    
+    assert sketch.exact
+    for q in (0, 0.1, 0.25, 0.5, 0.75, 0.9, 1):
+        assert sketch.quantile(q) == pytest.approx(pd.Series(values).quantile(q))
+
+
+@pytest.mark.parametrize('q', [0.05, 0.25, 0.5, 0.75, 0.95])
+def test_digest_quantile_within_documented_bound(q):
+    rng = np.random.default_rng(3)
+    values = rng.gamma(4, 12, 200_000)
+    sketch = QuantileSketch(compression=500)
+    for chunk in _chunks(values, 9_000):
+        sketch.update(chunk)
+    
+    assert not sketch.exact
+    epsilon = math.pi * math.sqrt(q * (1 - q)) / sketch.compression
+    low, high = np.quantile(values, [max(q - epsilon, 0), min(q + epsilon, 1)])
+    assert low <= sketch.quantile(q) <= high
+
+
+def test_digest_merge_stays_within_bound():
+    rng = np.random.default_rng(5)
+    parts = [rng.normal(loc, 10, 40_000) for loc in (40, 55, 70)]
+    merged = QuantileSketch()
+    for part in parts:
+        sketch = QuantileSketch()
+        for chunk in _chunks(part, 5_000):
+            sketch.update(chunk)
+        merged.merge(sketch)
+    
+    values = np.concatenate(parts)
+    assert merged.count == len(values)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    for q in (0.25, 0.5, 0.75):
+        epsilon = math.pi * math.sqrt(q * (1 - q)) / merged.compression
+        low, high = np.quantile(values, [q - epsilon, q + epsilon])
+        assert low <= merged.quantile(q) <= high
+
+
+def test_key_hash_set_flags_repeats_within_and_across_chunks():
+    rng = np.random.default_rng(11)
+    keys = rng.integers(0, 5_000, 30_000).astype(np.uint64)
+    seen = KeyHashSet()
+    repeated = np.concatenate([seen.add_new(chunk) for chunk in _chunks(keys, 2_000)])
+    
+    expected = pd.Series(keys).duplicated(keep='first').to_numpy()
+    np.testing.assert_array_equal(repeated, expected)
+
+
+def test_online_statistics_round_trip_and_merge(grades):
+    frame = pd.DataFrame({'الدرجة': grades, 'النسبة المئوية': grades})
+    first, second = OnlineStatistics(), OnlineStatistics()
+    for chunk in _chunks(frame.iloc[:20_000], 4_000):
+        first.update(chunk)
+    for chunk in _chunks(frame.iloc[20_000:], 4_000):
+        second.update(chunk)
+    
+    restored = OnlineStatistics.from_dict(json.loads(json.dumps(first.to_dict())))
+    assert restored.to_stats_dict() == first.to_stats_dict()
+    
+    whole = OnlineStatistics()
+    whole.update(frame)
+    restored.merge(second)
+    merged, expected = restored.to_stats_dict(), whole.to_stats_dict()
+    for name in ('count', 'min', 'max', 'passing_count', 'failing_count'):
+        assert merged[name] == expected[name]
+    for name in ('mean', 'std', 'percentage_mean', 'pass_rate'):
+        assert merged[name] == pytest.approx(expected[name], rel=1e-10)
+    np.testing.assert_array_equal(restored.band_counts, whole.band_counts)
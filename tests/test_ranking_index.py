@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.ranking_index import GROUP_RANKS, RankingIndex
+
+
+@pytest.fixture
+def grades_df() -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    n = 2_000
+    grades = rng.integers(20, 100, n).astype(float)
+    grades[rng.choice(n, 40, replace=False)] = np.nan
+    return pd.DataFrame({
+        'اسم الطالب': [f"طالب {i}" for i in range(n)],
+        'الصف': rng.integers(1, 4, n).astype(str),
+        'الفصل': rng.choice(['أ', 'ب', 'ج'], n),
+        'المادة': pd.Categorical(rng.choice(['رياضيات', 'علوم', 'لغتي'], n)),
+        'الدرجة': grades,
+    })
+
+
+@pytest.mark.parametrize('method', ['min', 'dense'])
+def test_group_ranks_match_pandas(grades_df, method):
+    ranking = RankingIndex.build(grades_df)
+    columns = ranking.rank_columns(method)
+    ordered = grades_df.iloc[ranking.order]
+    
+    for name, group_columns, _ in GROUP_RANKS:
+        expected = ordered.groupby(group_columns, observed=True)['الدرجة'].rank(method=method, ascending=False)
+        np.testing.assert_array_equal(columns[name].to_numpy(dtype=float, na_value=np.nan), expected.to_numpy())
+
+
+def test_percentile_and_z_score_match_pandas(grades_df):
+    ranking = RankingIndex.build(grades_df)
+    columns = ranking.rank_columns()
+    values = grades_df.iloc[ranking.order]['الدرجة']
+    
+    # (عدد الأقل + نصف عدد المتساوين) = متوسط الترتيب التصاعدي − 0.5
+    percentile = (values.rank(method='average') - 0.5) / values.count() * 100
+    z_score = (values - values.mean()) / values.std()
+    np.testing.assert_allclose(columns['الرتبة المئينية'], percentile.round(1), atol=0.051)
+    np.testing.assert_allclose(columns['الدرجة المعيارية'], z_score.round(2), atol=0.0051)
+
+
+def test_failing_keeps_ties_in_file_order():
+    df = pd.DataFrame({
+        'اسم الطالب': ['أ', 'ب', 'ج', 'د', 'هـ', 'و'],
+        'الدرجة': [30, 40, 30, 90, 30, np.nan],
+    })
+    failing = RankingIndex.build(df).failing()
+    assert failing['اسم الطالب'].tolist() == ['أ', 'ج', 'هـ', 'ب']
+    assert failing.index.tolist() == [1, 2, 3, 4]
+
+
+def test_top_matches_nlargest(grades_df):
+    top = RankingIndex.build(grades_df).top(25)
+    expected = grades_df.nlargest(25, 'الدرجة', keep='first')
+    assert top['اسم الطالب'].tolist() == expected['اسم الطالب'].tolist()
+
+
+def test_unknown_rank_method_is_rejected(grades_df):
+    with pytest.raises(ValueError):
+        RankingIndex.build(grades_df).rank_columns('average')
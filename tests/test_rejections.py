@@ -0,0 +1,80 @@
+import io
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from utils.data_processor import DataProcessor
+
+
+class UploadedFile(io.BytesIO):
+    """ملف مرفوع بالاسم والحجم كما يمرره Streamlit"""
+    
+    def __init__(self, content: bytes, name: str):
+        super().__init__(content)
+        self.name = name
+        self.size = len(content)
+
+
+HEADER = ['اسم الطالب', 'الصف', 'الفصل', 'الدرجة']
+
+MIXED_ROWS = [
+    ['أحمد', 'الأول', 'أ', 90], ['خالد', 'الأول', 'أ', None], ['سعد', 'الأول', 'أ', 'غائب'],
+    ['أحمد', 'الأول', 'أ', 80], ['فهد', 'الأول', 'أ', -5], ['ماجد', 'الأول', 'ب', 120],
+    [None, 'الأول', 'ب', 50], ['علي', 'الأول', 'ب', 75.5], ['علي', 'الأول', 'ب', '75.5'],
+    ['عمر', 'الأول', 'ب', ' '],
+]
+
+# عمود درجات رقمي بالكامل مع خلايا فارغة (pd.read_excel يقرؤه float64)
+NUMERIC_ROWS = [
+    ['أحمد', 'الأول', 'أ', 90], ['خالد', 'الأول', 'أ', None], ['أحمد', 'الأول', 'أ', 80],
+    ['فهد', 'الأول', 'أ', -5], ['ماجد', 'الأول', 'ب', 120], ['علي', 'الأول', 'ب', 75.5],
+    ['علي', 'الأول', 'ب', 64], ['عمر', 'الأول', 'ب', None],
+]
+
+
+def _xlsx(rows) -> bytes:
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADER)
+    for row in rows:
+        wb.active.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _processor() -> DataProcessor:
+    processor = DataProcessor()
+    # دفعات صغيرة ليقع التكرار عبر الدفعات
+    processor.chunk_size = 3
+    return processor
+
+
+def _load_rejections(content: bytes, name: str, streaming: bool) -> pd.DataFrame:
+    processor = _processor()
+    assert processor.load_excel_file(UploadedFile(content, name), streaming=streaming) is not None
+    return processor.rejections
+
+
+@pytest.mark.parametrize('rows', [MIXED_ROWS, NUMERIC_ROWS], ids=['mixed', 'numeric'])
+def test_streaming_and_eager_rejections_match(rows):
+    content = _xlsx(rows)
+    eager = _load_rejections(content, 'grades.xlsx', streaming=False)
+    streaming = _load_rejections(content, 'grades.xlsx', streaming=True)
+    # نوع عمود الاسم يُستنتج من كل دفعة (object أو str) والمقارنة على القيم
+    pd.testing.assert_frame_equal(eager, streaming, check_dtype=False)
+    
+    processor = _processor()
+    assert processor.calculate_streaming_stats(UploadedFile(content, 'grades.xlsx')) is not None
+    pd.testing.assert_frame_equal(eager, processor.rejections, check_dtype=False)
+    
+    # القيم المفقودة نص فارغ والأعداد الصحيحة دون كسر عشري
+    original = eager.set_index('رقم الصف')['القيمة الأصلية']
+    assert original[3] == ''
+    assert original[4 if rows is NUMERIC_ROWS else 5] == '80'
+    assert not original.isna().any()
+
+
+def test_mixed_rejection_values():
+    original = _load_rejections(_xlsx(MIXED_ROWS), 'grades.xlsx', streaming=True)
+    assert original['القيمة الأصلية'].tolist() == ['', 'غائب', '80', '-5', '120', '50', '75.5', ' ']
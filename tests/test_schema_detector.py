@@ -0,0 +1,84 @@
+import pytest
+
+from utils.schema_detector import CANONICAL_COLUMNS, HEADER_SYNONYMS, SchemaDetector, normalize_header
+
+
+def _mapped(schema, header):
+    return {column: header[p] for column, p in zip(CANONICAL_COLUMNS, schema['layout']) if p is not None}
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    SchemaDetector._cache.clear()
+    yield
+    SchemaDetector._cache.clear()
+
+
+def test_teacher_name_before_student_name():
+    header = ['Teacher Name', 'Student Name', 'Grade Level', 'Section', 'Score', 'Subject']
+    schema = SchemaDetector().match_header(header)
+    assert schema['by_header']
+    assert _mapped(schema, header) == {
+        'اسم الطالب': 'Student Name', 'الصف': 'Grade Level', 'الفصل': 'Section',
+        'الدرجة': 'Score', 'المادة': 'Subject', 'المعلم': 'Teacher Name',
+    }
+
+
+def test_generic_columns_are_not_mapped():
+    header = ['Name', 'Class', 'Year', 'Level', 'Max', 'من', 'المستوى',
+              'اسم الطالب', 'الصف', 'الفصل', 'الدرجة', 'الدرجة العظمى']
+    schema = SchemaDetector().match_header(header)
+    assert schema['by_header']
+    assert _mapped(schema, header) == {
+        'اسم الطالب': 'اسم الطالب', 'الصف': 'الصف', 'الفصل': 'الفصل',
+        'الدرجة': 'الدرجة', 'الدرجة الكلية': 'الدرجة العظمى',
+    }
+    assert schema['usecols'] == [7, 8, 9, 10, 11]
+
+
+def test_english_export_in_any_order():
+    header = ['Homeroom', 'Marks', 'Out Of', 'Student', 'Year Group', 'Course', 'Principal', 'Notes']
+    schema = SchemaDetector().match_header(header)
+    assert schema['by_header']
+    assert _mapped(schema, header) == {
+        'اسم الطالب': 'Student', 'الصف': 'Year Group', 'الفصل': 'Homeroom', 'الدرجة': 'Marks',
+        'المادة': 'Course', 'الدرجة الكلية': 'Out Of', 'المدير': 'Principal',
+    }
+
+
+def test_unrecognised_header_falls_back_to_positions():
+    schema = SchemaDetector().match_header(['Name', 'Class', 'Year', 'Value', 'X'])
+    assert not schema['by_header']
+    assert schema['layout'] == [0, 1, 2, 3, 4, None, None, None]
+    assert schema['usecols'] == [0, 1, 2, 3, 4]
+
+
+def test_synonyms_are_unique_after_normalization():
+    normalized = [normalize_header(s) for synonyms in HEADER_SYNONYMS.values() for s in synonyms]
+    assert len(normalized) == len(set(normalized))
+
+
+def test_cached_schema_is_not_shared_with_callers():
+    detector = SchemaDetector()
+    header = ['اسم الطالب', 'الصف', 'الفصل', 'الدرجة']
+    first = detector.match_header(header)
+    first['layout'][0] = 99
+    first['usecols'].append(99)
+    first['header'] = header
+    
+    second = detector.match_header(list(header))
+    assert second['layout'] == [0, 1, 2, 3, None, None, None, None]
+    assert second['usecols'] == [0, 1, 2, 3]
+    assert 'header' not in second
+    
+    second['layout'][1] = 42
+    assert detector.match_header(header)['layout'][1] == 1
+
+
+def test_detect_csv_header():
+    content = 'المعلم,اسم الطالبة,الصف,الشعبة,درجة الطالب\nأ,ب,1,2,90\n'.encode('utf-8')
+    schema = SchemaDetector().detect(content, 'csv')
+    assert schema['error'] is None
+    assert schema['by_header']
+    assert schema['layout'][:4] == [1, 2, 3, 4]
+    assert schema['layout'][CANONICAL_COLUMNS.index('المعلم')] == 0
@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.grade_bands import DEFAULT_GRADE_BANDS
+from utils.stats_kernel import compute_statistics, describe
+
+
+def _baseline_stats(df: pd.DataFrame, passing_grade: float = 50) -> dict:
+    """الإحصائيات بطريقة pandas في calculate_basic_stats قبل نواة الإحصائيات"""
+    grades = df['الدرجة']
+    stats = {
+        'count': len(grades),
+        'mean': grades.mean(),
+        'median': grades.median(),
+        'std': grades.std(),
+        'min': grades.min(),
+        'max': grades.max(),
+        'q1': grades.quantile(0.25),
+        'q3': grades.quantile(0.75),
+    }
+    if 'الدرجة الكلية' in df.columns:
+        stats['total_mean'] = df['الدرجة الكلية'].mean()
+        stats['total_max'] = df['الدرجة الكلية'].max()
+        stats['total_min'] = df['الدرجة الكلية'].min()
+    if 'النسبة المئوية' in df.columns:
+        basis, threshold = df['النسبة المئوية'], 50
+        stats['percentage_mean'] = basis.mean()
+        stats['percentage_median'] = basis.median()
+        stats['percentage_std'] = basis.std()
+    else:
+        basis, threshold = grades, passing_grade
+    passing = int((basis >= threshold).sum())
+    stats['pass_rate'] = passing / len(basis) * 100
+    stats['fail_rate'] = 100 - stats['pass_rate']
+    stats['passing_count'] = passing
+    stats['failing_count'] = len(basis) - passing
+    return stats
+
+
+@pytest.fixture
+def grades_df() -> pd.DataFrame:
+    rng = np.random.default_rng(10)
+    n = 5_000
+    grades = rng.integers(0, 61, n).astype(float) / 2
+    return pd.DataFrame({
+        'الدرجة': grades,
+        'الدرجة الكلية': np.full(n, 30.0),
+        'النسبة المئوية': grades / 30 * 100,
+    })
+
+
+@pytest.mark.parametrize('columns', [['الدرجة'], ['الدرجة', 'الدرجة الكلية', 'النسبة المئوية']])
+def test_stats_dict_matches_baseline(grades_df, columns):
+    df = grades_df[columns]
+    stats = compute_statistics(df).to_stats_dict()
+    expected = _baseline_stats(df)
+    
+    assert set(stats) == set(expected)
+    for name, value in expected.items():
+        assert stats[name] == pytest.approx(value, rel=1e-12), name
+
+
+@pytest.mark.parametrize('values', [
+    np.random.default_rng(1).normal(60, 20, 1_001),
+    np.random.default_rng(2).integers(0, 101, 400),
+    [5.0, np.nan, 7.0, 7.0, np.nan, 1.0],
+])
+def test_describe_matches_pandas(values):
+    series = pd.Series(values)
+    result = describe(series)
+    valid = series.dropna()
+    
+    assert result.count == valid.count()
+    assert result.mean == pytest.approx(valid.mean(), rel=1e-12)
+    assert result.std == pytest.approx(valid.std(), rel=1e-12)
+    assert result.var == pytest.approx(valid.var(), rel=1e-12)
+    assert (result.min, result.max) == (valid.min(), valid.max())
+    assert result.skew == pytest.approx(valid.skew(), rel=1e-9, abs=1e-12)
+    assert result.kurtosis == pytest.approx(valid.kurt(), rel=1e-9, abs=1e-12)
+    assert result.mode == valid.mode().iloc[0]
+    for q in (0, 0.1, 0.25, 0.5, 0.75, 0.9, 1):
+        assert result.quantile(q) == pytest.approx(valid.quantile(q), rel=1e-12)
+    for threshold in (valid.min(), valid.median(), 50, valid.max() + 1):
+        assert result.count_at_least(threshold) == int((valid >= threshold).sum())
+
+
+def test_describe_empty_column():
+    result = describe(pd.Series([np.nan, np.nan]))
+    
+    assert result.count == 0
+    for value in (result.mean, result.std, result.min, result.max, result.median, result.quantile(0.3)):
+        assert np.isnan(value)
+    assert result.count_at_least(50) == 0
+    assert len(result.outliers()) == 0
+
+
+def test_describe_all_equal_column():
+    series = pd.Series(np.full(25, 42.0))
+    result = describe(series)
+    
+    assert result.mean == 42.0
+    assert result.std == series.std() == 0.0
+    assert result.skew == series.skew()
+    assert result.kurtosis == series.kurt()
+    assert (result.q1, result.median, result.q3) == (42.0, 42.0, 42.0)
+    assert result.whiskers() == (42.0, 42.0)
+    assert len(result.outliers()) == 0
+
+
+def test_band_and_pass_counts_match_masks(grades_df):
+    result = compute_statistics(grades_df, passing_grade=12)
+    percentages = grades_df['النسبة المئوية']
+    
+    assert result.passing_count == int((percentages >= 50).sum())
+    assert result.grade_passing_count == int((grades_df['الدرجة'] >= 12).sum())
+    classified = DEFAULT_GRADE_BANDS.classify(percentages.to_numpy(), 50)
+    assert result.band_counts == tuple(int(c) for c in classified.counts)
+    assert sum(result.band_counts) == len(grades_df)
+
+
+@pytest.mark.parametrize('values', [
+    np.concatenate([np.random.default_rng(3).normal(70, 8, 500), [5.0, 12.0, 99.0, 100.0]]),
+    np.random.default_rng(4).standard_t(2, 300) * 10 + 50,
+    # قيمتان على حدي القيم الشاذة تماماً (Q1 = 10، Q3 = 20) تبقيان داخل الشاربين
+    [-5.0, 10, 10, 10, 10, 20, 20, 20, 20, 35, 36, np.nan],
+    [3.0, 90.0],
+    [64.0],
+])
+def test_whiskers_and_outliers_match_tukey_reference(values):
+    valid = pd.Series(values).dropna()
+    result = describe(pd.Series(values))
+    
+    # مرجع Tukey بكميات pandas: حدا 1.5 IQR ثم أبعد قيمة فعلية داخل كل حد (كما يرسم go.Box)
+    q1, q3 = valid.quantile(0.25), valid.quantile(0.75)
+    lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    inside = valid[(valid >= lower) & (valid <= upper)]
+    
+    assert result.lower_fence == pytest.approx(lower, rel=1e-12, abs=1e-12)
+    assert result.upper_fence == pytest.approx(upper, rel=1e-12, abs=1e-12)
+    assert result.whiskers() == (inside.min(), inside.max())
+    np.testing.assert_array_equal(result.outliers(), np.sort(valid[(valid < lower) | (valid > upper)].to_numpy()))
+    assert len(result.outliers()) + len(inside) == len(valid)
@@ -0,0 +1,246 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands, classification_basis
+
+# أبعاد المكعب: الأعمدة الفئوية الناتجة عن _clean_data
+CUBE_DIMENSIONS = ['الصف', 'الفصل', 'المادة', 'المعلم', 'المدير']
+
+# مجموعات المخططات المصغرة: (الاسم المعروض، أبعاد التجميع؛ آخرها يجب وجوده)
+FACETS = [
+    ('الفصل', ['الصف', 'الفصل']),
+    ('المادة', ['المادة']),
+    ('المعلم', ['المعلم']),
+]
+
+# المقاييس القابلة للدمج بالجمع في كل خلية
+SUM_MEASURES = ['count', 'sum', 'sumsq', 'passing']
+
+# بادئات أعمدة عدادات النطاقات وفئات المدرج التكراري في جدول الخلايا
+BAND_PREFIX = 'band:'
+BIN_PREFIX = 'bin:'
+
+
+class AggregateCube:
+    """مكعب مجاميع قابلة للدمج لكل تركيبة من الأبعاد تُجاب منه أي شريحة بجمع الخلايا"""
+    
+    def __init__(self, cells: pd.DataFrame):
+        """
+        Args:
+            cells: جدول الخلايا (أعمدة الأبعاد ثم المقاييس) كما يعيده build أو to_frame
+        """
+        self.cells = cells
+        self.dimensions = [c for c in CUBE_DIMENSIONS if c in cells.columns]
+        self.band_columns = [c for c in cells.columns if c.startswith(BAND_PREFIX)]
+        self.bin_columns = [c for c in cells.columns if c.startswith(BIN_PREFIX)]
+        self.band_labels = [c[len(BAND_PREFIX):] for c in self.band_columns]
+        # حدود فئات المدرج التكراري من أسماء الأعمدة ('bin:0-5' ...)
+        bounds = [c[len(BIN_PREFIX):].split('-') for c in self.bin_columns]
+        self.bin_edges = np.array([float(low) for low, _ in bounds] + [float(bounds[-1][1])] if bounds else [])
+    
+    @classmethod
+    def build(cls, df: pd.DataFrame, passing_grade: float = 50,
+              grade_bands: GradeBands = DEFAULT_GRADE_BANDS, bin_width: float = 5) -> 'AggregateCube':
+        """
+        بناء المكعب من الجدول المنظف في تمريرة واحدة
+        
+        Args:
+            df: DataFrame منظف
+            passing_grade: درجة النجاح عند غياب النسبة المئوية
+            grade_bands: جدول نطاقات التقدير
+            bin_width: عرض فئة المدرج التكراري (على مقياس 0-100)
+        
+        Returns:
+            كائن AggregateCube
+        """
+        dimensions = [c for c in CUBE_DIMENSIONS if c in df.columns]
+        grades = df['الدرجة'].to_numpy(dtype=float)
+        values, threshold, _ = classification_basis(df, passing_grade)
+        bands = grade_bands.classify(values, threshold)
+        
+        # رمز الخلية لكل صف
+        if dimensions:
+            grouper = df.groupby(dimensions, observed=True, sort=True, dropna=False)
+            cell_codes = grouper.ngroup().to_numpy()
+            cells = grouper.size().index.to_frame(index=False)
+        else:
+            cell_codes = np.zeros(len(df), dtype=np.intp)
+            cells = pd.DataFrame(index=[0])
+        cell_count = len(cells)
+        
+        cells['count'] = np.bincount(cell_codes, minlength=cell_count)
+        cells['sum'] = np.bincount(cell_codes, weights=grades, minlength=cell_count)
+        cells['sumsq'] = np.bincount(cell_codes, weights=grades * grades, minlength=cell_count)
+        cells['passing'] = np.bincount(cell_codes, weights=bands.passed, minlength=cell_count).astype(np.int64)
+        
+        grade_min = np.full(cell_count, np.inf)
+        grade_max = np.full(cell_count, -np.inf)
+        np.minimum.at(grade_min, cell_codes, grades)
+        np.maximum.at(grade_max, cell_codes, grades)
+        cells['min'] = grade_min
+        cells['max'] = grade_max
+        
+        band_count = len(grade_bands.labels)
+        band_matrix = np.bincount(cell_codes * band_count + bands.codes, minlength=cell_count * band_count)
+        for i, label in enumerate(grade_bands.labels):
+            cells[f"{BAND_PREFIX}{label}"] = band_matrix.reshape(cell_count, band_count)[:, i]
+        
+        # المدرج التكراري على نفس مقياس التصنيف (النسبة المئوية أو الدرجة من 100)
+        edges = np.arange(0, 100 + bin_width, bin_width)
+        bin_count = len(edges) - 1
+        values = np.asarray(values, dtype=float)
+        bin_codes = np.clip(np.floor(np.nan_to_num(values) / bin_width), 0, bin_count - 1)
+        # القيم المفقودة لا تُحسب في أي فئة (nan_to_num يضعها في الفئة الأولى)
+        bin_matrix = np.bincount(cell_codes * bin_count + bin_codes.astype(np.intp), weights=~np.isnan(values),
+                                 minlength=cell_count * bin_count).astype(np.int64)
+        for i in range(bin_count):
+            cells[f"{BIN_PREFIX}{edges[i]:g}-{edges[i + 1]:g}"] = bin_matrix.reshape(cell_count, bin_count)[:, i]
+        
+        return cls(cells)
+    
+    def to_frame(self) -> pd.DataFrame:
+        """جدول الخلايا للحفظ في ذاكرة التخزين المؤقت"""
+        return self.cells
+    
+    def options(self, dimension: str, filters: Optional[Dict] = None) -> List:
+        """
+        القيم المتاحة لبعد ضمن شريحة
+        
+        Args:
+            dimension: اسم البعد
+            filters: {البعد: قيمة أو قائمة قيم}
+        
+        Returns:
+            قائمة القيم مرتبة
+        """
+        cells = self.cells[self._mask(filters)]
+        return sorted(pd.unique(cells[dimension].astype(str)))
+    
+    def slice(self, filters: Optional[Dict] = None) -> Dict:
+        """
+        إحصائيات شريحة بجمع خلاياها
+        
+        Args:
+            filters: {البعد: قيمة أو قائمة قيم}؛ الأبعاد غير المذكورة تُجمع كاملة
+        
+        Returns:
+            قاموس: count, mean, std, min, max, passing_count, pass_rate, fail_rate
+        """
+        totals = self.cells[self._mask(filters)]
+        return self._summarize(
+            totals[SUM_MEASURES].to_numpy().sum(axis=0),
+            totals['min'].min() if len(totals) else np.nan,
+            totals['max'].max() if len(totals) else np.nan,
+        )
+    
+    def group_by(self, dimensions: Sequence[str], filters: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        إحصائيات كل تركيبة من الأبعاد المحددة ضمن شريحة
+        
+        Args:
+            dimensions: أبعاد التجميع
+            filters: {البعد: قيمة أو قائمة قيم}
+        
+        Returns:
+            DataFrame بأعمدة الأبعاد ثم عدد الطلاب والمتوسط والانحراف ونسبة النجاح والنطاقات
+        """
+        cells = self.cells[self._mask(filters)]
+        grouped = cells.groupby(list(dimensions), observed=True, sort=True)
+        sums = grouped[SUM_MEASURES + self.band_columns].sum()
+        
+        count = sums['count'].to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = sums['sum'] / count
+            variance = (sums['sumsq'] - sums['sum'] * mean) / (count - 1)
+        
+        result = pd.DataFrame({
+            'عدد الطلاب': sums['count'].astype(int),
+            'المتوسط': mean,
+            'الانحراف المعياري': np.sqrt(variance.clip(lower=0)).where(count > 1),
+            'أقل درجة': grouped['min'].min(),
+            'أعلى درجة': grouped['max'].max(),
+            'نسبة النجاح %': sums['passing'] / count * 100,
+        })
+        result[self.band_labels] = sums[self.band_columns].to_numpy()
+        return result.reset_index()
+    
+    def group_histograms(self, dimensions: Sequence[str], filters: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        المدرج التكراري لكل تركيبة من الأبعاد المحددة بتجميع واحد لخلايا المكعب
+        
+        Args:
+            dimensions: أبعاد التجميع
+            filters: {البعد: قيمة أو قائمة قيم}
+        
+        Returns:
+            DataFrame مفهرس بأعمدة الأبعاد (بنفس ترتيب group_by) بعمود لكل فئة
+        """
+        cells = self.cells[self._mask(filters)]
+        histograms = cells.groupby(list(dimensions), observed=True, sort=True)[self.bin_columns].sum()
+        histograms.columns = [c[len(BIN_PREFIX):] for c in self.bin_columns]
+        return histograms.astype(int)
+    
+    def band_summary(self, filters: Optional[Dict] = None, unit: str = '', grade_bands: GradeBands = DEFAULT_GRADE_BANDS) -> pd.DataFrame:
+        """
+        توزيع النطاقات لشريحة بشكل DataProcessor.categorize_grades (لمخطط الأعمدة)
+        
+        Args:
+            filters: {البعد: قيمة أو قائمة قيم}
+            unit: '%' للنسبة المئوية أو '' للدرجة
+            grade_bands: جدول النطاقات الذي بُني به المكعب
+        
+        Returns:
+            DataFrame بأعمدة النطاق وعدد الطلاب والنسبة %
+        """
+        counts = self.cells.loc[self._mask(filters), self.band_columns].to_numpy().sum(axis=0)
+        return grade_bands.summary([int(c) for c in counts], unit)
+    
+    def histogram(self, filters: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        المدرج التكراري بفئات ثابتة لشريحة
+        
+        Args:
+            filters: {البعد: قيمة أو قائمة قيم}
+        
+        Returns:
+            DataFrame بأعمدة الفئة وعدد الطلاب
+        """
+        counts = self.cells.loc[self._mask(filters), self.bin_columns].to_numpy().sum(axis=0)
+        return pd.DataFrame({
+            'الفئة': [c[len(BIN_PREFIX):] for c in self.bin_columns],
+            'عدد الطلاب': counts.astype(int),
+        })
+    
+    def _mask(self, filters: Optional[Dict]) -> np.ndarray:
+        """قناع الخلايا المطابقة للمرشحات"""
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dimension, selected in (filters or {}).items():
+            if selected is None or dimension not in self.cells.columns:
+                continue
+            if not isinstance(selected, (list, tuple, set)):
+                selected = [selected]
+            if selected:
+                mask &= self.cells[dimension].astype(str).isin([str(v) for v in selected]).to_numpy()
+        return mask
+    
+    @staticmethod
+    def _summarize(totals: np.ndarray, grade_min: float, grade_max: float) -> Dict:
+        """تحويل المجاميع إلى إحصائيات"""
+        count, total, total_sq, passing = totals
+        count = int(count)
+        mean = total / count if count else np.nan
+        variance = (total_sq - total * mean) / (count - 1) if count > 1 else np.nan
+        pass_rate = passing / count * 100 if count else 0.0
+        return {
+            'count': count,
+            'mean': mean,
+            'std': float(np.sqrt(max(variance, 0.0))) if count > 1 else np.nan,
+            'min': grade_min,
+            'max': grade_max,
+            'passing_count': int(passing),
+            'failing_count': count - int(passing),
+            'pass_rate': pass_rate,
+            'fail_rate': 100 - pass_rate,
+        }
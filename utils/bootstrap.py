@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import classification_basis
+
+# مجموعات المقارنة: (الاسم المعروض، أعمدة التجميع، العمود الذي يجب وجوده)
+COMPARISONS = [
+    ('المعلم', ['المعلم'], 'المعلم'),
+    ('الفصل', ['الصف', 'الفصل'], 'الفصل'),
+]
+
+# أعمدة جدول فترات الثقة (بعد أعمدة التجميع)
+INTERVAL_COLUMNS = ['عدد الطلاب', 'المتوسط', 'الحد الأدنى للمتوسط', 'الحد الأعلى للمتوسط',
+                    'نسبة النجاح %', 'الحد الأدنى للنجاح %', 'الحد الأعلى للنجاح %']
+
+# أقصى عدد عناصر في مصفوفة إعادة المعاينة الواحدة (تُقسم التكرارات على دفعات بعده)
+_BATCH_ELEMENTS = 1 << 22
+
+# تُسحب تكرارات القيم المختلفة (multinomial) بدلاً من الفهارس عندما يتجاوز حجم المجموعة
+# عدد قيمها المختلفة بهذه النسبة (سحب multinomial أبطأ لكل عنصر بنحو هذا القدر)
+_MULTINOMIAL_RATIO = 16
+
+# حجم العمل (عينات × طلاب) الذي يبدأ عنده التوزيع على عمليات متعددة
+_PARALLEL_WORK = 20_000_000
+
+
+def bootstrap_intervals(df: pd.DataFrame, columns: Sequence[str], passing_grade: float = 50,
+                        n_resamples: int = 10000, confidence: float = 0.95, seed: int = 0,
+                        max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    فترات ثقة bootstrap لمتوسط كل مجموعة ونسبة نجاحها
+    
+    لكل مجموعة تُسحب جميع العينات دفعة واحدة كمصفوفة فهارس عشوائية، وفي المجموعات
+    الكبيرة ذات الدرجات المتكررة كمصفوفة تكرارات للقيم المختلفة (multinomial) وهي
+    مكافئة تماماً لإعادة المعاينة بالإرجاع. نسبة النجاح تُسحب مباشرة من توزيع ذي
+    الحدين المكافئ لها. الفترة بطريقة المئينات،
+    وتوزع المجموعات على عمليات متعددة عندما يكون العمل كبيراً. لكل مجموعة بذرة
+    مشتقة من seed فالنتيجة لا تتغير بتغير عدد العمليات.
+    
+    Args:
+        df: DataFrame منظف
+        columns: أعمدة التجميع
+        passing_grade: درجة النجاح عند غياب النسبة المئوية
+        n_resamples: عدد العينات لكل مجموعة
+        confidence: مستوى الثقة
+        seed: البذرة العشوائية
+        max_workers: أقصى عدد عمليات (الافتراضي عدد المعالجات)
+    
+    Returns:
+        DataFrame بأعمدة التجميع ثم INTERVAL_COLUMNS مرتب حسب المتوسط تنازلياً
+    """
+    columns = [c for c in columns if c in df.columns]
+    values, threshold, _ = classification_basis(df, passing_grade)
+    values = np.asarray(values, dtype=float)
+    
+    keys = []
+    groups = []
+    for key, positions in df.groupby(columns, observed=True, sort=True).indices.items():
+        group_values = values[positions]
+        group_values = group_values[~np.isnan(group_values)]
+        if len(group_values):
+            keys.append(key if isinstance(key, tuple) else (key,))
+            groups.append(group_values)
+    
+    if not groups:
+        return pd.DataFrame(columns=columns + INTERVAL_COLUMNS)
+    
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+    alpha = (1 - confidence) / 2
+    
+    work = n_resamples * sum(len(g) for g in groups)
+    workers = min(max_workers or os.cpu_count() or 1, len(groups))
+    if workers <= 1 or work < _PARALLEL_WORK:
+        rows = _bootstrap_groups(groups, seeds, threshold, n_resamples, alpha)
+    else:
+        # تقسيم المجموعات على العمليات بالتناوب لموازنة الأحجام
+        chunks = [list(range(worker, len(groups), workers)) for worker in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _bootstrap_groups,
+                [[groups[i] for i in chunk] for chunk in chunks],
+                [[seeds[i] for i in chunk] for chunk in chunks],
+                [threshold] * workers,
+                [n_resamples] * workers,
+                [alpha] * workers
+            ))
+        rows = [None] * len(groups)
+        for chunk, chunk_rows in zip(chunks, results):
+            for i, row in zip(chunk, chunk_rows):
+                rows[i] = row
+    
+    result = pd.DataFrame(keys, columns=columns)
+    result[INTERVAL_COLUMNS] = np.array(rows)
+    result['عدد الطلاب'] = result['عدد الطلاب'].astype(int)
+    result[INTERVAL_COLUMNS[1:]] = result[INTERVAL_COLUMNS[1:]].round(2)
+    return result.sort_values('المتوسط', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def _bootstrap_groups(groups: List[np.ndarray], seeds: List[np.random.SeedSequence], threshold: float,
+                      n_resamples: int, alpha: float) -> List[Tuple]:
+    """
+    فترات الثقة لقائمة مجموعات (تعمل داخل عملية منفصلة)
+    
+    Returns:
+        صف لكل مجموعة بترتيب INTERVAL_COLUMNS
+    """
+    rows = []
+    for values, seed in zip(groups, seeds):
+        rng = np.random.default_rng(seed)
+        means, rates = _resample(values, threshold, n_resamples, rng)
+        mean_low, mean_high = np.quantile(means, [alpha, 1 - alpha])
+        rate_low, rate_high = np.quantile(rates, [alpha, 1 - alpha])
+        rows.append((len(values), values.mean(), mean_low, mean_high,
+                     (values >= threshold).mean() * 100, rate_low * 100, rate_high * 100))
+    return rows
+
+
+def _resample(values: np.ndarray, threshold: float, n_resamples: int,
+              rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """متوسط ونسبة نجاح كل عينة bootstrap لمجموعة واحدة"""
+    n = len(values)
+    # عدد الناجحين في عينة بالإرجاع توزيعه ذو الحدين تماماً
+    rates = rng.binomial(n, (values >= threshold).mean(), size=n_resamples) / n
+    
+    distinct, counts = np.unique(values, return_counts=True)
+    if len(distinct) * _MULTINOMIAL_RATIO < n:
+        # مجموعة كبيرة بقيم متكررة: مصفوفة تكرارات القيم المختلفة (عينات × قيم مختلفة)
+        resampled = rng.multinomial(n, counts / n, size=n_resamples)
+        return resampled @ distinct / n, rates
+    
+    # مصفوفة فهارس (عينات × طلاب) على دفعات محدودة الحجم
+    means = np.empty(n_resamples)
+    batch = max(1, _BATCH_ELEMENTS // n)
+    for start in range(0, n_resamples, batch):
+        stop = min(start + batch, n_resamples)
+        means[start:stop] = values[rng.integers(0, n, size=(stop - start, n))].mean(axis=1)
+    return means, rates
@@ -1,13 +1,31 @@
 import plotly.graph_objects as go
 import plotly.express as px
+import plotly.io as pio
+from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.downsample import lttb
+from utils.result_cache import ResultCache
+from utils.stats_kernel import Distribution, describe
+
+# قالب التنسيق المشترك لجميع المخططات (خلفية بيضاء، خط عربي، عنوان في الوسط، تلميحات لليمين)
+LAYOUT_TEMPLATE = go.layout.Template(pio.templates['plotly_white'])
+LAYOUT_TEMPLATE.layout.update(
+    font=dict(family="Arial", size=12),
+    title=dict(x=0.5),
+    hoverlabel=dict(align='right')
+)
 
 class ChartGenerator:
     """مولد المخططات البيانية التفاعلية"""
     
-    def __init__(self):
+    def __init__(self, figures: Optional[ResultCache] = None):
+        """
+        Args:
+            figures: ذاكرة المخططات المحفوظة بصيغة JSON (اختيارية)
+        """
+        self.figures = figures
         # الألوان المستخدمة في المخططات
         self.colors = {
             'primary': '#1f77b4',
@@ -18,12 +36,42 @@ class ChartGenerator:
             'purple': '#9467bd'
         }
     
-    def create_histogram(self, df: pd.DataFrame) -> go.Figure:
+    def cached(self, key: Optional[str], name: str, build: Callable[..., go.Figure], *args, **kwargs) -> go.Figure:
+        """
+        مخطط من ذاكرة المخططات أو بناؤه وحفظه بصيغة JSON
+        
+        Args:
+            key: بصمة البيانات ومعاملات التحليل (None لبناء المخطط دون ذاكرة)
+            name: نوع المخطط ومعاملاته، مثل 'histogram' أو 'box'
+            build: دالة بناء المخطط
+            *args: معاملات build
+            **kwargs: معاملات build المسماة
+        
+        Returns:
+            Plotly Figure (نسخة جديدة من JSON المحفوظ عند وجوده)
+        """
+        if self.figures is None or key is None:
+            return build(*args, **kwargs)
+        
+        spec = self.figures.get(key, name)
+        if spec is None:
+            spec = build(*args, **kwargs).to_json()
+            self.figures.put(key, name, spec)
+        return pio.from_json(spec)
+    
+    def create_histogram(self, df: pd.DataFrame, stats: Optional[Dict] = None,
+                         bins: Optional[Tuple[np.ndarray, np.ndarray]] = None, bin_width: float = 5) -> go.Figure:
         """
         إنشاء مخطط هستوجرام لتوزيع الدرجات أو النسب المئوية
         
+        تُحسب الفئات في الخادم ويُرسل عمود لكل فئة فقط، فيبقى حجم المخطط بعدد
+        الفئات لا بعدد الطلاب.
+        
         Args:
             df: DataFrame يحتوي على البيانات
+            stats: قاموس الإحصائيات المحسوب مسبقاً (لتجنب إعادة حساب المتوسط)
+            bins: (عدد الطلاب لكل فئة، حدود الفئات) محسوبة مسبقاً، مثل مدرج مكعب المجاميع
+            bin_width: عرض الفئة عند حسابها من البيانات
             
         Returns:
             Plotly Figure
@@ -33,7 +81,7 @@ class ChartGenerator:
         # استخدام النسبة المئوية إن وجدت، وإلا استخدام الدرجة
         if 'النسبة المئوية' in df.columns:
             data_column = df['النسبة المئوية']
-            mean_value = data_column.mean()
+            mean_value = stats['percentage_mean'] if stats and 'percentage_mean' in stats else data_column.mean()
             title = "📊 توزيع النسب المئوية للطلاب"
             x_title = "النسبة المئوية (%)"
             success_line = 50
@@ -41,23 +89,17 @@ class ChartGenerator:
             mean_text = f"المتوسط: {mean_value:.1f}%"
         else:
             data_column = df['الدرجة']
-            mean_value = data_column.mean()
+            mean_value = stats['mean'] if stats else data_column.mean()
             title = "📊 توزيع درجات الطلاب"
             x_title = "الدرجة"
             success_line = 50
             success_text = "درجة النجاح: 50"
             mean_text = f"المتوسط: {mean_value:.1f}"
         
-        fig.add_trace(go.Histogram(
-            x=data_column,
-            nbinsx=20,
-            name='توزيع الدرجات',
-            marker_color=self.colors['primary'],
-            opacity=0.7,
-            text=[],
-            texttemplate='%{y}',
-            textposition='outside'
-        ))
+        if bins is None:
+            bins = self._bin_values(data_column.to_numpy(dtype=float), bin_width)
+        counts, edges = bins
+        fig.add_trace(self._histogram_bar(counts, edges, 'توزيع الدرجات'))
         
         # إضافة خط المتوسط
         fig.add_vline(
@@ -82,13 +124,46 @@ class ChartGenerator:
             xaxis_title=x_title,
             yaxis_title="عدد الطلاب",
             showlegend=False,
-            template="plotly_white",
-            font=dict(family="Arial", size=12),
-            title_x=0.5
+            template=LAYOUT_TEMPLATE,
+            bargap=0
         )
         
         return fig
     
+    @staticmethod
+    def _bin_values(values: np.ndarray, bin_width: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        فئات بعرض ثابت تبدأ من 0 وتغطي 100 (تُمد عند وجود قيم خارجها)، والفئة الأخيرة مغلقة
+        
+        Returns:
+            (عدد القيم لكل فئة، حدود الفئات)
+        """
+        values = values[~np.isnan(values)]
+        low = min(0.0, np.floor(values.min() / bin_width) * bin_width) if len(values) else 0.0
+        high = max(100.0, np.ceil(values.max() / bin_width) * bin_width) if len(values) else 100.0
+        edges = np.arange(low, high + bin_width / 2, bin_width)
+        counts, edges = np.histogram(values, bins=edges)
+        return counts, edges
+    
+    def _histogram_bar(self, counts: np.ndarray, edges: np.ndarray, name: str) -> go.Bar:
+        """عمود لكل فئة بعرضها الفعلي بدلاً من go.Histogram على القيم الخام"""
+        edges = np.asarray(edges, dtype=float)
+        counts = np.asarray(counts, dtype=int)
+        return go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            name=name,
+            marker_color=self.colors['primary'],
+            opacity=0.7,
+            text=counts,
+            textposition='outside',
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            hovertemplate='%{customdata[0]:g} - %{customdata[1]:g}<br>' +
+                         'عدد الطلاب: %{y}<br>' +
+                         '<extra></extra>'
+        )
+    
     def create_pie_chart(self, stats: Dict) -> go.Figure:
         """
         إنشاء مخطط دائري لنسب النجاح والرسوب
@@ -118,9 +193,7 @@ class ChartGenerator:
         
         fig.update_layout(
             title="🥧 نسبة النجاح والرسوب",
-            template="plotly_white",
-            font=dict(family="Arial", size=12),
-            title_x=0.5,
+            template=LAYOUT_TEMPLATE,
             annotations=[dict(text=f'{len(values)} طالب', x=0.5, y=0.5, font_size=16, showarrow=False)]
         )
         
@@ -164,39 +237,63 @@ class ChartGenerator:
             title="📊 توزيع الطلاب حسب النطاقات",
             xaxis_title="النطاق",
             yaxis_title="عدد الطلاب",
-            template="plotly_white",
-            font=dict(family="Arial", size=12),
-            title_x=0.5,
+            template=LAYOUT_TEMPLATE,
             xaxis_tickangle=-45
         )
         
         return fig
     
-    def create_box_plot(self, df: pd.DataFrame) -> go.Figure:
+    def create_box_plot(self, df: pd.DataFrame, stats: Optional[Dict] = None,
+                        grades: Optional[Distribution] = None) -> go.Figure:
         """
         إنشاء مخطط صندوقي لتحليل البيانات
         
+        يُرسم الصندوق من الربيعيات المحسوبة مسبقاً (q1/median/q3 ونهايتي الشاربين)
+        ولا تُرسل إلا القيم الشاذة (قيمة واحدة لكل درجة مع عدد الطلاب)، فيبقى حجم
+        المخطط صغيراً مهما كان عدد الطلاب.
+        
         Args:
             df: DataFrame يحتوي على البيانات
+            stats: قاموس الإحصائيات المحسوب مسبقاً (للمتوسط)
+            grades: توزيع الدرجات المرتب من DataProcessor.compute_statistics إن كان محسوباً
             
         Returns:
             Plotly Figure
         """
+        if grades is None:
+            grades = describe(df['الدرجة'])
+        lower_whisker, upper_whisker = grades.whiskers()
+        name = "درجات الطلاب"
+        
         fig = go.Figure()
         
         fig.add_trace(go.Box(
-            y=df['الدرجة'],
-            name="درجات الطلاب",
+            x=[name],
+            q1=[grades.q1],
+            median=[grades.median],
+            q3=[grades.q3],
+            lowerfence=[lower_whisker],
+            upperfence=[upper_whisker],
+            name=name,
             marker_color=self.colors['primary'],
-            boxpoints='outliers',
-            jitter=0.3,
-            pointpos=-1.8,
-            hoveron='points',
-            hovertemplate='الدرجة: %{y}<br><extra></extra>'
+            boxpoints=False
         ))
         
+        outlier_values, outlier_counts = np.unique(grades.outliers(), return_counts=True)
+        if len(outlier_values):
+            fig.add_trace(go.Scatter(
+                x=[name] * len(outlier_values),
+                y=outlier_values,
+                mode='markers',
+                marker=dict(color=self.colors['primary'], size=6),
+                customdata=outlier_counts,
+                hovertemplate='الدرجة: %{y}<br>' +
+                             'عدد الطلاب: %{customdata}<br>' +
+                             '<extra></extra>'
+            ))
+        
         # إضافة خطوط مرجعية
-        mean_grade = df['الدرجة'].mean()
+        mean_grade = stats['mean'] if stats else grades.mean
         fig.add_hline(
             y=mean_grade,
             line_dash="dash",
@@ -216,49 +313,339 @@ class ChartGenerator:
         fig.update_layout(
             title="📦 المخطط الصندوقي للدرجات",
             yaxis_title="الدرجة",
-            template="plotly_white",
-            font=dict(family="Arial", size=12),
-            title_x=0.5,
+            template=LAYOUT_TEMPLATE,
             showlegend=False
         )
         
         return fig
     
-    def create_grade_distribution_line(self, df: pd.DataFrame) -> go.Figure:
+    def create_quantile_box_plot(self, summaries: Dict[str, Dict]) -> go.Figure:
         """
-        إنشاء مخطط خطي لتوزيع الدرجات
+        إنشاء مخطط صندوقي من كميات محسوبة مسبقاً (صندوق لكل مجموعة) دون القيم الخام
         
         Args:
-            df: DataFrame يحتوي على البيانات
+            summaries: {اسم المجموعة: قاموس بمفاتيح q1, median, q3, mean, lower_fence, upper_fence}
+        
+        Returns:
+            Plotly Figure
+        """
+        names = list(summaries)
+        boxes = [summaries[name] for name in names]
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Box(
+            x=names,
+            q1=[box['q1'] for box in boxes],
+            median=[box['median'] for box in boxes],
+            q3=[box['q3'] for box in boxes],
+            mean=[box['mean'] for box in boxes],
+            lowerfence=[box['lower_fence'] for box in boxes],
+            upperfence=[box['upper_fence'] for box in boxes],
+            name="درجات الطلاب",
+            marker_color=self.colors['primary'],
+            boxpoints=False
+        ))
+        
+        fig.add_hline(
+            y=50,
+            line_dash="dot",
+            line_color=self.colors['warning'],
+            annotation_text="درجة النجاح: 50",
+            annotation_position="left"
+        )
+        
+        fig.update_layout(
+            title="📦 المخطط الصندوقي للدرجات حسب المدرسة",
+            yaxis_title="الدرجة",
+            template=LAYOUT_TEMPLATE,
+            showlegend=False
+        )
+        
+        return fig
+    
+    def create_facet_overview(self, labels: List[str], histograms: np.ndarray, edges: np.ndarray,
+                              columns: int = 4) -> go.Figure:
+        """
+        شبكة مصغرات لتوزيع كل مجموعة في مخطط WebGL واحد
+        
+        Args:
+            labels: تسمية كل مجموعة
+            histograms: مصفوفة (مجموعات × فئات) لعدد الطلاب
+            edges: حدود الفئات
+            columns: عدد المصغرات في كل صف
             
         Returns:
             Plotly Figure
         """
-        # ترتيب البيانات حسب الدرجة
-        sorted_df = df.sort_values('الدرجة').reset_index(drop=True)
-        sorted_df['الترتيب'] = range(1, len(sorted_df) + 1)
+        columns = max(1, min(columns, len(labels)))
+        rows = max(1, -(-len(labels) // columns))
+        fig = make_subplots(rows=rows, cols=columns, subplot_titles=labels,
+                            horizontal_spacing=0.03, vertical_spacing=min(0.08, 0.3 / rows))
+        
+        traces = []
+        for i, counts in enumerate(histograms):
+            traces.append(go.Scattergl(
+                x=edges,
+                y=np.append(counts, counts[-1]),
+                mode='lines',
+                line=dict(color=self.colors['primary'], width=1, shape='hv'),
+                fill='tozeroy',
+                name=labels[i],
+                hovertemplate=f'<b>{labels[i]}</b><br>' +
+                             'من %{x:g}: %{y} طالب<br>' +
+                             '<extra></extra>'
+            ))
+        positions = range(len(traces))
+        fig.add_traces(traces, rows=[i // columns + 1 for i in positions], cols=[i % columns + 1 for i in positions])
+        
+        fig.update_xaxes(showticklabels=False, range=[edges[0], edges[-1]])
+        fig.update_yaxes(showticklabels=False)
+        fig.update_annotations(font_size=11)
+        fig.update_layout(
+            title="🧩 نظرة عامة على توزيع المجموعات",
+            height=140 * rows + 100,
+            showlegend=False,
+            margin=dict(l=20, r=20, t=80, b=20),
+            template=LAYOUT_TEMPLATE
+        )
+        
+        return fig
+    
+    def create_facet_histogram(self, label: str, counts: np.ndarray, edges: np.ndarray, unit: str = '') -> go.Figure:
+        """
+        هستوجرام مجموعة واحدة من فئات محسوبة مسبقاً
+        
+        Args:
+            label: تسمية المجموعة
+            counts: عدد الطلاب لكل فئة
+            edges: حدود الفئات
+            unit: '%' للنسبة المئوية أو '' للدرجة
+        
+        Returns:
+            Plotly Figure
+        """
+        fig = go.Figure()
+        
+        fig.add_trace(self._histogram_bar(counts, edges, label))
+        
+        fig.add_vline(
+            x=50,
+            line_dash="dot",
+            line_color=self.colors['warning'],
+            annotation_text=f"النجاح: 50{unit}",
+            annotation_position="bottom"
+        )
+        
+        fig.update_layout(
+            title=f"📊 توزيع {label}",
+            xaxis_title="النسبة المئوية (%)" if unit else "الدرجة",
+            yaxis_title="عدد الطلاب",
+            showlegend=False,
+            template=LAYOUT_TEMPLATE,
+            bargap=0
+        )
+        
+        return fig
+    
+    def create_interval_chart(self, intervals: pd.DataFrame, columns: List[str], metric: str = 'المتوسط',
+                              reference: Optional[float] = None) -> go.Figure:
+        """
+        إنشاء مخطط فترات الثقة لكل مجموعة (نقطة للقيمة وخط للفترة)
+        
+        Args:
+            intervals: جدول فترات الثقة من get_bootstrap_intervals
+            columns: أعمدة التجميع المستخدمة كتسميات
+            metric: 'المتوسط' أو 'نسبة النجاح %'
+            reference: قيمة مرجعية تُرسم كخط عمودي (مثل متوسط المدرسة)
+        
+        Returns:
+            Plotly Figure
+        """
+        if metric == 'المتوسط':
+            low, high = intervals['الحد الأدنى للمتوسط'], intervals['الحد الأعلى للمتوسط']
+        else:
+            low, high = intervals['الحد الأدنى للنجاح %'], intervals['الحد الأعلى للنجاح %']
+        value = intervals[metric]
+        labels = intervals[columns].astype(str).agg(' '.join, axis=1)
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Scatter(
+            x=value,
+            y=labels,
+            mode='markers',
+            marker=dict(color=self.colors['primary'], size=8),
+            error_x=dict(type='data', symmetric=False, array=high - value, arrayminus=value - low,
+                         color=self.colors['primary'], thickness=2),
+            customdata=np.column_stack([low, high, intervals['عدد الطلاب']]),
+            hovertemplate='<b>%{y}</b><br>' +
+                         f'{metric}: ' + '%{x:.2f}<br>' +
+                         'الفترة: %{customdata[0]:.2f} – %{customdata[1]:.2f}<br>' +
+                         'عدد الطلاب: %{customdata[2]}<br>' +
+                         '<extra></extra>'
+        ))
+        
+        if reference is not None:
+            fig.add_vline(
+                x=reference,
+                line_dash="dash",
+                line_color=self.colors['danger'],
+                annotation_text=f"المدرسة: {reference:.1f}",
+                annotation_position="top"
+            )
+        
+        fig.update_layout(
+            title=f"📏 فترات الثقة 95% ({metric}) حسب {' و'.join(columns)}",
+            xaxis_title=metric,
+            yaxis=dict(autorange='reversed', type='category'),
+            height=max(400, 22 * len(intervals) + 150),
+            showlegend=False,
+            template=LAYOUT_TEMPLATE
+        )
+        
+        return fig
+    
+    def create_trend_chart(self, summary: pd.DataFrame, classes: pd.DataFrame, terms: List[str]) -> go.Figure:
+        """
+        إنشاء مخطط خطي لمتوسط كل فصل عبر الفصول الدراسية مع المتوسط العام
         
+        Args:
+            summary: ملخص الفصول الدراسية (عمودا 'الفصل الدراسي' و'المتوسط')
+            classes: جدول الفصول بعمود متوسط لكل فصل دراسي
+            terms: أسماء الفصول الدراسية بالترتيب الزمني
+        
+        Returns:
+            Plotly Figure
+        """
         fig = go.Figure()
         
+        label_columns = [c for c in ['الصف', 'الفصل'] if c in classes.columns]
+        for _, row in classes.iterrows():
+            label = ' '.join(str(row[c]) for c in label_columns)
+            fig.add_trace(go.Scatter(
+                x=terms,
+                y=[row[term] for term in terms],
+                mode='lines+markers',
+                name=label,
+                opacity=0.6,
+                hovertemplate=f'<b>{label}</b><br>' +
+                             '%{x}: %{y:.2f}<br>' +
+                             '<extra></extra>'
+            ))
+        
         fig.add_trace(go.Scatter(
-            x=sorted_df['الترتيب'],
-            y=sorted_df['الدرجة'],
+            x=summary['الفصل الدراسي'],
+            y=summary['المتوسط'],
             mode='lines+markers',
-            name='توزيع الدرجات',
-            line=dict(color=self.colors['primary'], width=2),
-            marker=dict(size=4),
-            hovertemplate='الترتيب: %{x}<br>' +
-                         'الدرجة: %{y}<br>' +
+            name='المتوسط العام',
+            line=dict(color=self.colors['danger'], width=4),
+            marker=dict(size=10),
+            hovertemplate='<b>المتوسط العام</b><br>' +
+                         '%{x}: %{y:.2f}<br>' +
                          '<extra></extra>'
         ))
         
+        fig.update_layout(
+            title="📈 تطور المتوسط عبر الفصول الدراسية",
+            xaxis_title="الفصل الدراسي",
+            yaxis_title="المتوسط",
+            template=LAYOUT_TEMPLATE
+        )
+        
+        return fig
+    
+    def create_change_histogram(self, students: pd.DataFrame) -> go.Figure:
+        """
+        إنشاء هستوجرام لتغير درجات الطلاب بين أول وآخر فصل دراسي
+        
+        Args:
+            students: جدول الطلاب بعمود 'التغير'
+        
+        Returns:
+            Plotly Figure
+        """
+        changes = students['التغير'].dropna().to_numpy(dtype=float)
+        counts, edges = np.histogram(changes, bins=40)
+        
+        fig = go.Figure()
+        
+        fig.add_trace(self._histogram_bar(counts, edges, 'التغير'))
+        
+        fig.add_vline(
+            x=0,
+            line_dash="dot",
+            line_color=self.colors['warning'],
+            annotation_text="دون تغير",
+            annotation_position="top"
+        )
+        
+        fig.update_layout(
+            title="📊 توزيع تغير الطلاب بين أول وآخر فصل دراسي",
+            xaxis_title="التغير",
+            yaxis_title="عدد الطلاب",
+            showlegend=False,
+            template=LAYOUT_TEMPLATE,
+            bargap=0
+        )
+        
+        return fig
+    
+    def create_grade_distribution_line(self, df: pd.DataFrame, grades: Optional[Distribution] = None,
+                                       max_points: int = 2000) -> go.Figure:
+        """
+        إنشاء مخطط خطي لتوزيع الدرجات
+        
+        الدرجات المرتبة تؤخذ من توزيع الدرجات المحسوب في الإحصائيات دون إعادة
+        ترتيب الجدول. إذا تجاوز عدد الطلاب max_points يُقلَّص المنحنى بخوارزمية
+        LTTB مع الحفاظ على شكله ويُرسم بـ WebGL (Scattergl).
+        
+        Args:
+            df: DataFrame يحتوي على البيانات
+            grades: توزيع الدرجات من DataProcessor.compute_statistics (لإعادة استخدام الدرجات المرتبة)
+            max_points: أقصى عدد نقاط يُرسل إلى المتصفح
+        
+        Returns:
+            Plotly Figure
+        """
+        # الدرجات مرتبة تصاعدياً
+        if grades is not None:
+            grades = grades.sorted_values.astype(float, copy=False)
+        else:
+            grades = np.sort(df['الدرجة'].dropna().to_numpy(dtype=float))
+        ranks = np.arange(1, len(grades) + 1)
+        
+        fig = go.Figure()
+        
+        hovertemplate = ('الترتيب: %{x}<br>' +
+                         'الدرجة: %{y}<br>' +
+                         '<extra></extra>')
+        if len(grades) > max_points:
+            selected = lttb(ranks, grades, max_points)
+            fig.add_trace(go.Scattergl(
+                x=ranks[selected],
+                y=grades[selected],
+                mode='lines',
+                name='توزيع الدرجات',
+                line=dict(color=self.colors['primary'], width=2),
+                hovertemplate=hovertemplate
+            ))
+        else:
+            fig.add_trace(go.Scatter(
+                x=ranks,
+                y=grades,
+                mode='lines+markers',
+                name='توزيع الدرجات',
+                line=dict(color=self.colors['primary'], width=2),
+                marker=dict(size=4),
+                hovertemplate=hovertemplate
+            ))
+        
         fig.update_layout(
             title="📈 منحنى توزيع الدرجات",
             xaxis_title="ترتيب الطالب",
             yaxis_title="الدرجة",
-            template="plotly_white",
-            font=dict(family="Arial", size=12),
-            title_x=0.5,
+            template=LAYOUT_TEMPLATE,
             showlegend=False
         )
         
@@ -296,9 +683,7 @@ class ChartGenerator:
             title="📊 مقارنة الإحصائيات الأساسية",
             xaxis_title="الإحصائية",
             yaxis_title="القيمة",
-            template="plotly_white",
-            font=dict(family="Arial", size=12),
-            title_x=0.5,
+            template=LAYOUT_TEMPLATE,
             showlegend=False
         )
         
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - مطلوب لكتابة وقراءة Parquet
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+
+class DataCache:
+    """ذاكرة تخزين مؤقت للبيانات المنظفة مفهرسة بمحتوى الملف ومعاملات التنظيف"""
+    
+    def __init__(self, max_entries: int = 8, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            max_entries: الحد الأقصى لعدد الجداول في الذاكرة (LRU)
+            disk_dir: مجلد طبقة Parquet على القرص، أو None لتعطيلها
+            max_disk_bytes: الحجم الأقصى لمجلد القرص قبل حذف الأقدم استخداماً
+        """
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = disk_dir if disk_dir and PARQUET_AVAILABLE else None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(content: bytes, params: Dict) -> str:
+        """
+        حساب مفتاح التخزين من بايتات الملف ومعاملات التنظيف
+        
+        Args:
+            content: محتوى الملف المرفوع
+            params: معاملات التنظيف (درجة النجاح، تخطيط الأعمدة...)
+        
+        Returns:
+            بصمة SHA-256 نصية
+        """
+        digest = hashlib.sha256(content)
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        استرجاع الجدول المنظف من الذاكرة ثم من القرص
+        
+        Args:
+            key: مفتاح التخزين
+        
+        Returns:
+            نسخة من الجدول المخزن أو None إن لم يوجد
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key].copy()
+        
+        path = self._disk_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        
+        try:
+            df = pd.read_parquet(path)
+            os.utime(path)  # تحديث وقت الاستخدام لسياسة الإزالة
+        except Exception:
+            # ملف تالف أو غير مكتمل - نتجاهله ونعيد البناء
+            self._remove_file(path)
+            return None
+        
+        self._put_memory(key, df)
+        return df.copy()
+    
+    def put(self, key: str, df: pd.DataFrame):
+        """
+        تخزين الجدول المنظف في الذاكرة وعلى القرص إن كان مفعلاً
+        
+        Args:
+            key: مفتاح التخزين
+            df: الجدول المنظف
+        """
+        self._put_memory(key, df.copy())
+        
+        path = self._disk_path(key)
+        if path is None:
+            return
+        
+        try:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove_file(tmp_path)
+            return
+        
+        self._evict_disk()
+    
+    def clear(self):
+        """مسح جميع المدخلات من الذاكرة والقرص"""
+        with self._lock:
+            self._memory.clear()
+        
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.parquet'):
+                    self._remove_file(os.path.join(self.disk_dir, name))
+    
+    def _put_memory(self, key: str, df: pd.DataFrame):
+        """إضافة مدخل إلى طبقة الذاكرة مع إزالة الأقدم استخداماً"""
+        with self._lock:
+            self._memory[key] = df
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def _disk_path(self, key: str) -> Optional[str]:
+        """مسار ملف Parquet للمفتاح أو None إذا كانت طبقة القرص معطلة"""
+        if not self.disk_dir:
+            return None
+        return os.path.join(self.disk_dir, f"{key}.parquet")
+    
+    def _evict_disk(self):
+        """حذف أقدم الملفات استخداماً حتى يصبح حجم المجلد ضمن الحد"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.parquet'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove_file(path)
+            total -= size
+    
+    @staticmethod
+    def _remove_file(path: str):
+        """حذف ملف مع تجاهل الأخطاء"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
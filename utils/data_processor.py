@@ -1,21 +1,234 @@
 import pandas as pd
 import numpy as np
 import streamlit as st
-from typing import Dict, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import io
+import os
+import hashlib
+import openpyxl
+from concurrent.futures import ProcessPoolExecutor
+from utils.aggregate_cube import AggregateCube
+from utils.bootstrap import bootstrap_intervals
+from utils.data_cache import DataCache
+from utils.shared_store import SharedArrowStore
+from utils.schema_detector import SchemaDetector, CANONICAL_COLUMNS
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands, classification_basis
+from utils.longitudinal import LongitudinalAnalysis
+from utils.group_analytics import GroupStatistics, compute_group_statistics
+from utils.online_stats import KeyHashSet, OnlineStatistics
+from utils.ranking_index import RankingIndex
+from utils.result_cache import ResultCache
+from utils.stats_kernel import GradeStatistics, compute_statistics
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# صيغ الملفات المدعومة
+EXCEL_EXTENSIONS = ('xlsx', 'xls')
+COLUMNAR_EXTENSIONS = ('csv', 'parquet', 'arrow', 'feather')
+SUPPORTED_EXTENSIONS = EXCEL_EXTENSIONS + COLUMNAR_EXTENSIONS
+
+# الأعمدة النصية ذات القيم المتكررة التي تُخزن كفئات في الوضع المضغوط
+CATEGORICAL_COLUMNS = ['الصف', 'الفصل', 'المادة', 'المعلم', 'المدير', 'الملف', 'الورقة']
+
+# قواعد التحقق بترتيب تطبيقها (يُسجَّل لكل صف مرفوض أول قاعدة يخالفها)
+VALIDATION_RULES = [
+    'قيمة مفقودة أو غير رقمية',
+    'صف مكرر (نفس الطالب والصف والفصل)',
+    'درجة سالبة',
+    'الدرجة تتجاوز الدرجة الكلية أو الدرجة الكلية مفقودة',
+    'الدرجة تتجاوز 100',
+]
+
+# أعمدة جدول الصفوف المرفوضة
+REJECTION_COLUMNS = ['رقم الصف', 'القاعدة', 'اسم الطالب', 'القيمة الأصلية']
+
+
+def _read_columnar(content: bytes, file_extension: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    قراءة ملفات CSV وParquet وArrow IPC عبر pyarrow
+    
+    تُقرأ البايتات مباشرة كمخزن Arrow دون نسخ، ثم يُحوَّل الجدول إلى pandas
+    بكتل منفصلة لكل عمود حتى تبقى الأعمدة الرقمية دون نسخ قدر الإمكان.
+    
+    Args:
+        content: محتوى الملف
+        file_extension: امتداد الملف
+        columns: أسماء الأعمدة المطلوبة فقط (بترتيب الملف)، أو None لجميع الأعمدة
+        
+    Returns:
+        DataFrame بالأعمدة كما في الملف
+    """
+    if not PYARROW_AVAILABLE:
+        if file_extension == 'csv':
+            return pd.read_csv(io.BytesIO(content), encoding='utf-8-sig', usecols=columns)
+        raise ImportError("مكتبة pyarrow مطلوبة لقراءة ملفات Parquet وArrow")
+    
+    source = pa.BufferReader(pa.py_buffer(content))
+    if file_extension == 'csv':
+        convert_options = pa_csv.ConvertOptions(include_columns=columns) if columns else None
+        table = pa_csv.read_csv(source, convert_options=convert_options)
+    elif file_extension == 'parquet':
+        table = pq.read_table(source, columns=columns)
+    else:
+        # ملفات Arrow/Feather بصيغة الملف، مع دعم صيغة التدفق
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_stream(pa.BufferReader(pa.py_buffer(content))).read_all()
+        if columns:
+            table = table.select(columns)
+    
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _original_text(values) -> np.ndarray:
+    """
+    القيمة الأصلية كنص لجدول المرفوضات بنفس الشكل في القراءة الكاملة والمتدفقة
+    
+    القيم المفقودة نص فارغ، والأعداد الصحيحة دون كسر عشري (openpyxl يعيد 80
+    بينما pd.read_excel يعيد 80.0 للعمود الرقمي).
+    
+    Args:
+        values: قيم عمود الدرجات قبل التحويل الرقمي
+        
+    Returns:
+        مصفوفة object من النصوص
+    """
+    text = []
+    for value in values:
+        if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+            text.append('')
+        elif isinstance(value, float) and value.is_integer():
+            text.append(str(int(value)))
+        else:
+            text.append(str(value))
+    return np.array(text, dtype=object)
+
+
+def _parse_workbook(file_name: str, content: bytes, params: Dict) -> Tuple[List[pd.DataFrame], List[pd.DataFrame], List[str]]:
+    """
+    قراءة جميع أوراق ملف Excel (أو جدول الملف العمودي) وتنظيفها داخل عملية منفصلة
+    
+    Args:
+        file_name: اسم الملف الأصلي
+        content: محتوى الملف
+        params: معاملات التنظيف من DataProcessor.cache_params
+        
+    Returns:
+        قائمة الجداول المنظفة وقائمة جداول الصفوف المرفوضة (موسومة بالملف والورقة)
+        وقائمة رسائل التحذير
+    """
+    processor = DataProcessor()
+    processor.passing_grade = params['passing_grade']
+    
+    file_extension = file_name.lower().split('.')[-1]
+    try:
+        if file_extension in COLUMNAR_EXTENSIONS:
+            sheets = {'-': _read_columnar(content, file_extension)}
+        else:
+            engine = 'xlrd' if file_extension == 'xls' else 'openpyxl'
+            sheets = pd.read_excel(io.BytesIO(content), sheet_name=None, engine=engine)
+    except Exception as e:
+        return [], [], [f"تعذرت قراءة الملف {file_name}: {str(e)}"]
+    
+    frames = []
+    rejections = []
+    warnings = []
+    for sheet_name, df in sheets.items():
+        if df is None or df.empty:
+            continue
+        
+        schema = processor.schema_detector.match_header(list(df.columns))
+        if not schema['by_header'] and len(df.columns) < 4:
+            warnings.append(f"تم تجاهل الورقة '{sheet_name}' في الملف {file_name}: أقل من 4 أعمدة")
+            continue
+        
+        layout = schema['layout']
+        processor.rejections = pd.DataFrame(columns=REJECTION_COLUMNS)
+        cleaned_df = processor._filter_rows(processor._map_columns(df, layout), df.iloc[:, layout[3]])
+        
+        if not processor.rejections.empty:
+            sheet_rejections = processor.rejections
+            sheet_rejections['الملف'] = file_name
+            sheet_rejections['الورقة'] = str(sheet_name)
+            rejections.append(sheet_rejections)
+        
+        if cleaned_df.empty:
+            warnings.append(f"لا توجد بيانات صالحة في الورقة '{sheet_name}' من الملف {file_name}")
+            continue
+        
+        cleaned_df['الملف'] = file_name
+        cleaned_df['الورقة'] = str(sheet_name)
+        frames.append(cleaned_df)
+    
+    return frames, rejections, warnings
+
+
+def _summarize_workbook(file_name: str, content: bytes, params: Dict, bands: List) -> Tuple[Optional[Dict], int, List[str]]:
+    """
+    تنظيف ملف داخل عملية منفصلة وتلخيصه في مجمّع قابل للدمج دون إعادة صفوفه
+    
+    Args:
+        file_name: اسم الملف الأصلي
+        content: محتوى الملف
+        params: معاملات التنظيف من DataProcessor.cache_params
+        bands: أزواج (الحد الأدنى، التسمية) لجدول النطاقات
+    
+    Returns:
+        حالة OnlineStatistics (to_dict) أو None إن لم تكن فيه بيانات صالحة،
+        وعدد الصفوف المرفوضة، وقائمة رسائل التحذير
+    """
+    frames, rejections, warnings = _parse_workbook(file_name, content, params)
+    if not frames:
+        return None, sum(len(r) for r in rejections), warnings
+    
+    accumulator = OnlineStatistics(params['passing_grade'], GradeBands(bands))
+    for frame in frames:
+        accumulator.update(frame)
+    return accumulator.to_dict(), sum(len(r) for r in rejections), warnings
+
 
 class DataProcessor:
     """معالج البيانات لتحليل درجات الطلاب"""
     
-    def __init__(self):
+    # إصدار قواعد ربط الأعمدة (يدخل في مفتاح التخزين المؤقت)
+    COLUMN_LAYOUT = 'header-synonyms-1'
+    
+    def __init__(self, cache: Optional[DataCache] = None, shared_store: Optional[SharedArrowStore] = None,
+                 results: Optional[ResultCache] = None):
         self.passing_grade = 50  # درجة النجاح الافتراضية
+        self.cache = cache  # ذاكرة التخزين المؤقت للبيانات المنظفة (اختيارية)
+        self.shared_store = shared_store  # مخزن Arrow المشترك بين الجلسات (اختياري)
+        self.results = results  # ذاكرة نتائج التحليل المشتقة (اختيارية)
+        self.dataset_key = None  # بصمة آخر ملف تم تحميله
+        self.term_keys: List[str] = []  # بصمات ملفات الفصول الدراسية من آخر load_terms بالترتيب
+        self._terms: Optional[Dict[str, pd.DataFrame]] = None  # الفصول الدراسية المطابقة لـ term_keys
+        self._dataset_df: Optional[pd.DataFrame] = None  # الجدول المحمل المطابق لـ dataset_key
+        self.chunk_size = 50000  # عدد الصفوف في كل دفعة عند القراءة المتدفقة
+        self.streaming_threshold = 5 * 1024 * 1024  # حجم الملف (بايت) الذي تبدأ عنده القراءة المتدفقة
+        self.max_workers = os.cpu_count() or 1  # عدد العمليات عند قراءة عدة ملفات
+        self.compact_dtypes = True  # تخزين الأعمدة المتكررة كفئات لتقليل الذاكرة
+        self.rejections = pd.DataFrame(columns=REJECTION_COLUMNS)  # الصفوف المستبعدة في آخر تحميل
+        self.schema_detector = SchemaDetector()  # ربط الأعمدة حسب العناوين
+        self.grade_bands = DEFAULT_GRADE_BANDS  # جدول نطاقات التقدير (قابل للتخصيص لكل مدرسة)
+        self.rank_method = 'min'  # الترتيب عند التساوي داخل الفصل والمادة: 'min' تنافسي أو 'dense' متصل
+        self._ranking: Optional[RankingIndex] = None  # ترتيب آخر جدول طُلب منه ترتيب
+        self.bootstrap_resamples = 10000  # عدد عينات bootstrap لفترات الثقة لكل مجموعة
     
-    def load_excel_file(self, uploaded_file) -> Optional[pd.DataFrame]:
+    def load_excel_file(self, uploaded_file, streaming: Optional[bool] = None) -> Optional[pd.DataFrame]:
         """
-        تحميل ملف Excel وتنظيف البيانات
+        تحميل ملف Excel أو CSV أو Parquet أو Arrow IPC وتنظيف البيانات
         
         Args:
             uploaded_file: الملف المرفوع من Streamlit
+            streaming: القراءة المتدفقة على دفعات (للملفات الكبيرة)،
+                وعند None تُفعّل تلقائياً إذا تجاوز حجم الملف streaming_threshold
             
         Returns:
             DataFrame محتوي على البيانات المنظفة أو None في حالة الخطأ
@@ -26,16 +239,48 @@ class DataProcessor:
                 st.error("لم يتم رفع أي ملف")
                 return None
                 
+            # البحث عن البيانات المنظفة مسبقاً لنفس المحتوى ونفس معاملات التنظيف
+            self.rejections = pd.DataFrame(columns=REJECTION_COLUMNS)
+            self.dataset_key = DataCache.make_key(self._read_bytes(uploaded_file), self.cache_params())
+            cached_df = self._get_cached()
+            if cached_df is not None:
+                return cached_df
+            
             # قراءة الملف حسب الامتداد
             file_extension = uploaded_file.name.lower().split('.')[-1]
             
-            if file_extension == 'xlsx':
-                df = pd.read_excel(uploaded_file, engine='openpyxl')
+            if file_extension not in SUPPORTED_EXTENSIONS:
+                st.error("نوع الملف غير مدعوم. يرجى استخدام ملفات .xlsx أو .xls أو .csv أو .parquet أو .arrow")
+                return None
+            
+            # تحديد ربط الأعمدة من العناوين والصفوف الأولى قبل قراءة الملف كاملاً
+            schema = self.schema_detector.detect(self._read_bytes(uploaded_file), file_extension)
+            if schema is None:
+                st.error("الملف فارغ أو لا يحتوي على بيانات")
+                return None
+            if schema['error']:
+                st.error(schema['error'])
+                return None
+            layout = SchemaDetector.reduced_layout(schema)
+            
+            if streaming is None:
+                streaming = getattr(uploaded_file, 'size', 0) >= self.streaming_threshold
+            
+            if file_extension == 'xlsx' and streaming:
+                cleaned_df = self._load_excel_streaming(uploaded_file, schema)
+                if cleaned_df is not None:
+                    cleaned_df = self._put_cached(cleaned_df)
+                return cleaned_df
+            elif file_extension == 'xlsx':
+                df = pd.read_excel(uploaded_file, engine='openpyxl', usecols=schema['usecols'])
             elif file_extension == 'xls':
-                df = pd.read_excel(uploaded_file, engine='xlrd')
+                df = pd.read_excel(uploaded_file, engine='xlrd', usecols=schema['usecols'])
             else:
-                st.error("نوع الملف غير مدعوم. يرجى استخدام ملفات .xlsx أو .xls")
-                return None
+                columns = [str(schema['header'][p]) for p in schema['usecols']]
+                if len(set(columns)) < len(columns):
+                    # عناوين مكررة: قراءة جميع الأعمدة والربط بالمواضع الأصلية
+                    columns, layout = None, schema['layout']
+                df = _read_columnar(self._read_bytes(uploaded_file), file_extension, columns)
             
             # التحقق من وجود البيانات
             if df is None or df.empty:
@@ -48,14 +293,14 @@ class DataProcessor:
                 return None
             
             # تنظيف البيانات
-            cleaned_df = self._clean_data(df)
+            cleaned_df = self._clean_data(df, layout)
             
             # التحقق من نجاح التنظيف
             if cleaned_df is None or cleaned_df.empty:
                 st.error("لا توجد بيانات صالحة بعد التنظيف. تأكد من أن الملف يحتوي على أسماء طلاب ودرجات صحيحة")
                 return None
             
-            return cleaned_df
+            return self._put_cached(cleaned_df)
             
         except pd.errors.EmptyDataError:
             st.error("الملف فارغ أو تالف")
@@ -71,7 +316,457 @@ class DataProcessor:
             st.info("نصائح لحل المشكلة:\n- تأكد من أن الملف بصيغة Excel (.xlsx أو .xls)\n- تأكد من أن الملف يحتوي على أسماء الطلاب في العمود الأول والدرجات في العمود الثاني\n- تأكد من أن الدرجات أرقام وليس نص")
             return None
     
-    def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
+    def load_excel_files(self, uploaded_files: List) -> Optional[pd.DataFrame]:
+        """
+        تحميل عدة ملفات (Excel بجميع أوراقها أو CSV/Parquet/Arrow) بالتوازي ودمجها في جدول واحد
+        
+        Args:
+            uploaded_files: قائمة الملفات المرفوعة من Streamlit
+            
+        Returns:
+            DataFrame موحد بعمودي 'الملف' و'الورقة' أو None في حالة الخطأ
+        """
+        if not uploaded_files:
+            st.error("لم يتم رفع أي ملف")
+            return None
+        
+        tasks = []
+        for uploaded_file in uploaded_files:
+            if uploaded_file.name.lower().split('.')[-1] not in SUPPORTED_EXTENSIONS:
+                st.warning(f"تم تجاهل الملف {uploaded_file.name}: نوع الملف غير مدعوم")
+                continue
+            tasks.append((uploaded_file.name, self._read_bytes(uploaded_file)))
+        
+        if not tasks:
+            st.error("نوع الملف غير مدعوم. يرجى استخدام ملفات .xlsx أو .xls أو .csv أو .parquet أو .arrow")
+            return None
+        
+        # مفتاح الدفعة مبني على بصمات جميع الملفات بترتيب رفعها
+        params = self.cache_params()
+        batch_digest = hashlib.sha256()
+        for name, content in tasks:
+            batch_digest.update(name.encode('utf-8'))
+            batch_digest.update(hashlib.sha256(content).digest())
+        self.dataset_key = DataCache.make_key(batch_digest.digest(), dict(params, batch=True))
+        self.rejections = pd.DataFrame(columns=REJECTION_COLUMNS)
+        
+        cached_df = self._get_cached()
+        if cached_df is not None:
+            return cached_df
+        
+        try:
+            workers = min(self.max_workers, len(tasks))
+            if workers <= 1:
+                results = [_parse_workbook(name, content, params) for name, content in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(
+                        _parse_workbook,
+                        [name for name, _ in tasks],
+                        [content for _, content in tasks],
+                        [params] * len(tasks)
+                    ))
+        except Exception as e:
+            st.error(f"خطأ غير متوقع في قراءة الملفات: {str(e)}")
+            return None
+        
+        frames = []
+        rejections = []
+        for file_frames, file_rejections, warnings in results:
+            frames.extend(file_frames)
+            rejections.extend(file_rejections)
+            for warning in warnings:
+                st.warning(warning)
+        
+        if rejections:
+            self.rejections = pd.concat(rejections, ignore_index=True)
+        
+        if not frames:
+            st.error("لا توجد بيانات صالحة بعد التنظيف. تأكد من أن الملفات تحتوي على أسماء طلاب ودرجات صحيحة")
+            return None
+        
+        combined_df = self._compact_columns(pd.concat(frames, ignore_index=True))
+        return self._put_cached(combined_df)
+    
+    def summarize_files(self, uploaded_files: List) -> Optional[Tuple[Dict[str, OnlineStatistics], OnlineStatistics]]:
+        """
+        ملخصات قابلة للدمج لعدة ملفات (مدرسة لكل ملف) تُحسب بالتوازي ثم تُدمج مركزياً
+        
+        كل عملية تنظف ملفها وتعيد حالة مجمّع صغيرة (لحظات ومقدّر كميات وعدادات)
+        بدلاً من الصفوف، فلا تُجمع الدرجات الخام لكل الملفات في عملية واحدة. الوسيط
+        والربيعيات للمنطقة تقريبية بحدود QuantileSketch، وبقية القيم دقيقة.
+        
+        Args:
+            uploaded_files: قائمة الملفات المرفوعة من Streamlit
+        
+        Returns:
+            (مجمّع لكل ملف بترتيب الرفع، مجمّع المنطقة المدموج) أو None في حالة الخطأ
+        """
+        if not uploaded_files:
+            st.error("لم يتم رفع أي ملف")
+            return None
+        
+        tasks = []
+        for uploaded_file in uploaded_files:
+            if uploaded_file.name.lower().split('.')[-1] not in SUPPORTED_EXTENSIONS:
+                st.warning(f"تم تجاهل الملف {uploaded_file.name}: نوع الملف غير مدعوم")
+                continue
+            tasks.append((uploaded_file.name, self._read_bytes(uploaded_file)))
+        
+        if not tasks:
+            st.error("نوع الملف غير مدعوم. يرجى استخدام ملفات .xlsx أو .xls أو .csv أو .parquet أو .arrow")
+            return None
+        
+        params = self.cache_params()
+        bands = [list(band) for band in self.grade_bands.bands]
+        try:
+            workers = min(self.max_workers, len(tasks))
+            if workers <= 1:
+                results = [_summarize_workbook(name, content, params, bands) for name, content in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(
+                        _summarize_workbook,
+                        [name for name, _ in tasks],
+                        [content for _, content in tasks],
+                        [params] * len(tasks),
+                        [bands] * len(tasks)
+                    ))
+        except Exception as e:
+            st.error(f"خطأ غير متوقع في قراءة الملفات: {str(e)}")
+            return None
+        
+        summaries = {}
+        region = OnlineStatistics(self.passing_grade, self.grade_bands)
+        rejected = 0
+        for (name, _), (state, file_rejected, warnings) in zip(tasks, results):
+            rejected += file_rejected
+            for warning in warnings:
+                st.warning(warning)
+            if state is None:
+                continue
+            summaries[name] = OnlineStatistics.from_dict(state)
+            region.merge(summaries[name])
+        
+        if rejected:
+            st.warning(f"تم استبعاد {rejected} صف أثناء التحقق من البيانات")
+        
+        if not summaries:
+            st.error("لا توجد بيانات صالحة بعد التنظيف. تأكد من أن الملفات تحتوي على أسماء طلاب ودرجات صحيحة")
+            return None
+        
+        return summaries, region
+    
+    def load_terms(self, uploaded_files: List) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        تحميل ملف لكل فصل دراسي بترتيب الرفع (اسم الفصل الدراسي هو اسم الملف دون الامتداد)
+        
+        Args:
+            uploaded_files: قائمة الملفات المرفوعة من Streamlit بالترتيب الزمني
+        
+        Returns:
+            {اسم الفصل الدراسي: DataFrame منظف} أو None في حالة الخطأ
+        """
+        if not uploaded_files or len(uploaded_files) < 2:
+            st.error("يرجى رفع ملفين على الأقل (ملف لكل فصل دراسي) للمقارنة")
+            return None
+        
+        terms = {}
+        term_keys = []
+        for uploaded_file in uploaded_files:
+            df = self.load_excel_file(uploaded_file)
+            if df is None:
+                return None
+            name = os.path.splitext(uploaded_file.name)[0]
+            terms[name] = df
+            term_keys.append(f"{name}:{self.dataset_key}")
+        
+        if len(terms) != len(uploaded_files):
+            st.error("أسماء الملفات مكررة. يرجى تسمية كل ملف باسم الفصل الدراسي")
+            return None
+        
+        self.term_keys = term_keys
+        self._terms = terms
+        return terms
+    
+    def get_longitudinal_analysis(self, terms: Dict[str, pd.DataFrame]) -> LongitudinalAnalysis:
+        """
+        مقارنة الفصول الدراسية لكل طالب ولكل فصل
+        
+        تُحفظ النتيجة في ذاكرة النتائج بمفتاح بصمات ملفات الفصول بالترتيب عندما تكون
+        الفصول هي ناتج آخر load_terms.
+        
+        Args:
+            terms: {اسم الفصل الدراسي: DataFrame منظف} بالترتيب الزمني
+        
+        Returns:
+            كائن LongitudinalAnalysis
+        """
+        if self.results is None or terms is not self._terms:
+            return LongitudinalAnalysis.build(terms, self.passing_grade)
+        
+        key = ResultCache.make_key('|'.join(self.term_keys), self.passing_grade, self.grade_bands)
+        return self.results.get_or_compute(key, 'longitudinal', LongitudinalAnalysis.build, terms, self.passing_grade)
+    
+    def cache_params(self) -> Dict:
+        """
+        معاملات التنظيف التي تؤثر على الناتج وتدخل في مفتاح التخزين المؤقت
+        
+        Returns:
+            قاموس المعاملات
+        """
+        return {
+            'passing_grade': self.passing_grade,
+            'layout': self.COLUMN_LAYOUT,
+            'compact': self.compact_dtypes,
+        }
+    
+    def _get_cached(self) -> Optional[pd.DataFrame]:
+        """استرجاع الجدول المنظف وجدول الصفوف المرفوضة لبصمة الملف الحالية"""
+        # المخزن المشترك أولاً: لا ينسخ البيانات إلى ذاكرة الجلسة
+        if self.shared_store is not None:
+            shared_df = self.shared_store.open(self.dataset_key)
+            if shared_df is not None:
+                shared_rejections = self.shared_store.open(f"{self.dataset_key}-rejections")
+                if shared_rejections is not None:
+                    self.rejections = shared_rejections
+                self._dataset_df = shared_df
+                return shared_df
+        
+        if self.cache is None:
+            return None
+        
+        cached_df = self.cache.get(self.dataset_key)
+        if cached_df is not None:
+            cached_rejections = self.cache.get(f"{self.dataset_key}-rejections")
+            if cached_rejections is not None:
+                self.rejections = cached_rejections
+            self._dataset_df = cached_df
+        return cached_df
+    
+    def _put_cached(self, cleaned_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        تخزين الجدول المنظف وجدول الصفوف المرفوضة لبصمة الملف الحالية
+        
+        Returns:
+            الجدول المربوط بالمخزن المشترك إن كان مفعلاً (لتحرير النسخة المحلية)، وإلا الجدول نفسه
+        """
+        if self.shared_store is not None and self.shared_store.publish(self.dataset_key, cleaned_df):
+            self.shared_store.publish(f"{self.dataset_key}-rejections", self.rejections)
+            shared_df = self.shared_store.open(self.dataset_key)
+            if shared_df is not None:
+                self._dataset_df = shared_df
+                return shared_df
+        
+        if self.cache is not None:
+            self.cache.put(self.dataset_key, cleaned_df)
+            self.cache.put(f"{self.dataset_key}-rejections", self.rejections)
+        
+        self._dataset_df = cleaned_df
+        return cleaned_df
+    
+    def _read_bytes(self, uploaded_file) -> bytes:
+        """قراءة محتوى الملف المرفوع كاملاً دون تغيير موضع القراءة"""
+        if hasattr(uploaded_file, 'getvalue'):
+            return uploaded_file.getvalue()
+        
+        position = uploaded_file.tell()
+        content = uploaded_file.read()
+        uploaded_file.seek(position)
+        return content
+    
+    def _load_excel_streaming(self, uploaded_file, schema: Dict) -> Optional[pd.DataFrame]:
+        """
+        تحميل ملف xlsx كبير على دفعات دون بناء المصنف كاملاً في الذاكرة
+        
+        يُطبَّق ربط الأعمدة وتحويل الأنواع على كل دفعة، ثم تُدمج الأعمدة
+        المحوّلة وتُزال المكررات والدرجات غير المنطقية على النتيجة المجمّعة.
+        
+        Args:
+            uploaded_file: الملف المرفوع من Streamlit
+            schema: مخطط الأعمدة من SchemaDetector.detect
+            
+        Returns:
+            DataFrame منظف أو None في حالة الخطأ
+        """
+        chunks = []
+        raw_chunks = []
+        layout = SchemaDetector.reduced_layout(schema)
+        
+        for chunk in self._iter_excel_chunks(uploaded_file, schema['usecols']):
+            # استبعاد القيم المفقودة مبكراً مع الاحتفاظ بالقيمة الأصلية في جدول المرفوضات
+            mapped = self._map_columns(chunk, layout)
+            raw_grades = chunk.iloc[:, layout[3]]
+            keep, rejected = self._validate(mapped, raw_grades, missing_only=True)
+            self._record_rejections(rejected)
+            chunks.append(mapped[keep])
+            raw_chunks.append(raw_grades[keep])
+        
+        # التحقق من وجود البيانات
+        if not chunks:
+            st.error("الملف فارغ أو لا يحتوي على بيانات")
+            return None
+        
+        cleaned_df = self._compact_columns(self._filter_rows(pd.concat(chunks), pd.concat(raw_chunks)))
+        if not self.rejections.empty:
+            self.rejections = self.rejections.sort_values('رقم الصف', ignore_index=True)
+        
+        # التحقق من نجاح التنظيف
+        if cleaned_df.empty:
+            st.error("لا توجد بيانات صالحة بعد التنظيف. تأكد من أن الملف يحتوي على أسماء طلاب ودرجات صحيحة")
+            return None
+        
+        return cleaned_df
+    
+    def _iter_excel_chunks(self, uploaded_file, usecols: List[int]) -> Iterator[pd.DataFrame]:
+        """
+        قراءة الورقة الأولى من ملف xlsx في وضع القراءة فقط على دفعات
+        
+        Args:
+            uploaded_file: الملف المرفوع من Streamlit
+            usecols: مواضع الأعمدة المطلوبة فقط (بترتيب الملف)
+            
+        Yields:
+            DataFrame لكل دفعة بعدد صفوف لا يتجاوز chunk_size
+        """
+        wb = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            
+            # الصف الأول هو صف العناوين كما في pd.read_excel
+            header = next(rows, None)
+            if header is None:
+                return
+            header = [header[p] if p < len(header) else None for p in usecols]
+            
+            # ترقيم الصفوف متصل عبر الدفعات ليطابق ترقيم القراءة الكاملة
+            offset = 0
+            buffer = []
+            for row in rows:
+                # الاحتفاظ بالأعمدة المطلوبة فقط (الصفوف القصيرة تُكمل بقيم فارغة)
+                width = len(row)
+                buffer.append(tuple(row[p] if p < width else None for p in usecols))
+                if len(buffer) >= self.chunk_size:
+                    yield pd.DataFrame(buffer, columns=header, index=pd.RangeIndex(offset, offset + len(buffer)))
+                    offset += len(buffer)
+                    buffer = []
+            
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header, index=pd.RangeIndex(offset, offset + len(buffer)))
+        finally:
+            wb.close()
+    
+    def _iter_columnar_chunks(self, uploaded_file, file_extension: str, header: List) -> Iterator[pd.DataFrame]:
+        """
+        قراءة ملف CSV أو Parquet أو Arrow IPC على دفعات من السجلات
+        
+        Args:
+            uploaded_file: الملف المرفوع (كائن ملف)
+            file_extension: امتداد الملف
+            header: عناوين الأعمدة كما في الملف
+        
+        Yields:
+            DataFrame لكل دفعة بترقيم صفوف متصل
+        """
+        if not PYARROW_AVAILABLE:
+            if file_extension != 'csv':
+                raise ImportError("مكتبة pyarrow مطلوبة لقراءة ملفات Parquet وArrow")
+            # كل الأعمدة نصية حتى لا يختلف استنتاج الأنواع بين الدفعات
+            yield from pd.read_csv(uploaded_file, encoding='utf-8-sig', dtype=str, chunksize=self.chunk_size)
+            return
+        
+        if file_extension == 'csv':
+            convert_options = pa_csv.ConvertOptions(column_types={str(name): pa.string() for name in header})
+            batches = pa_csv.open_csv(uploaded_file, convert_options=convert_options)
+        elif file_extension == 'parquet':
+            batches = pq.ParquetFile(uploaded_file).iter_batches(batch_size=self.chunk_size)
+        else:
+            try:
+                reader = pa.ipc.open_file(uploaded_file)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            except pa.ArrowInvalid:
+                uploaded_file.seek(0)
+                batches = pa.ipc.open_stream(uploaded_file)
+        
+        offset = 0
+        for batch in batches:
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    
+    def calculate_streaming_stats(self, uploaded_file) -> Optional[OnlineStatistics]:
+        """
+        حساب الإحصائيات دفعة بدفعة دون تحميل الملف كاملاً في الذاكرة
+        
+        تُربط أعمدة كل دفعة وتُطبق عليها قواعد التحقق، ويُكشف التكرار عبر الدفعات
+        ببصمات المفاتيح فقط، ثم تُضاف الدفعة إلى المجمّع وتُحذف. الوسيط والربيعيات
+        تقديرية بحدود الخطأ الموثقة في QuantileSketch.
+        
+        Args:
+            uploaded_file: الملف المرفوع (xlsx أو csv أو parquet أو arrow)
+        
+        Returns:
+            كائن OnlineStatistics (to_stats_dict وgrade_ranges) أو None في حالة الخطأ
+        """
+        file_extension = uploaded_file.name.lower().split('.')[-1]
+        if file_extension not in ('xlsx',) + COLUMNAR_EXTENSIONS:
+            st.error("الحساب التدفقي يدعم ملفات .xlsx و .csv و .parquet و .arrow فقط")
+            return None
+        
+        # الكشف من الملف نفسه: تُقرأ العناوين والعينة فقط دون نسخ المحتوى كاملاً
+        schema = self.schema_detector.detect(uploaded_file, file_extension)
+        if schema is None:
+            st.error("الملف فارغ أو لا يحتوي على بيانات")
+            return None
+        if schema['error']:
+            st.error(schema['error'])
+            return None
+        
+        self.rejections = pd.DataFrame(columns=REJECTION_COLUMNS)
+        accumulator = OnlineStatistics(self.passing_grade, self.grade_bands)
+        seen_keys = KeyHashSet()
+        
+        if file_extension == 'xlsx':
+            chunks = self._iter_excel_chunks(uploaded_file, schema['usecols'])
+            layout = SchemaDetector.reduced_layout(schema)
+        else:
+            chunks = self._iter_columnar_chunks(uploaded_file, file_extension, schema['header'])
+            layout = schema['layout']
+        
+        for chunk in chunks:
+            mapped = self._map_columns(chunk, layout)
+            keep, rejected = self._validate(mapped, chunk.iloc[:, layout[3]])
+            
+            # التكرار مع الدفعات السابقة: أول ظهور لكل مفتاح غير مفقود هو المعتمد،
+            # والتكرار يسبق بقية القواعد كما في القراءة الكاملة
+            grades = mapped['الدرجة'].to_numpy(dtype=float, na_value=np.nan)
+            present = np.flatnonzero(~(mapped['اسم الطالب'].isna().to_numpy() | np.isnan(grades)))
+            keys = pd.util.hash_pandas_object(mapped.iloc[present][['اسم الطالب', 'الصف', 'الفصل']], index=False)
+            repeated = present[seen_keys.add_new(keys.to_numpy())]
+            if len(repeated):
+                keep[repeated] = False
+                row_numbers = mapped.index[repeated] + 2
+                rejected = pd.concat([rejected[~rejected['رقم الصف'].isin(row_numbers)], pd.DataFrame({
+                    'رقم الصف': row_numbers,
+                    'القاعدة': VALIDATION_RULES[1],
+                    'اسم الطالب': mapped['اسم الطالب'].to_numpy()[repeated],
+                    'القيمة الأصلية': _original_text(chunk.iloc[repeated, layout[3]]),
+                })], ignore_index=True)
+            
+            self._record_rejections(rejected)
+            accumulator.update(mapped[keep])
+        
+        if not self.rejections.empty:
+            self.rejections = self.rejections.sort_values('رقم الصف', kind='stable').reset_index(drop=True)
+        
+        if not accumulator.grades.count:
+            st.error("لا توجد بيانات صالحة بعد التنظيف. تأكد من أن الملف يحتوي على أسماء طلاب ودرجات صحيحة")
+            return None
+        
+        return accumulator
+    
+    def _clean_data(self, df: pd.DataFrame, layout: Optional[List[Optional[int]]] = None) -> pd.DataFrame:
         """
         تنظيف وتحضير البيانات حسب التصميم المحدد
         التصميم المطلوب:
@@ -84,64 +779,201 @@ class DataProcessor:
         العمود 7: اسم المعلم/المعلمة
         العمود 8: اسم المدير/المديرة
         
+        وعند تمرير layout (من SchemaDetector) تُقرأ الأعمدة من المواضع المحددة
+        بدلاً من الترتيب الموضعي.
+        
         Args:
             df: DataFrame الأصلي
+            layout: موضع كل عمود معتمد في df أو None إن لم يوجد
             
         Returns:
             DataFrame منظف
         """
-        # إنشاء DataFrame جديد مع الأعمدة المطلوبة
-        cleaned_df = pd.DataFrame()
-        
         # التحقق من وجود الأعمدة المطلوبة
-        if len(df.columns) < 4:
+        if layout is None and len(df.columns) < 4:
             st.error("الملف يجب أن يحتوي على 4 أعمدة على الأقل (اسم الطالب، الصف، الفصل، درجة الطالب)")
             return pd.DataFrame()
         
+        layout = layout or self._positional_layout(df)
+        cleaned_df = self._map_columns(df, layout)
+        return self._compact_columns(self._filter_rows(cleaned_df, df.iloc[:, layout[3]]))
+    
+    def _positional_layout(self, df: pd.DataFrame) -> List[Optional[int]]:
+        """الترتيب الموضعي الافتراضي: العمود n في الملف هو العمود المعتمد n"""
+        width = min(len(df.columns), len(CANONICAL_COLUMNS))
+        return [i if i < width else None for i in range(len(CANONICAL_COLUMNS))]
+    
+    def _map_columns(self, df: pd.DataFrame, layout: Optional[List[Optional[int]]] = None) -> pd.DataFrame:
+        """
+        ربط أعمدة الملف بالأعمدة المعتمدة وتحويل أنواعها
+        
+        Args:
+            df: DataFrame الأصلي (أو جزء منه)
+            layout: موضع كل عمود معتمد في df (بترتيب CANONICAL_COLUMNS) أو None
+                للترتيب الموضعي
+            
+        Returns:
+            DataFrame بالأعمدة المعتمدة دون فلترة الصفوف
+        """
+        layout = layout or self._positional_layout(df)
+        name_col, level_col, class_col, grade_col, subject_col, total_col, teacher_col, principal_col = layout
+        
+        # إنشاء DataFrame جديد مع الأعمدة المطلوبة
+        cleaned_df = pd.DataFrame()
+        
         # الأعمدة الأساسية للعرض
-        cleaned_df['اسم الطالب'] = df.iloc[:, 0].astype(str)  # العمود الأول
-        cleaned_df['الصف'] = df.iloc[:, 1].astype(str)        # العمود الثاني
-        cleaned_df['الفصل'] = df.iloc[:, 2].astype(str)       # العمود الثالث
+        cleaned_df['اسم الطالب'] = df.iloc[:, name_col].astype(str)
+        cleaned_df['الصف'] = df.iloc[:, level_col].astype(str)
+        cleaned_df['الفصل'] = df.iloc[:, class_col].astype(str)
         
-        # تنظيف عمود الدرجات (العمود الرابع)
-        grades = pd.to_numeric(df.iloc[:, 3], errors='coerce')
+        # تنظيف عمود الدرجات
+        grades = pd.to_numeric(df.iloc[:, grade_col], errors='coerce')
         cleaned_df['الدرجة'] = grades
         
         # الأعمدة الإضافية للتقارير والعمليات الحسابية
-        if len(df.columns) >= 5:
-            cleaned_df['المادة'] = df.iloc[:, 4].astype(str)
+        if subject_col is not None:
+            cleaned_df['المادة'] = df.iloc[:, subject_col].astype(str)
         
-        if len(df.columns) >= 6:
+        if total_col is not None:
             # درجة التصحيح من (الدرجة الكلية) - للنسبة المئوية
-            total_grades = pd.to_numeric(df.iloc[:, 5], errors='coerce')
+            total_grades = pd.to_numeric(df.iloc[:, total_col], errors='coerce')
             cleaned_df['الدرجة الكلية'] = total_grades
             
             # حساب النسبة المئوية
             cleaned_df['النسبة المئوية'] = (cleaned_df['الدرجة'] / cleaned_df['الدرجة الكلية'] * 100).round(2)
         
-        if len(df.columns) >= 7:
-            cleaned_df['المعلم'] = df.iloc[:, 6].astype(str)
+        if teacher_col is not None:
+            cleaned_df['المعلم'] = df.iloc[:, teacher_col].astype(str)
             
-        if len(df.columns) >= 8:
-            cleaned_df['المدير'] = df.iloc[:, 7].astype(str)
+        if principal_col is not None:
+            cleaned_df['المدير'] = df.iloc[:, principal_col].astype(str)
         
-        # إزالة الصفوف التي تحتوي على قيم مفقودة في الأعمدة الأساسية
-        cleaned_df = cleaned_df.dropna(subset=['اسم الطالب', 'الدرجة'])
+        return cleaned_df
+    
+    def _filter_rows(self, cleaned_df: pd.DataFrame, raw_grades: Optional[pd.Series] = None) -> pd.DataFrame:
+        """
+        إزالة الصفوف المفقودة والمكررة والدرجات غير المنطقية في تمريرة واحدة
         
-        # إزالة الصفوف المكررة بناءً على اسم الطالب والصف والفصل
-        cleaned_df = cleaned_df.drop_duplicates(subset=['اسم الطالب', 'الصف', 'الفصل'], keep='first')
+        تُضاف الصفوف المستبعدة إلى self.rejections.
         
-        # فلترة الدرجات غير المنطقية (أقل من 0)
-        cleaned_df = cleaned_df[cleaned_df['الدرجة'] >= 0]
+        Args:
+            cleaned_df: DataFrame بالأعمدة المعتمدة
+            raw_grades: عمود الدرجات قبل التحويل الرقمي (لعرض القيمة الأصلية)
+            
+        Returns:
+            DataFrame منظف
+        """
+        keep, rejected = self._validate(cleaned_df, raw_grades)
+        self._record_rejections(rejected)
+        
+        if keep.all():
+            return cleaned_df.reset_index(drop=True)
+        return cleaned_df[keep].reset_index(drop=True)
+    
+    def _validate(self, cleaned_df: pd.DataFrame, raw_grades: Optional[pd.Series] = None,
+                  missing_only: bool = False) -> Tuple[np.ndarray, pd.DataFrame]:
+        """
+        حساب جميع قواعد التحقق دفعة واحدة دون نسخ وسيطة للجدول
         
-        # إذا كان هناك درجة كلية، نتحقق من أن الدرجة لا تتجاوز الدرجة الكلية
-        if 'الدرجة الكلية' in cleaned_df.columns:
-            cleaned_df = cleaned_df[cleaned_df['الدرجة'] <= cleaned_df['الدرجة الكلية']]
+        تُطبق القواعد بترتيب VALIDATION_RULES: القيم المفقودة، ثم التكرار بين
+        الصفوف غير المفقودة (يُحتفظ بأول ظهور)، ثم الدرجات السالبة، ثم تجاوز
+        الدرجة الكلية (أو 100 عند غيابها).
+        
+        Args:
+            cleaned_df: DataFrame بالأعمدة المعتمدة
+            raw_grades: عمود الدرجات قبل التحويل الرقمي
+            missing_only: تطبيق قاعدة القيم المفقودة فقط (للقراءة المتدفقة)
+            
+        Returns:
+            قناع الصفوف المقبولة وجدول الصفوف المرفوضة
+        """
+        grades = cleaned_df['الدرجة'].to_numpy(dtype=float, na_value=np.nan)
+        missing = cleaned_df['اسم الطالب'].isna().to_numpy() | np.isnan(grades)
+        
+        if missing_only:
+            rule = np.where(missing, 0, -1)
         else:
-            # إذا لم تكن هناك درجة كلية، نفترض أن الدرجة من 100
-            cleaned_df = cleaned_df[cleaned_df['الدرجة'] <= 100]
+            duplicate = np.zeros(len(cleaned_df), dtype=bool)
+            subset = ['اسم الطالب', 'الصف', 'الفصل']
+            if missing.any():
+                duplicate[~missing] = cleaned_df.loc[~missing, subset].duplicated(keep='first').to_numpy()
+            else:
+                duplicate = cleaned_df.duplicated(subset=subset, keep='first').to_numpy()
+            
+            negative = grades < 0
+            
+            if 'الدرجة الكلية' in cleaned_df.columns:
+                totals = cleaned_df['الدرجة الكلية'].to_numpy(dtype=float, na_value=np.nan)
+                over_total = ~(grades <= totals)
+                over_hundred = np.zeros(len(cleaned_df), dtype=bool)
+            else:
+                # إذا لم تكن هناك درجة كلية، نفترض أن الدرجة من 100
+                over_total = np.zeros(len(cleaned_df), dtype=bool)
+                over_hundred = grades > 100
+            
+            rule = np.select([missing, duplicate, negative, over_total, over_hundred], [0, 1, 2, 3, 4], default=-1)
+        
+        rejected = rule >= 0
+        keep = ~rejected
+        
+        if not rejected.any():
+            return keep, pd.DataFrame(columns=REJECTION_COLUMNS)
+        
+        original = raw_grades if raw_grades is not None else cleaned_df['الدرجة']
+        rejected_df = pd.DataFrame({
+            # رقم الصف في الملف الأصلي (الصف الأول للعناوين)
+            'رقم الصف': cleaned_df.index[rejected] + 2,
+            'القاعدة': np.asarray(VALIDATION_RULES, dtype=object)[rule[rejected]],
+            'اسم الطالب': cleaned_df['اسم الطالب'].to_numpy()[rejected],
+            'القيمة الأصلية': _original_text(original.to_numpy()[rejected]),
+        })
+        rejected_df['القيمة الأصلية'] = rejected_df['القيمة الأصلية'].astype(str)
+        
+        return keep, rejected_df
+    
+    def _record_rejections(self, rejected: pd.DataFrame):
+        """إضافة صفوف مرفوضة إلى جدول المرفوضات الحالي"""
+        if rejected.empty:
+            return
+        if self.rejections.empty:
+            self.rejections = rejected.reset_index(drop=True)
+        else:
+            self.rejections = pd.concat([self.rejections, rejected], ignore_index=True)
+    
+    def get_rejection_summary(self) -> pd.DataFrame:
+        """
+        ملخص أعداد الصفوف المستبعدة حسب القاعدة في آخر تحميل
         
-        return cleaned_df.reset_index(drop=True)
+        Returns:
+            DataFrame يحتوي على القاعدة وعدد الصفوف
+        """
+        counts = self.rejections['القاعدة'].value_counts()
+        summary = counts.rename_axis('القاعدة').reset_index(name='عدد الصفوف')
+        return summary
+    
+    def _compact_columns(self, cleaned_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        تحويل الأعمدة النصية المتكررة إلى فئات وأسماء الطلاب إلى نصوص Arrow
+        
+        يُطبق بعد الفلترة والدمج لأن دمج أجزاء بفئات مختلفة يعيدها نصوصاً عادية.
+        
+        Args:
+            cleaned_df: DataFrame منظف
+            
+        Returns:
+            DataFrame بأنواع مضغوطة (أو كما هو إذا كان الوضع المضغوط معطلاً)
+        """
+        if not self.compact_dtypes:
+            return cleaned_df
+        
+        for column in CATEGORICAL_COLUMNS:
+            if column in cleaned_df.columns and not isinstance(cleaned_df[column].dtype, pd.CategoricalDtype):
+                cleaned_df[column] = cleaned_df[column].astype('category')
+        
+        if PYARROW_AVAILABLE:
+            cleaned_df['اسم الطالب'] = cleaned_df['اسم الطالب'].astype(pd.StringDtype('pyarrow'))
+        
+        return cleaned_df
     
     def calculate_basic_stats(self, df: pd.DataFrame) -> Dict:
         """
@@ -151,53 +983,152 @@ class DataProcessor:
             df: DataFrame يحتوي على البيانات
             
         Returns:
-            قاموس يحتوي على الإحصائيات
-        """
-        grades = df['الدرجة']
-        
-        # الإحصائيات الأساسية للدرجات
-        stats = {
-            'count': len(grades),
-            'mean': grades.mean(),
-            'median': grades.median(),
-            'std': grades.std(),
-            'min': grades.min(),
-            'max': grades.max(),
-            'q1': grades.quantile(0.25),
-            'q3': grades.quantile(0.75),
-        }
+            قاموس يحتوي على الإحصائيات (قيم بسيطة فقط، والتوزيع الكامل من compute_statistics)
+        """
+        # معيار النجاح: 50% من النسبة المئوية إن وجدت، وإلا درجة النجاح من 100
+        return self.compute_statistics(df).to_stats_dict()
+    
+    def compute_statistics(self, df: pd.DataFrame) -> GradeStatistics:
+        """
+        حساب جميع الإحصائيات في تمريرة واحدة بنواة stats_kernel (أو من ذاكرة النتائج)
+        
+        Args:
+            df: DataFrame يحتوي على البيانات
+            
+        Returns:
+            كائن GradeStatistics
+        """
+        return self._memoized(df, 'statistics', self._compute_statistics)
+    
+    def _compute_statistics(self, df: pd.DataFrame) -> GradeStatistics:
+        """حساب الإحصائيات دون ذاكرة النتائج"""
+        return compute_statistics(df, passing_grade=self.passing_grade, grade_bands=self.grade_bands)
+    
+    def get_group_statistics(self, df: pd.DataFrame) -> GroupStatistics:
+        """
+        الإحصائيات لكل مستوى تجميع (الصف، الفصل، المادة، المعلم، المدير) مع التجميعات الأعلى
+        
+        Args:
+            df: DataFrame يحتوي على البيانات
+        
+        Returns:
+            كائن GroupStatistics للتصفح دون إعادة الحساب
+        """
+        return compute_group_statistics(df, passing_grade=self.passing_grade, grade_bands=self.grade_bands)
+    
+    def get_bootstrap_intervals(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """
+        فترات ثقة bootstrap (95%) لمتوسط ونسبة نجاح كل مجموعة لمقارنة المعلمين والفصول
+        
+        Args:
+            df: DataFrame يحتوي على البيانات
+            columns: أعمدة التجميع (مثل ['المعلم'] أو ['الصف', 'الفصل'])
+        
+        Returns:
+            DataFrame بفترات الثقة لكل مجموعة مرتب حسب المتوسط
+        """
+        def compute(frame: pd.DataFrame) -> pd.DataFrame:
+            return bootstrap_intervals(frame, columns, passing_grade=self.passing_grade,
+                                       n_resamples=self.bootstrap_resamples, max_workers=self.max_workers)
+        
+        return self._memoized(df, f"bootstrap-{'-'.join(columns)}-{self.bootstrap_resamples}", compute)
+    
+    def get_aggregate_cube(self, df: pd.DataFrame, persist: bool = True) -> AggregateCube:
+        """
+        مكعب المجاميع لآخر مجموعة بيانات محملة، من التخزين المؤقت أو بناؤه وحفظه
+        
+        يُحفظ المكعب بجانب الجدول المنظف تحت بصمة الملف نفسها (مع جدول النطاقات)،
+        فيتغير مفتاحه تلقائياً عند تغير المصدر.
+        
+        Args:
+            df: DataFrame المنظف لآخر ملف محمل
+            persist: حفظ المكعب واسترجاعه (False للبيانات المدمجة التي لا تطابق بصمة الملف)
+        
+        Returns:
+            كائن AggregateCube
+        """
+        key = None
+        if persist and self.dataset_key:
+            bands_key = hashlib.sha1(repr(self.grade_bands.bands).encode('utf-8')).hexdigest()[:12]
+            key = f"{self.dataset_key}-cube-{bands_key}"
+            
+            cells = self.shared_store.open(key) if self.shared_store is not None else None
+            if cells is None and self.cache is not None:
+                cells = self.cache.get(key)
+            if cells is not None:
+                return AggregateCube(cells)
+        
+        cube = AggregateCube.build(df, passing_grade=self.passing_grade, grade_bands=self.grade_bands)
+        
+        if key is not None:
+            if self.shared_store is None or not self.shared_store.publish(key, cube.to_frame()):
+                if self.cache is not None:
+                    self.cache.put(key, cube.to_frame())
+        
+        return cube
+    
+    def _memoized(self, df: pd.DataFrame, name: str, compute):
+        """
+        نتيجة compute(df) من ذاكرة النتائج بمفتاح (بصمة البيانات، درجة النجاح، جدول النطاقات)
         
-        # إحصائيات الدرجة الكلية إن وجدت
-        if 'الدرجة الكلية' in df.columns:
-            total_grades = df['الدرجة الكلية']
-            stats['total_mean'] = total_grades.mean()
-            stats['total_max'] = total_grades.max()
-            stats['total_min'] = total_grades.min()
-        
-        # إحصائيات النسبة المئوية إن وجدت
-        if 'النسبة المئوية' in df.columns:
-            percentages = df['النسبة المئوية']
-            stats['percentage_mean'] = percentages.mean()
-            stats['percentage_median'] = percentages.median()
-            stats['percentage_std'] = percentages.std()
-            
-            # تحديد معيار النجاح بناءً على النسبة المئوية (50%)
-            passing_percentage = 50
-            passing_students = len(percentages[percentages >= passing_percentage])
-            
-            stats['pass_rate'] = (passing_students / len(percentages)) * 100
-            stats['fail_rate'] = 100 - stats['pass_rate']
-            stats['passing_count'] = passing_students
-            stats['failing_count'] = len(percentages) - passing_students
+        تُستخدم الذاكرة فقط للجدول المحمل المطابق لبصمة الملف؛ البيانات المدمجة
+        أو المعدلة تُحسب مباشرة.
+        """
+        key = self.result_key(df)
+        if self.results is None or key is None:
+            return compute(df)
+        return self.results.get_or_compute(key, name, compute, df)
+    
+    def result_key(self, df: pd.DataFrame) -> Optional[str]:
+        """
+        مفتاح النتائج المشتقة (والمخططات) لجدول: بصمة الملف مع درجة النجاح وجدول النطاقات
+        
+        Args:
+            df: DataFrame يحتوي على البيانات
+        
+        Returns:
+            المفتاح، أو None إذا لم يكن الجدول هو المحمل المطابق لبصمة الملف (بيانات مدمجة أو معدلة)
+        """
+        if not self.dataset_key or df is not self._dataset_df:
+            return None
+        return ResultCache.make_key(self.dataset_key, self.passing_grade, self.grade_bands)
+    
+    def get_ranking_index(self, df: pd.DataFrame, persist: bool = True) -> RankingIndex:
+        """
+        ترتيب الطلاب لمجموعة البيانات، يُبنى مرة واحدة وتُقتطع منه القوائم المرتبة
+        
+        يُحفظ الترتيب بجانب الجدول المنظف تحت بصمة الملف، ويُعاد استخدامه
+        لنفس الجدول طوال الجلسة دون إعادة ترتيب.
+        
+        Args:
+            df: DataFrame المنظف
+            persist: حفظ الترتيب واسترجاعه (False للبيانات المدمجة التي لا تطابق بصمة الملف)
+        
+        Returns:
+            كائن RankingIndex
+        """
+        if self._ranking is not None and self._ranking.df is df and self._ranking.passing_grade == self.passing_grade:
+            return self._ranking
+        
+        key = None
+        cached = None
+        if persist and self.dataset_key:
+            key = f"{self.dataset_key}-ranking"
+            cached = self.shared_store.open(key) if self.shared_store is not None else None
+            if cached is None and self.cache is not None:
+                cached = self.cache.get(key)
+        
+        if cached is not None and len(cached) == len(df):
+            ranking = RankingIndex(df, cached['order'].to_numpy(), self.passing_grade)
         else:
-            # استخدام معيار النجاح التقليدي (50 من 100)
-            passing_students = len(grades[grades >= self.passing_grade])
-            stats['pass_rate'] = (passing_students / len(grades)) * 100
-            stats['fail_rate'] = 100 - stats['pass_rate']
-            stats['passing_count'] = passing_students
-            stats['failing_count'] = len(grades) - passing_students
+            ranking = RankingIndex.build(df, self.passing_grade)
+            if key is not None:
+                if self.shared_store is None or not self.shared_store.publish(key, ranking.to_frame()):
+                    if self.cache is not None:
+                        self.cache.put(key, ranking.to_frame())
         
-        return stats
+        self._ranking = ranking
+        return ranking
     
     def categorize_grades(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -209,86 +1140,44 @@ class DataProcessor:
         Returns:
             DataFrame يحتوي على التصنيفات
         """
+        return self._memoized(df, 'ranges', self._categorize_grades)
+    
+    def _categorize_grades(self, df: pd.DataFrame) -> pd.DataFrame:
+        """حساب جدول النطاقات دون ذاكرة النتائج"""
         # استخدام النسبة المئوية إن وجدت، وإلا استخدام الدرجة مباشرة
-        if 'النسبة المئوية' in df.columns:
-            percentages = df['النسبة المئوية']
-            total_students = len(percentages)
-            
-            # تعريف النطاقات بناءً على النسبة المئوية
-            ranges = {
-                'ممتاز (90-100%)': len(percentages[(percentages >= 90) & (percentages <= 100)]),
-                'جيد جداً (80-89%)': len(percentages[(percentages >= 80) & (percentages < 90)]),
-                'جيد (70-79%)': len(percentages[(percentages >= 70) & (percentages < 80)]),
-                'مقبول (60-69%)': len(percentages[(percentages >= 60) & (percentages < 70)]),
-                'ضعيف (50-59%)': len(percentages[(percentages >= 50) & (percentages < 60)]),
-                'راسب (0-49%)': len(percentages[percentages < 50])
-            }
-        else:
-            # استخدام الدرجة مباشرة (افتراض أنها من 100)
-            grades = df['الدرجة']
-            total_students = len(grades)
-            
-            ranges = {
-                'ممتاز (90-100)': len(grades[(grades >= 90) & (grades <= 100)]),
-                'جيد جداً (80-89)': len(grades[(grades >= 80) & (grades < 90)]),
-                'جيد (70-79)': len(grades[(grades >= 70) & (grades < 80)]),
-                'مقبول (60-69)': len(grades[(grades >= 60) & (grades < 70)]),
-                'ضعيف (50-59)': len(grades[(grades >= 50) & (grades < 60)]),
-                'راسب (0-49)': len(grades[grades < 50])
-            }
-        
-        # إنشاء DataFrame للنتائج
-        ranges_data = []
-        for range_name, count in ranges.items():
-            ranges_data.append([range_name, count])
-        
-        result_df = pd.DataFrame(ranges_data, columns=['النطاق', 'عدد الطلاب'])
-        result_df['النسبة %'] = (result_df['عدد الطلاب'] / total_students * 100).round(1)
-        
-        return result_df
+        values, _, unit = classification_basis(df, self.passing_grade)
+        counts = np.bincount(self.grade_bands.codes(values), minlength=len(self.grade_bands.labels))
+            
+        return self.grade_bands.summary(counts, unit)
     
     def get_grade_details(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        الحصول على تفاصيل الدرجات مرتبة مع التصنيف الصحيح
+        الحصول على تفاصيل الدرجات مرتبة مع التصنيف الصحيح والترتيب النسبي
         
         Args:
             df: DataFrame يحتوي على البيانات
             
         Returns:
-            DataFrame مرتب حسب الدرجات
-        """
-        result_df = df.copy()
-        
-        # إضافة عمود التصنيف باستخدام النسبة المئوية إن وجدت
-        def classify_grade(percentage):
-            if percentage >= 90:
-                return 'ممتاز'
-            elif percentage >= 80:
-                return 'جيد جداً'
-            elif percentage >= 70:
-                return 'جيد'
-            elif percentage >= 60:
-                return 'مقبول'
-            elif percentage >= 50:
-                return 'ضعيف'
-            else:
-                return 'راسب'
-        
-        # تحديد العمود المستخدم للتصنيف والحالة
-        if 'النسبة المئوية' in result_df.columns:
-            result_df['التصنيف'] = result_df['النسبة المئوية'].apply(classify_grade)
-            result_df['الحالة'] = result_df['النسبة المئوية'].apply(lambda x: 'ناجح' if x >= 50 else 'راسب')
-            # ترتيب حسب النسبة المئوية (تنازلي)
-            result_df = result_df.sort_values('النسبة المئوية', ascending=False)
-        else:
-            result_df['التصنيف'] = result_df['الدرجة'].apply(classify_grade)
-            result_df['الحالة'] = result_df['الدرجة'].apply(lambda x: 'ناجح' if x >= self.passing_grade else 'راسب')
-            # ترتيب حسب الدرجة (تنازلي)
-            result_df = result_df.sort_values('الدرجة', ascending=False)
+            DataFrame مرتب حسب الدرجات مع الرتبة المئينية والدرجة المعيارية
+            والترتيب في الفصل والمادة (إن وجدت أعمدتها)
+        """
+        return self._memoized(df, f'details-{self.rank_method}', self._grade_details)
+    
+    def _grade_details(self, df: pd.DataFrame) -> pd.DataFrame:
+        """حساب جدول التفاصيل دون ذاكرة النتائج"""
+        # الترتيب التنازلي من فهرس الترتيب المشترك
+        ranking = self.get_ranking_index(df, persist=False)
+        result_df = ranking.ordered()
+        
+        # التصنيف والحالة في عملية متجهة واحدة (على النسبة المئوية إن وجدت)
+        values, threshold, _ = classification_basis(result_df, self.passing_grade)
+        bands = self.grade_bands.classify(values, threshold)
+        result_df['التصنيف'] = bands.labels
+        result_df['الحالة'] = bands.status
         
-        result_df = result_df.reset_index(drop=True)
-        result_df.index = result_df.index + 1
-        result_df = result_df.rename_axis('الترتيب')
+        # الرتبة المئينية والدرجة المعيارية والترتيب داخل الفصل والمادة
+        rank_columns = ranking.rank_columns(self.rank_method)
+        result_df[list(rank_columns.columns)] = rank_columns
         
         return result_df
     
@@ -303,17 +1192,8 @@ class DataProcessor:
         Returns:
             DataFrame يحتوي على الطلاب المتفوقين
         """
-        # استخدام النسبة المئوية للترتيب إن وجدت
-        if 'النسبة المئوية' in df.columns:
-            top_students = df.nlargest(top_n, 'النسبة المئوية').copy()
-        else:
-            top_students = df.nlargest(top_n, 'الدرجة').copy()
-            
-        top_students = top_students.reset_index(drop=True)
-        top_students.index = top_students.index + 1
-        top_students = top_students.rename_axis('المرتبة')
-        
-        return top_students
+        # أول top_n من فهرس الترتيب (النسبة المئوية إن وجدت)
+        return self.get_ranking_index(df, persist=False).top(top_n)
     
     def get_failing_students(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -325,31 +1205,26 @@ class DataProcessor:
         Returns:
             DataFrame يحتوي على الطلاب المتعثرين
         """
-        # استخدام النسبة المئوية للتقييم إن وجدت
-        if 'النسبة المئوية' in df.columns:
-            failing_students = df[df['النسبة المئوية'] < 50].copy()
-            failing_students = failing_students.sort_values('النسبة المئوية', ascending=True).reset_index(drop=True)
-            failing_students['الفجوة'] = 50 - failing_students['النسبة المئوية']
-        else:
-            failing_students = df[df['الدرجة'] < self.passing_grade].copy()
-            failing_students = failing_students.sort_values('الدرجة', ascending=True).reset_index(drop=True)
-            failing_students['الفجوة'] = self.passing_grade - failing_students['الدرجة']
-            
-        failing_students.index = failing_students.index + 1
+        # ما بعد موضع حد النجاح في فهرس الترتيب (النسبة المئوية إن وجدت)
+        ranking = self.get_ranking_index(df, persist=False)
+        failing_students = ranking.failing()
+        failing_students['الفجوة'] = ranking.threshold - failing_students[ranking.column]
         
         return failing_students
     
-    def get_statistical_summary(self, df: pd.DataFrame) -> pd.DataFrame:
+    def get_statistical_summary(self, df: pd.DataFrame, grade_statistics: Optional[GradeStatistics] = None) -> pd.DataFrame:
         """
         ملخص إحصائي شامل
         
         Args:
             df: DataFrame يحتوي على البيانات
+            grade_statistics: نتيجة compute_statistics إن كانت محسوبة مسبقاً
             
         Returns:
             DataFrame يحتوي على الملخص الإحصائي
         """
-        grades = df['الدرجة']
+        result = grade_statistics or self.compute_statistics(df)
+        grades = result.grades
         
         summary = pd.DataFrame({
             'الإحصائية': [
@@ -368,19 +1243,19 @@ class DataProcessor:
                 'نسبة الرسوب'
             ],
             'القيمة': [
-                len(grades),
-                f"{grades.mean():.2f}",
-                f"{grades.median():.2f}",
-                f"{grades.mode().iloc[0]:.2f}" if not grades.mode().empty else "N/A",
-                f"{grades.std():.2f}",
-                f"{grades.min():.2f}",
-                f"{grades.max():.2f}",
-                f"{grades.max() - grades.min():.2f}",
-                f"{grades.quantile(0.25):.2f}",
-                f"{grades.quantile(0.75):.2f}",
-                f"{grades.quantile(0.75) - grades.quantile(0.25):.2f}",
-                f"{len(grades[grades >= self.passing_grade]) / len(grades) * 100:.1f}%",
-                f"{len(grades[grades < self.passing_grade]) / len(grades) * 100:.1f}%"
+                grades.count,
+                f"{grades.mean:.2f}",
+                f"{grades.median:.2f}",
+                f"{grades.mode:.2f}" if grades.count else "N/A",
+                f"{grades.std:.2f}",
+                f"{grades.min:.2f}",
+                f"{grades.max:.2f}",
+                f"{grades.range:.2f}",
+                f"{grades.q1:.2f}",
+                f"{grades.q3:.2f}",
+                f"{grades.iqr:.2f}",
+                f"{result.grade_passing_count / grades.count * 100:.1f}%",
+                f"{(grades.count - result.grade_passing_count) / grades.count * 100:.1f}%"
             ]
         })
         
@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.data_processor import CATEGORICAL_COLUMNS
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands, classification_basis
+
+# مفتاح الصف في مجموعة البيانات المحفوظة
+KEY_COLUMNS = ['اسم الطالب', 'الصف', 'الفصل', 'المادة']
+
+# أعمدة المصدر لا تدخل في مقارنة القيم (إعادة رفع نفس البيانات باسم آخر لا تُعد تغييراً)
+SOURCE_COLUMNS = ['الملف', 'الورقة']
+
+# المجاميع التراكمية القابلة للطرح والإضافة
+SUM_FIELDS = ['count', 'grade_sum', 'grade_sumsq', 'pct_sum', 'pct_sumsq', 'total_sum', 'passing']
+
+
+class DatasetStore:
+    """مجموعة بيانات محفوظة تُضاف إليها الملفات الجديدة تدريجياً مع تحديث المجاميع بالفروق"""
+    
+    def __init__(self, store_dir: str, passing_grade: float = 50, grade_bands: GradeBands = DEFAULT_GRADE_BANDS):
+        """
+        Args:
+            store_dir: مجلد حفظ البيانات (dataset.parquet) والمجاميع (aggregates.json)
+            passing_grade: درجة النجاح عند غياب النسبة المئوية
+            grade_bands: جدول نطاقات التقدير للعدادات التراكمية
+        """
+        self.store_dir = store_dir
+        self.passing_grade = passing_grade
+        self.grade_bands = grade_bands
+        self.data_path = os.path.join(store_dir, 'dataset.parquet')
+        self.aggregates_path = os.path.join(store_dir, 'aggregates.json')
+        self._lock = threading.Lock()
+        
+        os.makedirs(store_dir, exist_ok=True)
+        self.df = self._load_data()
+        self.aggregates = self._load_aggregates()
+        self.last_changes = {'new': 0, 'changed': 0, 'unchanged': 0}
+    
+    def append(self, new_df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """
+        دمج ملف منظف جديد في مجموعة البيانات المحفوظة
+        
+        الصفوف ذات المفاتيح الجديدة تُضاف، والصفوف التي تغيرت قيمها تستبدل
+        القديمة، والصفوف المطابقة تُتجاهل. تُحدَّث المجاميع بطرح مساهمة
+        الصفوف المستبدلة وإضافة مساهمة الصفوف الجديدة فقط.
+        
+        Args:
+            new_df: DataFrame منظف من DataProcessor
+        
+        Returns:
+            مجموعة البيانات الكاملة بعد الدمج أو None في حالة الخطأ
+        """
+        key_columns = [c for c in KEY_COLUMNS if c in new_df.columns]
+        
+        with self._lock:
+            self._sync_aggregates()
+            if not self.df.empty:
+                stored_columns = set(self.df.columns) - set(SOURCE_COLUMNS)
+                new_columns = set(new_df.columns) - set(SOURCE_COLUMNS)
+                if stored_columns != new_columns:
+                    st.error("أعمدة الملف الجديد لا تطابق أعمدة البيانات المحفوظة")
+                    return None
+            
+            # آخر ظهور للمفتاح داخل الملف الجديد هو المعتمد
+            new_df = new_df.drop_duplicates(subset=key_columns, keep='last').reset_index(drop=True)
+            value_columns = [c for c in new_df.columns if c not in SOURCE_COLUMNS]
+            
+            if self.df.empty:
+                is_new = np.ones(len(new_df), dtype=bool)
+                changed_positions = np.array([], dtype=np.intp)
+                changed = np.zeros(len(new_df), dtype=bool)
+            else:
+                stored_keys = pd.Index(self._hash_rows(self.df, key_columns))
+                positions = stored_keys.get_indexer(self._hash_rows(new_df, key_columns))
+                is_new = positions == -1
+                
+                # مقارنة بصمات القيم للصفوف الموجودة فقط
+                matched = np.flatnonzero(~is_new)
+                stored_values = self._hash_rows(self.df.iloc[positions[matched]], value_columns)
+                new_values = self._hash_rows(new_df.iloc[matched], value_columns)
+                differs = stored_values != new_values
+                
+                changed = np.zeros(len(new_df), dtype=bool)
+                changed[matched[differs]] = True
+                changed_positions = positions[matched[differs]]
+            
+            added = new_df[is_new | changed]
+            removed = self.df.iloc[changed_positions] if len(changed_positions) else self.df.iloc[0:0]
+            
+            # تحديث المجاميع بالفروق
+            delta_add = self._aggregate(added)
+            delta_remove = self._aggregate(removed)
+            for field in SUM_FIELDS:
+                self.aggregates[field] += delta_add[field] - delta_remove[field]
+            self.aggregates['bands'] = [
+                a + b - c for a, b, c in zip(self.aggregates['bands'], delta_add['bands'], delta_remove['bands'])
+            ]
+            
+            if len(changed_positions):
+                self.df = self.df.drop(index=self.df.index[changed_positions])
+            if not added.empty:
+                frames = [f for f in (self.df, added) if not f.empty]
+                categorical = [c for c in CATEGORICAL_COLUMNS
+                               if any(isinstance(f[c].dtype, pd.CategoricalDtype) for f in frames if c in f.columns)]
+                self.df = self._restore_categories(pd.concat(frames, ignore_index=True), categorical)
+            else:
+                self.df = self.df.reset_index(drop=True)
+            
+            self.last_changes = {
+                'new': int(is_new.sum()),
+                'changed': int(changed.sum()),
+                'unchanged': int(len(new_df) - is_new.sum() - changed.sum()),
+            }
+            
+            if not added.empty or len(changed_positions):
+                self._save()
+            
+            return self.df
+    
+    def stats(self) -> Dict:
+        """
+        الإحصائيات بنفس شكل DataProcessor.calculate_basic_stats من المجاميع التراكمية
+        
+        المتوسط والانحراف ونسب النجاح من المجاميع مباشرة؛ الوسيط والربيعيات
+        والقيم الدنيا والعليا من الأعمدة المحفوظة (دون إعادة تنظيف).
+        
+        Returns:
+            قاموس يحتوي على الإحصائيات
+        """
+        self._sync_aggregates()
+        agg = self.aggregates
+        count = agg['count']
+        grades = self.df['الدرجة'].to_numpy(dtype=float)
+        
+        q1, median, q3 = np.quantile(grades, [0.25, 0.5, 0.75]) if count else (np.nan, np.nan, np.nan)
+        stats = {
+            'count': count,
+            'mean': agg['grade_sum'] / count if count else np.nan,
+            'median': median,
+            'std': self._sample_std(agg['grade_sum'], agg['grade_sumsq'], count),
+            'min': grades.min() if count else np.nan,
+            'max': grades.max() if count else np.nan,
+            'q1': q1,
+            'q3': q3,
+        }
+        
+        if 'الدرجة الكلية' in self.df.columns:
+            totals = self.df['الدرجة الكلية'].to_numpy(dtype=float)
+            stats['total_mean'] = agg['total_sum'] / count if count else np.nan
+            stats['total_max'] = totals.max() if count else np.nan
+            stats['total_min'] = totals.min() if count else np.nan
+        
+        if 'النسبة المئوية' in self.df.columns:
+            stats['percentage_mean'] = agg['pct_sum'] / count if count else np.nan
+            stats['percentage_median'] = np.median(self.df['النسبة المئوية'].to_numpy(dtype=float)) if count else np.nan
+            stats['percentage_std'] = self._sample_std(agg['pct_sum'], agg['pct_sumsq'], count)
+        
+        stats['pass_rate'] = (agg['passing'] / count) * 100 if count else 0
+        stats['fail_rate'] = 100 - stats['pass_rate']
+        stats['passing_count'] = agg['passing']
+        stats['failing_count'] = count - agg['passing']
+        
+        return stats
+    
+    def grade_ranges(self) -> pd.DataFrame:
+        """
+        توزيع النطاقات بنفس شكل DataProcessor.categorize_grades من العدادات التراكمية
+        
+        Returns:
+            DataFrame يحتوي على التصنيفات
+        """
+        self._sync_aggregates()
+        unit = '%' if 'النسبة المئوية' in self.df.columns else ''
+        return self.grade_bands.summary(self.aggregates['bands'], unit)
+    
+    def clear(self):
+        """حذف مجموعة البيانات المحفوظة ومجاميعها"""
+        with self._lock:
+            self.df = pd.DataFrame()
+            self.aggregates = self._empty_aggregates()
+            for path in (self.data_path, self.aggregates_path):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def _aggregate(self, df: pd.DataFrame) -> Dict:
+        """حساب مساهمة مجموعة صفوف في المجاميع التراكمية"""
+        agg = self._empty_aggregates()
+        if df.empty:
+            return agg
+        
+        grades = df['الدرجة'].to_numpy(dtype=float)
+        agg['count'] = len(grades)
+        agg['grade_sum'] = float(grades.sum())
+        agg['grade_sumsq'] = float(np.square(grades).sum())
+        
+        if 'الدرجة الكلية' in df.columns:
+            agg['total_sum'] = float(df['الدرجة الكلية'].to_numpy(dtype=float).sum())
+        
+        if 'النسبة المئوية' in df.columns:
+            percentages = df['النسبة المئوية'].to_numpy(dtype=float)
+            agg['pct_sum'] = float(percentages.sum())
+            agg['pct_sumsq'] = float(np.square(percentages).sum())
+        
+        # النجاح والعدادات بترتيب النطاقات من الأعلى إلى الأدنى
+        values, threshold, _ = classification_basis(df, self.passing_grade)
+        bands = self.grade_bands.classify(values, threshold)
+        agg['passing'] = int(bands.passed.sum())
+        agg['bands'] = list(bands.counts)
+        
+        return agg
+    
+    def _empty_aggregates(self) -> Dict:
+        """مجاميع فارغة"""
+        agg = {field: 0 for field in SUM_FIELDS}
+        agg['bands'] = [0] * len(self.grade_bands.labels)
+        agg['band_edges'] = self.grade_bands.edges.tolist()
+        agg['passing_grade'] = float(self.passing_grade)
+        return agg
+    
+    @staticmethod
+    def _sample_std(total: float, total_sq: float, count: int) -> float:
+        """الانحراف المعياري للعينة من المجموع ومجموع المربعات"""
+        if count < 2:
+            return np.nan
+        variance = (total_sq - total * total / count) / (count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+    
+    @staticmethod
+    def _hash_rows(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+        """بصمة 64-bit لكل صف من الأعمدة المحددة"""
+        return pd.util.hash_pandas_object(df[columns], index=False).to_numpy()
+    
+    @staticmethod
+    def _restore_categories(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """إعادة الأعمدة الفئوية بعد الدمج (يحولها concat إلى نصوص عند اختلاف الفئات)"""
+        for column in columns:
+            if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('category')
+        return df
+    
+    def _load_data(self) -> pd.DataFrame:
+        """تحميل مجموعة البيانات المحفوظة إن وجدت"""
+        if os.path.exists(self.data_path):
+            return pd.read_parquet(self.data_path)
+        return pd.DataFrame()
+    
+    def _load_aggregates(self) -> Dict:
+        """تحميل المجاميع المحفوظة أو حسابها من البيانات عند غيابها"""
+        if os.path.exists(self.aggregates_path):
+            with open(self.aggregates_path, 'r', encoding='utf-8') as f:
+                aggregates = json.load(f)
+            if self._is_current(aggregates):
+                return aggregates
+        return self._aggregate(self.df)
+    
+    def _is_current(self, aggregates: Dict) -> bool:
+        """هل حُسبت المجاميع بجدول النطاقات ودرجة النجاح الحاليين (وإلا تُعاد من البيانات)"""
+        return (aggregates.get('band_edges') == self.grade_bands.edges.tolist()
+                and aggregates.get('passing_grade') == float(self.passing_grade))
+    
+    def _sync_aggregates(self):
+        """إعادة حساب المجاميع من البيانات إذا تغير جدول النطاقات أو درجة النجاح بعد التحميل"""
+        if not self._is_current(self.aggregates):
+            self.aggregates = self._aggregate(self.df)
+    
+    def _save(self):
+        """حفظ البيانات والمجاميع بكتابة ذرية"""
+        tmp_path = f"{self.data_path}.tmp"
+        self.df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.data_path)
+        
+        tmp_path = f"{self.aggregates_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.aggregates, f)
+        os.replace(tmp_path, self.aggregates_path)
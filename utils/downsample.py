@@ -0,0 +1,49 @@
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    تقليل نقاط منحنى مع الحفاظ على شكله بخوارزمية Largest-Triangle-Three-Buckets
+    
+    تُقسم النقاط الداخلية إلى n_out - 2 حاوية، ويُختار من كل حاوية النقطة التي
+    تكوّن أكبر مثلث مع النقطة المختارة قبلها ومتوسط الحاوية التالية. الأولى
+    والأخيرة تبقيان دائماً. المساحات داخل كل حاوية تُحسب متجهياً.
+    
+    Args:
+        x: إحداثيات x مرتبة تصاعدياً
+        y: إحداثيات y
+        n_out: عدد النقاط المطلوب (3 على الأقل)
+    
+    Returns:
+        مواضع النقاط المختارة مرتبة تصاعدياً
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    
+    # حدود الحاويات على النقاط الداخلية [1, n - 1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    # متوسط كل حاوية (النقطة الثالثة لمثلث الحاوية السابقة) والنقطة الأخيرة كحاوية ختامية
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    sizes = np.diff(edges)
+    mean_x = np.append(sums_x / sizes, x[-1])
+    mean_y = np.append(sums_y / sizes, y[-1])
+    
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], y[previous]
+        cx, cy = mean_x[bucket + 1], mean_y[bucket + 1]
+        # ضعف مساحة المثلث (ax,ay) (bx,by) (cx,cy) لكل نقطة في الحاوية
+        areas = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    
+    return selected
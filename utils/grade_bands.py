@@ -0,0 +1,187 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# جدول النطاقات الافتراضي: (الحد الأدنى، التسمية) من الأعلى إلى الأدنى
+DEFAULT_BANDS = [
+    (90, 'ممتاز'),
+    (80, 'جيد جداً'),
+    (70, 'جيد'),
+    (60, 'مقبول'),
+    (50, 'ضعيف'),
+    (0, 'راسب'),
+]
+
+# تسميات حالة الطالب بترتيب رموزها (0 راسب، 1 ناجح)
+STATUS_LABELS = ['راسب', 'ناجح']
+
+
+@dataclass(frozen=True)
+class BandResult:
+    """نتيجة تصنيف مجموعة قيم دفعة واحدة"""
+    
+    codes: np.ndarray          # رمز النطاق لكل قيمة (0 = النطاق الأعلى)
+    labels: pd.Categorical     # تسمية النطاق لكل قيمة
+    passed: np.ndarray         # هل القيمة ناجحة
+    status: pd.Categorical     # 'ناجح' أو 'راسب' لكل قيمة
+    counts: Tuple[int, ...]    # عدد القيم في كل نطاق من الأعلى إلى الأدنى
+
+
+class GradeBands:
+    """جدول نطاقات التقدير (حدود دنيا وتسميات) يُطبق بعمليات متجهة"""
+    
+    def __init__(self, bands: Sequence[Tuple[float, str]] = DEFAULT_BANDS, upper_bound: float = 100):
+        """
+        Args:
+            bands: أزواج (الحد الأدنى، التسمية) بأي ترتيب؛ أدنى حد يمثل بداية النطاق الأخير
+            upper_bound: الحد الأعلى لعرض مدى النطاق الأعلى
+        """
+        ordered = sorted(((float(lower), str(label)) for lower, label in bands), reverse=True)
+        if len(ordered) < 2:
+            raise ValueError("جدول النطاقات يجب أن يحتوي على نطاقين على الأقل")
+        if len({lower for lower, _ in ordered}) != len(ordered):
+            raise ValueError("حدود النطاقات يجب أن تكون مختلفة")
+        
+        self.bands = ordered
+        self.upper_bound = upper_bound
+        self.labels = [label for _, label in ordered]
+        # الحدود الدنيا تصاعدياً دون حد النطاق الأدنى (مدخلات searchsorted)
+        self.edges = np.array([lower for lower, _ in reversed(ordered[:-1])], dtype=float)
+    
+    @classmethod
+    def from_config(cls, config: Union[str, Dict[str, float]]) -> 'GradeBands':
+        """
+        إنشاء جدول من إعدادات المدرسة
+        
+        Args:
+            config: قاموس {التسمية: الحد الأدنى} أو نصه بصيغة JSON
+        
+        Returns:
+            كائن GradeBands
+        """
+        if isinstance(config, str):
+            config = json.loads(config)
+        return cls([(lower, label) for label, lower in config.items()])
+    
+    def __eq__(self, other) -> bool:
+        """جدولان متساويان إذا تطابقت الحدود والتسميات"""
+        return isinstance(other, GradeBands) and self.bands == other.bands and self.upper_bound == other.upper_bound
+    
+    def __hash__(self) -> int:
+        """بصمة الجدول (للاستخدام كمفتاح تخزين مؤقت)"""
+        return hash((tuple(self.bands), self.upper_bound))
+    
+    def codes(self, values) -> np.ndarray:
+        """
+        رمز النطاق لكل قيمة (0 = النطاق الأعلى) بعملية searchsorted واحدة
+        
+        القيم المفقودة تُصنف في النطاق الأدنى كما في المقارنات السابقة.
+        
+        Args:
+            values: مصفوفة أو عمود رقمي
+        
+        Returns:
+            مصفوفة int8
+        """
+        values = np.asarray(values, dtype=float)
+        ascending = np.searchsorted(self.edges, values, side='right')
+        ascending[np.isnan(values)] = 0
+        return (len(self.edges) - ascending).astype(np.int8)
+    
+    def classify(self, values, passing_threshold: float) -> BandResult:
+        """
+        تصنيف القيم وحساب حالة النجاح والعدادات في تمريرة واحدة
+        
+        Args:
+            values: مصفوفة أو عمود رقمي (نسبة مئوية أو درجة)
+            passing_threshold: الحد الأدنى للنجاح
+        
+        Returns:
+            كائن BandResult
+        """
+        values = np.asarray(values, dtype=float)
+        codes = self.codes(values)
+        passed = values >= passing_threshold
+        counts = np.bincount(codes, minlength=len(self.labels))
+        
+        return BandResult(
+            codes=codes,
+            labels=pd.Categorical.from_codes(codes, categories=self.labels),
+            passed=passed,
+            status=pd.Categorical.from_codes(passed.astype(np.int8), categories=STATUS_LABELS),
+            counts=tuple(int(c) for c in counts),
+        )
+    
+    def count_sorted(self, sorted_values: np.ndarray) -> Tuple[int, ...]:
+        """
+        عدادات النطاقات من مصفوفة مرتبة دون قيم مفقودة (بحث ثنائي لكل حد فقط)
+        
+        Args:
+            sorted_values: مصفوفة مرتبة تصاعدياً
+        
+        Returns:
+            العدادات من النطاق الأعلى إلى الأدنى
+        """
+        cuts = np.searchsorted(sorted_values, self.edges, side='left')
+        counts = np.diff(np.concatenate(([0], cuts, [len(sorted_values)])))
+        return tuple(int(c) for c in counts[::-1])
+    
+    def range_names(self, unit: str = '') -> List[str]:
+        """
+        أسماء النطاقات مع مداها، مثل 'ممتاز (90-100%)'
+        
+        Args:
+            unit: '%' للنسبة المئوية أو '' للدرجة
+        
+        Returns:
+            قائمة الأسماء من الأعلى إلى الأدنى
+        """
+        names = []
+        upper = None
+        for lower, label in self.bands:
+            if upper is None:
+                top = self.upper_bound
+            else:
+                top = upper - 1 if float(upper).is_integer() and float(lower).is_integer() else upper
+            names.append(f"{label} ({lower:g}-{top:g}{unit})")
+            upper = lower
+        return names
+    
+    def summary(self, counts: Sequence[int], unit: str = '') -> pd.DataFrame:
+        """
+        جدول توزيع النطاقات بشكل DataProcessor.categorize_grades
+        
+        Args:
+            counts: العدادات من النطاق الأعلى إلى الأدنى
+            unit: '%' للنسبة المئوية أو '' للدرجة
+        
+        Returns:
+            DataFrame بأعمدة النطاق وعدد الطلاب والنسبة %
+        """
+        result_df = pd.DataFrame({'النطاق': self.range_names(unit), 'عدد الطلاب': list(counts)})
+        total = int(sum(counts))
+        result_df['النسبة %'] = (result_df['عدد الطلاب'] / total * 100).round(1) if total else 0.0
+        return result_df
+
+
+def classification_basis(df: pd.DataFrame, passing_grade: float):
+    """
+    العمود المعتمد للتصنيف ومعيار النجاح
+    
+    Args:
+        df: DataFrame منظف
+        passing_grade: درجة النجاح عند غياب النسبة المئوية
+    
+    Returns:
+        (القيم، حد النجاح، وحدة العرض): النسبة المئوية و50% إن وجدت،
+        وإلا الدرجة ودرجة النجاح
+    """
+    if 'النسبة المئوية' in df.columns:
+        return df['النسبة المئوية'], 50, '%'
+    return df['الدرجة'], passing_grade, ''
+
+
+DEFAULT_GRADE_BANDS = GradeBands()
@@ -0,0 +1,227 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands, classification_basis
+
+# التسلسل الهرمي للتجميع: كل مستوى يُجمع مع المستويات التي قبله (الصف ← الفصل ← المادة)
+HIERARCHY = ['الصف', 'الفصل', 'المادة']
+
+# أبعاد تُجمع وحدها على مستوى المدرسة
+DIMENSIONS = ['المادة', 'المعلم', 'المدير']
+
+# أعمدة الإحصائيات لكل مجموعة (تليها أعمدة النطاقات)
+STAT_COLUMNS = ['عدد الطلاب', 'المتوسط', 'الوسيط', 'الانحراف المعياري', 'أقل درجة', 'أعلى درجة',
+                'الربع الأول', 'الربع الثالث', 'عدد الناجحين', 'نسبة النجاح %']
+
+
+class GroupStatistics:
+    """إحصائيات جميع مستويات التجميع محسوبة مسبقاً للتصفح دون إعادة الحساب"""
+    
+    def __init__(self, levels: Dict[Tuple[str, ...], pd.DataFrame], hierarchy: List[str], band_labels: List[str]):
+        """
+        Args:
+            levels: جدول الإحصائيات لكل مستوى مفهرس بأعمدة التجميع (() للمدرسة كاملة)
+            hierarchy: أعمدة التسلسل الهرمي المتاحة في البيانات
+            band_labels: تسميات أعمدة النطاقات
+        """
+        self.levels = levels
+        self.hierarchy = hierarchy
+        self.band_labels = band_labels
+    
+    @property
+    def total(self) -> pd.Series:
+        """إحصائيات المدرسة كاملة"""
+        return self.levels[()].iloc[0]
+    
+    @property
+    def dimensions(self) -> List[str]:
+        """الأبعاد المستقلة المتاحة"""
+        return [columns[0] for columns in self.levels if len(columns) == 1 and columns[0] in DIMENSIONS]
+    
+    def level(self, columns: Sequence[str]) -> Optional[pd.DataFrame]:
+        """
+        جدول مستوى تجميع
+        
+        Args:
+            columns: أعمدة التجميع
+        
+        Returns:
+            DataFrame بأعمدة التجميع ثم الإحصائيات، أو None إن لم يكن المستوى محسوباً
+        """
+        frame = self.levels.get(tuple(columns))
+        return None if frame is None else frame.reset_index()
+    
+    def drilldown(self, path: Sequence) -> Optional[pd.DataFrame]:
+        """
+        المجموعات الفرعية لمسار في التسلسل الهرمي
+        
+        Args:
+            path: القيم المختارة بترتيب التسلسل (() لجميع قيم المستوى الأول)
+        
+        Returns:
+            DataFrame بالمستوى التالي ضمن المسار، أو None إذا كان المسار في آخر مستوى
+        """
+        depth = len(path)
+        if depth >= len(self.hierarchy):
+            return None
+        
+        frame = self.levels[tuple(self.hierarchy[:depth + 1])]
+        if depth:
+            mask = np.ones(len(frame), dtype=bool)
+            for position, value in enumerate(path):
+                mask &= frame.index.get_level_values(position) == value
+            frame = frame[mask]
+        
+        return frame.reset_index(level=list(range(depth)), drop=True).reset_index() if depth else frame.reset_index()
+
+
+def compute_group_statistics(df: pd.DataFrame, passing_grade: float = 50,
+                             grade_bands: GradeBands = DEFAULT_GRADE_BANDS,
+                             hierarchy: Sequence[str] = HIERARCHY,
+                             dimensions: Sequence[str] = DIMENSIONS) -> GroupStatistics:
+    """
+    حساب الإحصائيات الكاملة لكل مستويات التجميع مع التجميعات الأعلى
+    
+    تُرمَّز أعمدة التجميع مرة واحدة ويُبنى رمز كل مستوى من رمز المستوى الأعلى منه،
+    وتُرتب الدرجات مرة واحدة. لكل مستوى يُعاد ترتيب رموز المجموعات ترتيباً مستقراً
+    فتبقى الدرجات مرتبة داخل كل مجموعة متجاورة، ثم تُحسب العدادات والمجاميع بـ
+    reduceat والكميات بالفهرسة المباشرة والنطاقات بـ bincount.
+    
+    Args:
+        df: DataFrame منظف
+        passing_grade: درجة النجاح عند غياب النسبة المئوية
+        grade_bands: جدول نطاقات التقدير
+        hierarchy: أعمدة التسلسل الهرمي من الأعلى إلى الأدنى
+        dimensions: أعمدة تُجمع وحدها
+    
+    Returns:
+        كائن GroupStatistics
+    """
+    hierarchy = [c for c in hierarchy if c in df.columns]
+    levels_columns = [tuple(hierarchy[:depth]) for depth in range(len(hierarchy) + 1)]
+    levels_columns += [(c,) for c in dimensions if c in df.columns and (c,) not in levels_columns]
+    
+    grades = df['الدرجة'].to_numpy(dtype=float)
+    values, threshold, _ = classification_basis(df, passing_grade)
+    bands = grade_bands.classify(values, threshold)
+    
+    # ترتيب واحد للدرجات يُستخدم في جميع المستويات
+    order = np.argsort(grades, kind='stable')
+    sorted_grades = grades[order]
+    sorted_passed = bands.passed[order]
+    sorted_bands = bands.codes[order]
+    
+    # ترميز كل عمود تجميع مرة واحدة (القيم مرتبة لتطابق ترتيب الفهارس)
+    factors = {c: pd.factorize(df[c], sort=True, use_na_sentinel=False)
+               for columns in levels_columns for c in columns}
+    
+    levels = {}
+    codes, keys = np.zeros(len(df), dtype=np.int64), []
+    for columns in levels_columns:
+        if columns and list(columns) == hierarchy[:len(columns)]:
+            # مستوى هرمي: يُبنى على رموز المستوى السابق مباشرة
+            codes, keys = _extend_codes(codes, keys, *factors[columns[-1]])
+        elif columns:
+            codes, keys = _extend_codes(np.zeros(len(df), dtype=np.int64), [], *factors[columns[0]])
+        
+        if columns:
+            index = pd.MultiIndex.from_arrays(keys, names=list(columns)) if len(keys) > 1 else pd.Index(keys[0], name=columns[0])
+        else:
+            index = pd.Index(['الإجمالي'])
+        
+        result = _grouped_stats(codes[order], sorted_grades, sorted_passed, sorted_bands,
+                                len(index), len(grade_bands.labels))
+        frame = pd.DataFrame(result[0], index=index, columns=STAT_COLUMNS)
+        frame[grade_bands.labels] = result[1]
+        frame['عدد الطلاب'] = frame['عدد الطلاب'].astype(int)
+        frame['عدد الناجحين'] = frame['عدد الناجحين'].astype(int)
+        levels[columns] = frame
+    
+    return GroupStatistics(levels, hierarchy, list(grade_bands.labels))
+
+
+def _extend_codes(codes: np.ndarray, keys: List[np.ndarray], column_codes: np.ndarray, uniques):
+    """
+    رموز مجموعات متراصة (0..k-1) بإضافة عمود إلى رموز مستوى سابق
+    
+    ترتيب الرموز الناتجة يطابق الترتيب المعجمي لقيم المفاتيح.
+    
+    Returns:
+        (رمز المجموعة لكل صف، قائمة مصفوفات قيم المفاتيح لكل مجموعة)
+    """
+    cardinality = max(len(uniques), 1)
+    combined = codes * cardinality + column_codes
+    size = (int(codes.max()) + 1 if len(codes) else 1) * cardinality
+    
+    if size <= 4 * len(combined) + 1024:
+        present = np.flatnonzero(np.bincount(combined, minlength=size))
+        remap = np.zeros(size, dtype=np.int64)
+        remap[present] = np.arange(len(present))
+        dense = remap[combined]
+    else:
+        present, dense = np.unique(combined, return_inverse=True)
+    
+    parents, positions = np.divmod(present, cardinality)
+    uniques = np.asarray(uniques, dtype=object)
+    return dense, [key[parents] for key in keys] + [uniques[positions]]
+
+
+def _grouped_stats(codes: np.ndarray, values: np.ndarray, passed: np.ndarray, band_codes: np.ndarray,
+                   group_count: int, band_count: int):
+    """
+    الإحصائيات لكل مجموعة من رموز مجموعات متوافقة مع قيم مرتبة تصاعدياً
+    
+    Returns:
+        (مصفوفة الإحصائيات بترتيب STAT_COLUMNS، مصفوفة عدادات النطاقات)
+    """
+    stats = np.full((group_count, len(STAT_COLUMNS)), np.nan)
+    band_counts = np.zeros((group_count, band_count), dtype=np.int64)
+    if len(values) == 0:
+        stats[:, 0] = 0
+        stats[:, 8] = 0
+        return stats, band_counts
+    
+    # ترتيب مستقر حسب المجموعة: القيم تبقى مرتبة داخل كل مجموعة
+    # (الرموز الصغيرة تُرتب بالترتيب الجذري في NumPy)
+    if group_count <= np.iinfo(np.uint16).max:
+        codes = codes.astype(np.uint16)
+    permutation = np.argsort(codes, kind='stable')
+    groups = codes[permutation].astype(np.int64)
+    v = values[permutation]
+    
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    counts = np.diff(np.append(starts, len(v)))
+    ends = starts + counts - 1
+    present = groups[starts]
+    
+    mean = np.add.reduceat(v, starts) / counts
+    deviations = v - np.repeat(mean, counts)
+    m2 = np.add.reduceat(deviations * deviations, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.where(counts > 1, np.sqrt(m2 / (counts - 1)), np.nan)
+    
+    def quantile(q):
+        position = starts + q * (counts - 1)
+        lower = np.floor(position).astype(np.intp)
+        upper = np.minimum(lower + 1, ends)
+        return v[lower] + (v[upper] - v[lower]) * (position - lower)
+    
+    passing = np.add.reduceat(passed[permutation].astype(np.int64), starts)
+    
+    stats[present, 0] = counts
+    stats[present, 1] = mean
+    stats[present, 2] = quantile(0.5)
+    stats[present, 3] = std
+    stats[present, 4] = v[starts]
+    stats[present, 5] = v[ends]
+    stats[present, 6] = quantile(0.25)
+    stats[present, 7] = quantile(0.75)
+    stats[present, 8] = passing
+    stats[present, 9] = passing / counts * 100
+    
+    flat = np.bincount(groups * band_count + band_codes[permutation], minlength=group_count * band_count)
+    band_counts[:] = flat.reshape(group_count, band_count)
+    
+    return stats, band_counts
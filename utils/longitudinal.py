@@ -0,0 +1,237 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from utils.schema_detector import normalize_header
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# أعمدة مفتاح الطالب عبر الفصول الدراسية (الاسم بعد التطبيع، الصف، الفصل)
+KEY_COLUMNS = ['اسم الطالب', 'الصف', 'الفصل']
+
+# أعمدة تعريف الفصل لمقارنة الفصول
+CLASS_COLUMNS = ['الصف', 'الفصل']
+
+# المسافات كما يعرفها \s في re (\s في RE2 الخاص بـ pyarrow يقتصر على مسافات ASCII)
+_WHITESPACE = r'[\s\x{0B}\x{1C}-\x{1F}\x{85}\p{Z}]'
+
+# معامل خلط بصمات أعمدة المفتاح (عدد أولي فردي، الضرب بالتفاف 64-bit)
+_HASH_MULTIPLIER = np.uint64(0x100000001B3)
+
+
+class LongitudinalAnalysis:
+    """مقارنة نتائج عدة فصول دراسية لكل طالب ولكل فصل بعد ربط الطلاب بمفتاح مجزأ"""
+    
+    def __init__(self, terms: List[str], column: str, students: pd.DataFrame,
+                 classes: pd.DataFrame, summary: pd.DataFrame):
+        """
+        Args:
+            terms: أسماء الفصول الدراسية بالترتيب الزمني
+            column: العمود المقارن ('النسبة المئوية' أو 'الدرجة')
+            students: جدول الطلاب بعمود لكل فصل دراسي والتغير
+            classes: جدول الفصول بمتوسط كل فصل دراسي والتغير
+            summary: ملخص كل فصل دراسي
+        """
+        self.terms = terms
+        self.column = column
+        self.students = students
+        self.classes = classes
+        self.summary = summary
+    
+    @classmethod
+    def build(cls, terms: Dict[str, pd.DataFrame], passing_grade: float = 50) -> 'LongitudinalAnalysis':
+        """
+        ربط الفصول الدراسية وحساب التغيرات
+        
+        لكل فصل دراسي تُحسب بصمة 64-bit لمفتاح كل صف ويُجمع متوسط الطالب بـ
+        factorize وbincount، ثم تُربط الفصول بجدول تجزئة واحد للمفاتيح
+        (Index.get_indexer) بدلاً من مقارنة كل طالب بكل طالب.
+        
+        Args:
+            terms: {اسم الفصل الدراسي: DataFrame منظف} بالترتيب الزمني
+            passing_grade: درجة النجاح عند المقارنة بالدرجة
+        
+        Returns:
+            كائن LongitudinalAnalysis
+        """
+        names = list(terms)
+        # عمود مشترك بين جميع الفصول الدراسية لتكون الفروق على نفس المقياس
+        column = 'النسبة المئوية' if all('النسبة المئوية' in df.columns for df in terms.values()) else 'الدرجة'
+        threshold = 50 if column == 'النسبة المئوية' else passing_grade
+        
+        term_students = []
+        summary_rows = []
+        class_means = []
+        class_layouts = set()
+        for name in names:
+            df = terms[name]
+            values = df[column].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+            
+            codes, keys = pd.factorize(student_keys(df))
+            counts = np.bincount(codes, weights=valid, minlength=len(keys))
+            sums = np.bincount(codes, weights=np.where(valid, values, 0.0), minlength=len(keys))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means = sums / counts
+            
+            # أول صف لكل طالب (الإسناد العكسي يترك أول ظهور)
+            first = np.empty(len(keys), dtype=np.intp)
+            first[codes[::-1]] = np.arange(len(codes))[::-1]
+            term_students.append((keys, means, df.iloc[first][[c for c in KEY_COLUMNS if c in df.columns]]))
+            
+            summary_rows.append({
+                'الفصل الدراسي': name,
+                'عدد الطلاب': len(keys),
+                'المتوسط': values[valid].mean() if valid.any() else np.nan,
+                'نسبة النجاح %': (values[valid] >= threshold).mean() * 100 if valid.any() else 0.0,
+            })
+            
+            class_columns = [c for c in CLASS_COLUMNS if c in df.columns]
+            class_layouts.add(tuple(class_columns))
+            if class_columns:
+                class_means.append(df.groupby(class_columns, observed=True)[column].mean().rename(name))
+        
+        # مقارنة الفصول تتطلب نفس أعمدة تعريف الفصل في كل فصل دراسي
+        if len(class_layouts) > 1:
+            class_means = []
+        
+        # ربط بالتجزئة: فهرس واحد لجميع المفاتيح ثم بحث كل فصل دراسي فيه
+        all_keys = pd.Index(pd.unique(np.concatenate([keys for keys, _, _ in term_students])))
+        scores = np.full((len(all_keys), len(names)), np.nan)
+        info = None
+        for t, (keys, means, rows) in enumerate(term_students):
+            positions = all_keys.get_indexer(keys)
+            scores[positions, t] = means
+            rows = rows.reset_index(drop=True).astype(object)
+            if info is None:
+                info = pd.DataFrame(index=range(len(all_keys)), columns=rows.columns, dtype=object)
+            # بيانات العرض من آخر فصل دراسي ظهر فيه الطالب
+            info.loc[positions, rows.columns] = rows.to_numpy()
+        
+        students = info.copy()
+        students[names] = scores.round(2)
+        students['عدد الفصول الدراسية'] = (~np.isnan(scores)).sum(axis=1)
+        students['التغير'] = _first_to_last(scores).round(2)
+        if len(names) > 1:
+            students['التغير الأخير'] = (scores[:, -1] - scores[:, -2]).round(2)
+        
+        classes = cls._class_table(students, class_means, names)
+        return cls(names, column, students, classes, pd.DataFrame(summary_rows))
+    
+    @staticmethod
+    def _class_table(students: pd.DataFrame, class_means: List[pd.Series], names: List[str]) -> pd.DataFrame:
+        """متوسط كل فصل في كل فصل دراسي مع التغير ومتوسط تغير الطلاب المرتبطين"""
+        if not class_means:
+            return pd.DataFrame()
+        
+        # ربط الفصول الدراسية على فهرس الفصل (ربط بالتجزئة في pandas)
+        classes = pd.concat(class_means, axis=1).reindex(columns=names)
+        scores = classes.to_numpy(dtype=float)
+        classes = classes.round(2)
+        classes['التغير'] = _first_to_last(scores).round(2)
+        
+        class_columns = list(classes.index.names)
+        student_change = students.dropna(subset=['التغير']).groupby(class_columns)['التغير'].agg(['mean', 'size'])
+        student_change.index = student_change.index.set_names(class_columns)
+        classes['متوسط تغير الطلاب'] = student_change['mean'].reindex(classes.index).round(2)
+        classes['الطلاب المرتبطون'] = student_change['size'].reindex(classes.index).fillna(0).astype(int)
+        return classes.reset_index()
+    
+    def improvement(self, n: int = 10) -> pd.DataFrame:
+        """
+        أكثر الطلاب تحسناً
+        
+        Args:
+            n: عدد الطلاب
+        
+        Returns:
+            DataFrame مرتب تنازلياً حسب التغير (التغير الموجب فقط)
+        """
+        improved = self.students[self.students['التغير'] > 0]
+        return self._numbered(improved.nlargest(n, 'التغير'))
+    
+    def decline(self, n: int = 10) -> pd.DataFrame:
+        """
+        أكثر الطلاب تراجعاً
+        
+        Args:
+            n: عدد الطلاب
+        
+        Returns:
+            DataFrame مرتب تصاعدياً حسب التغير (التغير السالب فقط)
+        """
+        declined = self.students[self.students['التغير'] < 0]
+        return self._numbered(declined.nsmallest(n, 'التغير'))
+    
+    @staticmethod
+    def _numbered(df: pd.DataFrame) -> pd.DataFrame:
+        """ترقيم الصفوف من 1"""
+        df = df.reset_index(drop=True)
+        df.index = df.index + 1
+        return df.rename_axis('المرتبة')
+
+
+def student_keys(df: pd.DataFrame) -> np.ndarray:
+    """
+    بصمة 64-bit لمفتاح الطالب (الاسم بعد التطبيع + الصف + الفصل) لكل صف
+    
+    يُطبع ويُجزأ كل عمود على قيمه المختلفة فقط ثم تُوزع البصمات بالفهرسة.
+    
+    Args:
+        df: DataFrame منظف
+    
+    Returns:
+        مصفوفة uint64
+    """
+    keys = np.zeros(len(df), dtype=np.uint64)
+    for column in KEY_COLUMNS:
+        if column not in df.columns:
+            continue
+        codes, uniques = pd.factorize(df[column], use_na_sentinel=False)
+        hashes = pd.util.hash_array(normalize_values(uniques))
+        keys = keys * _HASH_MULTIPLIER ^ hashes[codes]
+    return keys
+
+
+def normalize_values(values) -> np.ndarray:
+    """
+    تطبيع النصوص للمطابقة (الهمزات، التاء المربوطة، التشكيل، المسافات، حالة الأحرف)
+    
+    Args:
+        values: قيم نصية أو رقمية
+    
+    Returns:
+        مصفوفة object من النصوص المطبعة
+    """
+    values = pd.Series(np.asarray(values, dtype=object)).fillna('').astype(str)
+    if not PYARROW_AVAILABLE:
+        return np.array([normalize_header(value) for value in values], dtype=object)
+    
+    # نفس خطوات normalize_header بنفس الترتيب (لتتطابق البصمات بوجود pyarrow أو بدونه)
+    text = pa.array(values.to_numpy(), type=pa.string())
+    text = pc.replace_substring_regex(text, '[\u064B-\u0652\u0640]', '')
+    text = pc.utf8_lower(pc.replace_substring_regex(text, f'^{_WHITESPACE}+|{_WHITESPACE}+$', ''))
+    text = pc.replace_substring_regex(text, '[أإآ]', 'ا')
+    text = pc.replace_substring(pc.replace_substring(text, 'ة', 'ه'), 'ى', 'ي')
+    text = pc.replace_substring_regex(text, r'[:_\-\.]+', ' ')
+    text = pc.replace_substring_regex(text, f'{_WHITESPACE}*/{_WHITESPACE}*', '/')
+    text = pc.replace_substring_regex(text, f'{_WHITESPACE}+', ' ')
+    text = pc.replace_substring_regex(text, '^ | $', '')
+    return np.asarray(text.to_pylist(), dtype=object)
+
+
+def _first_to_last(scores: np.ndarray) -> np.ndarray:
+    """الفرق بين آخر وأول قيمة متاحة في كل صف (NaN إن توفرت أقل من قيمتين)"""
+    present = ~np.isnan(scores)
+    columns = scores.shape[1]
+    first = np.argmax(present, axis=1)
+    last = columns - 1 - np.argmax(present[:, ::-1], axis=1)
+    rows = np.arange(len(scores))
+    change = scores[rows, last] - scores[rows, first]
+    return np.where(present.sum(axis=1) >= 2, change, np.nan)
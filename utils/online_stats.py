@@ -0,0 +1,480 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands, classification_basis
+
+
+class RunningMoments:
+    """المتوسط والتباين والقيم الدنيا والعليا بتحديث تراكمي (Welford بصيغة الدمج لـ Chan)"""
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # مجموع مربعات الانحرافات عن المتوسط
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def update(self, values: np.ndarray):
+        """
+        إضافة دفعة من القيم (تُتجاهل القيم المفقودة)
+        
+        Args:
+            values: مصفوفة رقمية
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        
+        chunk_mean = float(values.mean())
+        deviations = values - chunk_mean
+        self._combine(len(values), chunk_mean, float(deviations @ deviations),
+                      float(values.min()), float(values.max()))
+    
+    def merge(self, other: 'RunningMoments'):
+        """
+        دمج مجمّع آخر (من دفعة أو عملية أخرى)
+        
+        Args:
+            other: كائن RunningMoments
+        """
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+    
+    def _combine(self, count: int, mean: float, m2: float, minimum: float, maximum: float):
+        """دمج إحصائيات مجموعة بالصيغة المتوازية (دقيقة عددياً دون مجموع المربعات)"""
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, minimum)
+        self.max = max(self.max, maximum)
+    
+    def to_dict(self) -> Dict:
+        """الحالة كقاموس من أنواع بسيطة (قابل للتحويل إلى JSON ولإرساله بين العمليات)"""
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+    
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'RunningMoments':
+        """
+        استعادة مجمّع من to_dict
+        
+        Args:
+            state: قاموس الحالة
+        
+        Returns:
+            كائن RunningMoments
+        """
+        moments = cls()
+        moments.count = int(state['count'])
+        moments.mean = float(state['mean'])
+        moments.m2 = float(state['m2'])
+        moments.min = float(state['min'])
+        moments.max = float(state['max'])
+        return moments
+    
+    @property
+    def variance(self) -> float:
+        """تباين العينة"""
+        return self.m2 / (self.count - 1) if self.count > 1 else float('nan')
+    
+    @property
+    def std(self) -> float:
+        """الانحراف المعياري للعينة"""
+        return math.sqrt(self.variance) if self.count > 1 else float('nan')
+
+
+class QuantileSketch:
+    """
+    مقدّر الكميات التدفقي بذاكرة محدودة
+    
+    يبدأ دقيقاً: يحتفظ بكل قيمة مختلفة وعدد تكرارها، فتطابق الكميات استيفاء
+    pandas تماماً ما دام عدد القيم المختلفة لا يتجاوز max_distinct (الدرجات
+    الصحيحة أو بنصف درجة، والنسب المقربة لمنزلتين).
+    
+    بعد ذلك يتحول إلى t-digest بدمج متجه: يُجمع كل ما يقع داخل وحدة واحدة من
+    مقياس k(q) = δ/(2π)·asin(2q−1)، فلا يحمل المركز عند الكمية q أكثر من
+    2π·√(q(1−q))/δ من القيم، وتقع الكمية المقدرة بين الكميتين الحقيقيتين عند
+    q ± ε حيث:
+        
+        ε = π·√(q(1−q)) / δ
+    
+    مع δ = 500 الافتراضية: ε ≤ 0.32% عند الوسيط و≤ 0.28% عند الربيعيات (حوالي
+    250 مركزاً). القيم الدنيا والعليا دقيقة دائماً.
+    """
+    
+    def __init__(self, compression: float = 500, max_distinct: int = 10000):
+        """
+        Args:
+            compression: δ، يحدد الدقة وعدد المراكز (حوالي δ/2)
+            max_distinct: أقصى عدد قيم مختلفة يُحتفظ به بدقة كاملة
+        """
+        self.compression = compression
+        self.max_distinct = max_distinct
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.exact = True
+    
+    def update(self, values: np.ndarray):
+        """
+        إضافة دفعة من القيم (تُتجاهل القيم المفقودة)
+        
+        Args:
+            values: مصفوفة رقمية
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate((self.means, values)),
+                       np.concatenate((self.weights, np.ones(len(values)))), self.exact)
+    
+    def merge(self, other: 'QuantileSketch'):
+        """
+        دمج مقدّر آخر
+        
+        Args:
+            other: كائن QuantileSketch
+        """
+        if not other.count:
+            return
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate((self.means, other.means)),
+                       np.concatenate((self.weights, other.weights)), self.exact and other.exact)
+    
+    def to_dict(self) -> Dict:
+        """
+        الحالة كقاموس من أنواع بسيطة (قابل للتحويل إلى JSON ولإرساله بين العمليات)
+        
+        حجمه محدود بعدد المراكز (أو القيم المختلفة في الوضع الدقيق) لا بعدد القيم.
+        """
+        return {
+            'compression': self.compression,
+            'max_distinct': self.max_distinct,
+            'exact': self.exact,
+            'count': self.count,
+            'min': self.min,
+            'max': self.max,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'QuantileSketch':
+        """
+        استعادة مقدّر من to_dict
+        
+        Args:
+            state: قاموس الحالة
+        
+        Returns:
+            كائن QuantileSketch
+        """
+        sketch = cls(state['compression'], state['max_distinct'])
+        sketch.exact = bool(state['exact'])
+        sketch.count = int(state['count'])
+        sketch.min = float(state['min'])
+        sketch.max = float(state['max'])
+        sketch.means = np.asarray(state['means'], dtype=float)
+        sketch.weights = np.asarray(state['weights'], dtype=float)
+        return sketch
+    
+    def quantile(self, q: float) -> float:
+        """
+        الكمية q بالاستيفاء الخطي (نفس طريقة pandas الافتراضية في الوضع الدقيق)
+        
+        Args:
+            q: بين 0 و1
+        
+        Returns:
+            القيمة المقدرة
+        """
+        if not self.count:
+            return float('nan')
+        
+        position = q * (self.count - 1)
+        cumulative = np.cumsum(self.weights)
+        
+        if self.exact:
+            # القيمة عند الترتيب i هي أول قيمة يتجاوز تكرارها التراكمي i
+            lower = math.floor(position)
+            upper = min(lower + 1, self.count - 1)
+            low_value, high_value = self.means[np.searchsorted(cumulative, [lower, upper], side='right')]
+            return float(low_value + (high_value - low_value) * (position - lower))
+        
+        # استيفاء بين مواضع مراكز المراكز على محور الترتيب (0 .. n−1)
+        centers = cumulative - (self.weights + 1) / 2
+        positions = np.concatenate(([0.0], centers, [self.count - 1.0]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        return float(np.interp(position, positions, values))
+    
+    def _compress(self, means: np.ndarray, weights: np.ndarray, exact: bool):
+        """ترتيب المراكز وجمع القيم المتساوية، ثم دمج ما يقع في نفس وحدة مقياس k عند تجاوز الحد"""
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        
+        # جمع القيم المتساوية لا يفقد أي دقة
+        starts = np.flatnonzero(np.concatenate(([True], means[1:] != means[:-1])))
+        if len(starts) < len(means):
+            means, weights = means[starts], np.add.reduceat(weights, starts)
+        
+        total = weights.sum()
+        self.count = int(round(total))
+        
+        if exact and len(means) <= self.max_distinct:
+            self.means, self.weights, self.exact = means, weights, True
+            return
+        self.exact = False
+        
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / total
+        k = self.compression / (2 * math.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1))
+        clusters = np.floor(k - k[0]).astype(np.int64)
+        
+        starts = np.flatnonzero(np.concatenate(([True], clusters[1:] != clusters[:-1])))
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+
+class KeyHashSet:
+    """مجموعة بصمات 64-bit لمفاتيح الصفوف لكشف التكرار عبر الدفعات (8 بايت لكل صف)"""
+    
+    def __init__(self):
+        # دفعات مرتبة بأحجام متصاعدة تُدمج عند تقارب أحجامها (بحث ثنائي في كل منها)
+        self._runs: List[np.ndarray] = []
+    
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        إضافة بصمات وإرجاع قناع ما ظهر سابقاً (في دفعة سابقة أو قبله في نفس الدفعة)
+        
+        Args:
+            hashes: بصمات uint64 بترتيب الصفوف
+        
+        Returns:
+            قناع التكرار
+        """
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            seen |= run[positions] == hashes
+        
+        _, first = np.unique(hashes, return_index=True)
+        repeated = np.ones(len(hashes), dtype=bool)
+        repeated[first] = False
+        seen |= repeated
+        
+        run = np.sort(hashes[~seen])
+        while self._runs and len(self._runs[-1]) <= 2 * len(run):
+            run = np.sort(np.concatenate((self._runs.pop(), run)))
+        if len(run):
+            self._runs.append(run)
+        return seen
+
+
+class OnlineStatistics:
+    """مجمّع إحصائيات يُغذى دفعة بدفعة ويعيد نفس شكل DataProcessor.calculate_basic_stats"""
+    
+    def __init__(self, passing_grade: float = 50, grade_bands: GradeBands = DEFAULT_GRADE_BANDS,
+                 compression: float = 500):
+        """
+        Args:
+            passing_grade: درجة النجاح عند غياب النسبة المئوية
+            grade_bands: جدول نطاقات التقدير
+            compression: دقة مقدّر الكميات (انظر QuantileSketch)
+        """
+        self.passing_grade = passing_grade
+        self.grade_bands = grade_bands
+        self.grades = RunningMoments()
+        self.grade_quantiles = QuantileSketch(compression)
+        self.percentages: Optional[RunningMoments] = None
+        self.percentage_quantiles: Optional[QuantileSketch] = None
+        self.totals: Optional[RunningMoments] = None
+        self.passing_count = 0
+        self.band_counts = np.zeros(len(grade_bands.labels), dtype=np.int64)
+    
+    def update(self, chunk: pd.DataFrame):
+        """
+        إضافة دفعة منظفة
+        
+        Args:
+            chunk: DataFrame بالأعمدة المعتمدة بعد التحقق
+        """
+        grades = chunk['الدرجة'].to_numpy(dtype=float)
+        self.grades.update(grades)
+        self.grade_quantiles.update(grades)
+        
+        if 'الدرجة الكلية' in chunk.columns:
+            if self.totals is None:
+                self.totals = RunningMoments()
+            self.totals.update(chunk['الدرجة الكلية'].to_numpy(dtype=float))
+        
+        if 'النسبة المئوية' in chunk.columns:
+            if self.percentages is None:
+                self.percentages = RunningMoments()
+                self.percentage_quantiles = QuantileSketch(self.grade_quantiles.compression)
+            percentages = chunk['النسبة المئوية'].to_numpy(dtype=float)
+            self.percentages.update(percentages)
+            self.percentage_quantiles.update(percentages)
+        
+        values, threshold, _ = classification_basis(chunk, self.passing_grade)
+        bands = self.grade_bands.classify(values, threshold)
+        self.passing_count += int(bands.passed.sum())
+        self.band_counts += np.asarray(bands.counts, dtype=np.int64)
+    
+    def merge(self, other: 'OnlineStatistics'):
+        """
+        دمج مجمّع آخر (من ملف أو عملية أخرى)
+        
+        Args:
+            other: كائن OnlineStatistics بنفس جدول النطاقات
+        """
+        self.grades.merge(other.grades)
+        self.grade_quantiles.merge(other.grade_quantiles)
+        if other.totals is not None:
+            if self.totals is None:
+                self.totals = RunningMoments()
+            self.totals.merge(other.totals)
+        if other.percentages is not None:
+            if self.percentages is None:
+                self.percentages = RunningMoments()
+                self.percentage_quantiles = QuantileSketch(other.percentage_quantiles.compression)
+            self.percentages.merge(other.percentages)
+            self.percentage_quantiles.merge(other.percentage_quantiles)
+        self.passing_count += other.passing_count
+        self.band_counts += other.band_counts
+    
+    def to_dict(self) -> Dict:
+        """
+        الحالة كقاموس من أنواع بسيطة لإرسالها من عملية العامل أو حفظها لكل مدرسة
+        
+        Returns:
+            قاموس قابل للتحويل إلى JSON
+        """
+        return {
+            'passing_grade': self.passing_grade,
+            'bands': [[lower, label] for lower, label in self.grade_bands.bands],
+            'upper_bound': self.grade_bands.upper_bound,
+            'grades': self.grades.to_dict(),
+            'grade_quantiles': self.grade_quantiles.to_dict(),
+            'percentages': self.percentages.to_dict() if self.percentages is not None else None,
+            'percentage_quantiles': self.percentage_quantiles.to_dict() if self.percentages is not None else None,
+            'totals': self.totals.to_dict() if self.totals is not None else None,
+            'passing_count': self.passing_count,
+            'band_counts': self.band_counts.tolist(),
+        }
+    
+    @classmethod
+    def from_dict(cls, state: Dict) -> 'OnlineStatistics':
+        """
+        استعادة مجمّع من to_dict
+        
+        Args:
+            state: قاموس الحالة
+        
+        Returns:
+            كائن OnlineStatistics
+        """
+        grade_bands = GradeBands([tuple(band) for band in state['bands']], state['upper_bound'])
+        if grade_bands == DEFAULT_GRADE_BANDS:
+            grade_bands = DEFAULT_GRADE_BANDS
+        
+        accumulator = cls(state['passing_grade'], grade_bands)
+        accumulator.grades = RunningMoments.from_dict(state['grades'])
+        accumulator.grade_quantiles = QuantileSketch.from_dict(state['grade_quantiles'])
+        if state['percentages'] is not None:
+            accumulator.percentages = RunningMoments.from_dict(state['percentages'])
+            accumulator.percentage_quantiles = QuantileSketch.from_dict(state['percentage_quantiles'])
+        if state['totals'] is not None:
+            accumulator.totals = RunningMoments.from_dict(state['totals'])
+        accumulator.passing_count = int(state['passing_count'])
+        accumulator.band_counts = np.asarray(state['band_counts'], dtype=np.int64)
+        return accumulator
+    
+    def box_summary(self) -> Dict:
+        """
+        مدخلات المخطط الصندوقي للدرجات من المقدّر دون القيم الخام
+        
+        حدود الشعيرات هي Q1 − 1.5 IQR وQ3 + 1.5 IQR مقصوصة إلى أقل وأعلى درجة
+        (لا تُعرف أبعد قيمة داخل الحدين دون القيم الخام).
+        
+        Returns:
+            قاموس: count, mean, min, q1, median, q3, max, lower_fence, upper_fence
+        """
+        q1 = self.grade_quantiles.quantile(0.25)
+        q3 = self.grade_quantiles.quantile(0.75)
+        count = self.grades.count
+        minimum = self.grades.min if count else np.nan
+        maximum = self.grades.max if count else np.nan
+        iqr = q3 - q1
+        return {
+            'count': count,
+            'mean': self.grades.mean if count else np.nan,
+            'min': minimum,
+            'q1': q1,
+            'median': self.grade_quantiles.quantile(0.5),
+            'q3': q3,
+            'max': maximum,
+            'lower_fence': max(minimum, q1 - 1.5 * iqr),
+            'upper_fence': min(maximum, q3 + 1.5 * iqr),
+        }
+    
+    def to_stats_dict(self) -> Dict:
+        """
+        الإحصائيات بنفس شكل DataProcessor.calculate_basic_stats
+        
+        الوسيط والربيعيات تقديرية بحدود الخطأ الموثقة في QuantileSketch،
+        وبقية القيم دقيقة.
+        
+        Returns:
+            قاموس يحتوي على الإحصائيات
+        """
+        count = self.grades.count
+        stats = {
+            'count': count,
+            'mean': self.grades.mean if count else np.nan,
+            'median': self.grade_quantiles.quantile(0.5),
+            'std': self.grades.std,
+            'min': self.grades.min if count else np.nan,
+            'max': self.grades.max if count else np.nan,
+            'q1': self.grade_quantiles.quantile(0.25),
+            'q3': self.grade_quantiles.quantile(0.75),
+        }
+        
+        if self.totals is not None:
+            stats['total_mean'] = self.totals.mean if self.totals.count else np.nan
+            stats['total_max'] = self.totals.max if self.totals.count else np.nan
+            stats['total_min'] = self.totals.min if self.totals.count else np.nan
+        
+        if self.percentages is not None:
+            stats['percentage_mean'] = self.percentages.mean if self.percentages.count else np.nan
+            stats['percentage_median'] = self.percentage_quantiles.quantile(0.5)
+            stats['percentage_std'] = self.percentages.std
+        
+        stats['pass_rate'] = (self.passing_count / count) * 100 if count else 0
+        stats['fail_rate'] = 100 - stats['pass_rate']
+        stats['passing_count'] = self.passing_count
+        stats['failing_count'] = count - self.passing_count
+        
+        return stats
+    
+    def grade_ranges(self) -> pd.DataFrame:
+        """
+        توزيع النطاقات بنفس شكل DataProcessor.categorize_grades
+        
+        Returns:
+            DataFrame يحتوي على التصنيفات
+        """
+        unit = '%' if self.percentages is not None else ''
+        return self.grade_bands.summary([int(c) for c in self.band_counts], unit)
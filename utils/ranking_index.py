@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import classification_basis
+
+# أعمدة الترتيب داخل المجموعات: (اسم العمود، أعمدة التجميع، العمود الذي يجب وجوده)
+GROUP_RANKS = [
+    ('الترتيب في الفصل', ['الصف', 'الفصل'], 'الفصل'),
+    ('الترتيب في المادة', ['المادة'], 'المادة'),
+]
+
+# جميع أعمدة الترتيب النسبي بترتيب عرضها
+RANK_COLUMNS = ['الرتبة المئينية', 'الدرجة المعيارية'] + [name for name, _, _ in GROUP_RANKS]
+
+# طرق الترتيب عند التساوي: 'min' تنافسي (1، 2، 2، 4) و'dense' متصل (1، 2، 2، 3)
+RANK_METHODS = ('min', 'dense')
+
+
+class RankingIndex:
+    """
+    ترتيب واحد لمجموعة البيانات تُقتطع منه قوائم المتفوقين والمتعثرين والتفاصيل
+    
+    الترتيب تنازلي مستقر حسب العمود المعتمد (النسبة المئوية إن وجدت وإلا الدرجة)
+    والقيم المفقودة في آخره، فيطابق أول N منه nlargest(keep='first'). موضع حد
+    النجاح يُحدد ببحث ثنائي واحد: الناجحون قبله والمتعثرون بعده.
+    """
+    
+    def __init__(self, df: pd.DataFrame, order: np.ndarray, passing_grade: float = 50):
+        """
+        Args:
+            df: DataFrame المنظف الذي بُني عليه الترتيب
+            order: مواضع الصفوف مرتبة تنازلياً (من build أو من التخزين المؤقت)
+            passing_grade: درجة النجاح عند غياب النسبة المئوية
+        """
+        values, threshold, _ = classification_basis(df, passing_grade)
+        self.values = np.asarray(values, dtype=float)
+        ranked = self.values[order]
+        
+        self.df = df
+        self.order = order
+        self.passing_grade = passing_grade
+        self.column = values.name
+        self.threshold = threshold
+        self.valid_count = int(len(ranked) - np.isnan(ranked).sum())
+        # عدد القيم >= حد النجاح في الجزء المرتب تنازلياً (بحث ثنائي على القيم السالبة التصاعدية)
+        self.pass_cut = int(np.searchsorted(-ranked[:self.valid_count], -threshold, side='right'))
+    
+    @classmethod
+    def build(cls, df: pd.DataFrame, passing_grade: float = 50) -> 'RankingIndex':
+        """
+        بناء الترتيب بعملية argsort واحدة
+        
+        Args:
+            df: DataFrame منظف
+            passing_grade: درجة النجاح عند غياب النسبة المئوية
+        
+        Returns:
+            كائن RankingIndex
+        """
+        values, _, _ = classification_basis(df, passing_grade)
+        order = np.argsort(-np.asarray(values, dtype=float), kind='stable')
+        return cls(df, order, passing_grade)
+    
+    def to_frame(self) -> pd.DataFrame:
+        """الترتيب كجدول بعمود واحد للحفظ في ذاكرة التخزين المؤقت"""
+        return pd.DataFrame({'order': self.order})
+    
+    @property
+    def failing_count(self) -> int:
+        """عدد المتعثرين (دون القيم المفقودة)"""
+        return self.valid_count - self.pass_cut
+    
+    def top(self, n: int = 10) -> pd.DataFrame:
+        """
+        أفضل n طالب
+        
+        Args:
+            n: عدد الطلاب المطلوب
+        
+        Returns:
+            DataFrame مفهرس بالمرتبة من 1
+        """
+        return self._ranked(self.order[:min(n, self.valid_count)], 'المرتبة')
+    
+    def failing(self) -> pd.DataFrame:
+        """
+        الطلاب دون حد النجاح مرتبين تصاعدياً
+        
+        Returns:
+            DataFrame مفهرس من 1
+        """
+        positions = self.order[self.pass_cut:self.valid_count]
+        # ترتيب تصاعدي مستقر يبقي المتساوين بترتيب الملف (عكس الترتيب التنازلي يقلبهم)
+        return self._ranked(positions[np.argsort(self.values[positions], kind='stable')], None)
+    
+    def ordered(self) -> pd.DataFrame:
+        """
+        جميع الطلاب مرتبين تنازلياً (القيم المفقودة في الآخر)
+        
+        Returns:
+            DataFrame مفهرس بالترتيب من 1
+        """
+        return self._ranked(self.order, 'الترتيب')
+    
+    def rank_columns(self, method: str = 'min') -> pd.DataFrame:
+        """
+        أعمدة الترتيب النسبي بنفس ترتيب ordered()
+        
+        الرتبة المئينية = (عدد الأقل + نصف عدد المتساوين) / العدد × 100، وحدود كل
+        تتابع لقيم متساوية تُحدد بمسح خطي للقيم المرتبة (تراكم أقصى وأدنى)، والدرجة
+        المعيارية بالانحراف المعياري للعينة، والترتيب داخل كل فصل ومادة من إعادة
+        ترتيب مستقرة للترتيب العام حسب رمز المجموعة.
+        
+        Args:
+            method: 'min' (تنافسي) أو 'dense' (متصل) للقيم المتساوية
+        
+        Returns:
+            DataFrame مفهرس بالترتيب من 1
+        """
+        if method not in RANK_METHODS:
+            raise ValueError(f"طريقة الترتيب غير معروفة: {method}")
+        
+        values = self.values[self.order]
+        missing = np.isnan(values)
+        valid = values[:self.valid_count]
+        
+        # القيم مرتبة تنازلياً: كل تتابع لقيم متساوية يبدأ بعد جميع القيم الأكبر منه
+        positions = np.arange(len(valid))
+        run_start = np.maximum.accumulate(np.where(np.concatenate(([True], valid[1:] != valid[:-1])), positions, 0))
+        run_end = np.minimum.accumulate(np.where(np.concatenate((valid[1:] != valid[:-1], [True])), positions, len(valid))[::-1])[::-1]
+        equal = run_end - run_start + 1
+        below = self.valid_count - run_start - equal
+        
+        percentile = np.full(len(values), np.nan)
+        z_score = np.full(len(values), np.nan)
+        if self.valid_count:
+            percentile[:self.valid_count] = (below + 0.5 * equal) / self.valid_count * 100
+            std = valid.std(ddof=1) if self.valid_count > 1 else np.nan
+            with np.errstate(invalid='ignore', divide='ignore'):
+                z_score[:self.valid_count] = (valid - valid.mean()) / std
+        
+        columns = pd.DataFrame({'الرتبة المئينية': percentile.round(1), 'الدرجة المعيارية': z_score.round(2)})
+        for name, group_columns, required in GROUP_RANKS:
+            if required in self.df.columns:
+                group_columns = [c for c in group_columns if c in self.df.columns]
+                columns[name] = self._group_ranks(group_columns, method)
+        
+        columns.index = columns.index + 1
+        return columns.rename_axis('الترتيب')
+    
+    def _group_ranks(self, columns, method: str) -> pd.arrays.IntegerArray:
+        """الترتيب داخل كل مجموعة بنفس ترتيب ordered() (القيم المفقودة بلا ترتيب)"""
+        # رمز المجموعة من ترميز كل عمود (القيم المفقودة مجموعة مستقلة)
+        codes = np.zeros(len(self.df), dtype=np.int64)
+        size = 1
+        for column in columns:
+            column_codes, uniques = pd.factorize(self.df[column], use_na_sentinel=False)
+            codes = codes * max(len(uniques), 1) + column_codes
+            size *= max(len(uniques), 1)
+        codes = codes[self.order]
+        if size <= np.iinfo(np.uint16).max:
+            codes = codes.astype(np.uint16)  # الرموز الصغيرة تُرتب بالترتيب الجذري
+        
+        # ترتيب مستقر حسب المجموعة يبقي القيم تنازلية داخل كل مجموعة
+        within = np.argsort(codes, kind='stable')
+        groups = codes[within]
+        values = self.values[self.order][within]
+        
+        positions = np.arange(len(values))
+        new_group = np.concatenate(([True], groups[1:] != groups[:-1]))
+        new_value = new_group | np.concatenate(([True], values[1:] != values[:-1]))
+        group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+        
+        if method == 'dense':
+            runs = np.cumsum(new_value)
+            ranks = runs - runs[group_start] + 1
+        else:
+            ranks = np.maximum.accumulate(np.where(new_value, positions, 0)) - group_start + 1
+        
+        result = np.empty(len(values), dtype=np.int32)
+        result[within] = ranks
+        return pd.arrays.IntegerArray(result, np.isnan(self.values[self.order]))
+    
+    def _ranked(self, positions: np.ndarray, index_name) -> pd.DataFrame:
+        """نسخة من الصفوف المحددة بترقيم يبدأ من 1"""
+        result = self.df.iloc[positions].reset_index(drop=True)
+        result.index = result.index + 1
+        return result.rename_axis(index_name) if index_name else result
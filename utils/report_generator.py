@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 from io import BytesIO
 import streamlit as st
 from datetime import datetime
@@ -8,7 +7,7 @@ from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.chart import BarChart, PieChart, Reference
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.utils import get_column_letter
-from typing import Dict
+from typing import Dict, Optional
 import tempfile
 import os
 from reportlab.lib.pagesizes import A4
@@ -19,12 +18,17 @@ from reportlab.lib.units import inch
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from utils.grade_bands import DEFAULT_GRADE_BANDS, classification_basis
+from utils.ranking_index import RANK_COLUMNS, RankingIndex
+from utils.stats_kernel import GradeStatistics, compute_statistics
 
 class ReportGenerator:
     """مولد التقارير الشاملة"""
     
     def __init__(self):
         self.passing_grade = 50
+        self.grade_bands = DEFAULT_GRADE_BANDS  # جدول نطاقات التقدير المشترك مع DataProcessor
+        self.rank_method = 'min'  # الترتيب عند التساوي، مطابق لـ DataProcessor.rank_method
         # استخدام خطوط بسيطة تدعم العربية
         self.arabic_font = "Helvetica"
         self.arabic_font_bold = "Helvetica-Bold"
@@ -34,7 +38,10 @@ class ReportGenerator:
         # إرجاع النص كما هو - Streamlit Cloud يدعم UTF-8 افتراضياً
         return text
         
-    def generate_comprehensive_report(self, df: pd.DataFrame, stats: Dict, grade_ranges: pd.DataFrame) -> str:
+    def generate_comprehensive_report(self, df: pd.DataFrame, stats: Dict, grade_ranges: pd.DataFrame,
+                                      ranking: Optional[RankingIndex] = None,
+                                      grade_details: Optional[pd.DataFrame] = None,
+                                      grade_statistics: Optional[GradeStatistics] = None) -> str:
         """
         إنتاج تقرير شامل بصيغة Excel
         
@@ -42,10 +49,15 @@ class ReportGenerator:
             df: DataFrame يحتوي على البيانات
             stats: قاموس الإحصائيات
             grade_ranges: DataFrame نطاقات الدرجات
+            ranking: فهرس ترتيب الطلاب من DataProcessor.get_ranking_index إن كان محسوباً
+            grade_details: جدول DataProcessor.get_grade_details إن كان محسوباً
+            grade_statistics: نتيجة DataProcessor.compute_statistics إن كانت محسوبة
             
         Returns:
             مسار الملف المؤقت للتقرير
         """
+        ranking = ranking or RankingIndex.build(df, self.passing_grade)
+        
         # إنشاء ملف مؤقت
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
         temp_filename = temp_file.name
@@ -60,18 +72,19 @@ class ReportGenerator:
         
         # إنشاء الأوراق
         self._create_summary_sheet(wb, stats)
-        self._create_detailed_data_sheet(wb, df)
+        self._create_detailed_data_sheet(wb, df, ranking, grade_details)
         self._create_grade_ranges_sheet(wb, grade_ranges)
-        self._create_top_students_sheet(wb, df)
-        self._create_failing_students_sheet(wb, df)
-        self._create_statistics_sheet(wb, df, stats)
+        self._create_top_students_sheet(wb, df, ranking)
+        self._create_failing_students_sheet(wb, df, ranking)
+        self._create_statistics_sheet(wb, df, grade_statistics)
         
         # حفظ الملف
         wb.save(temp_filename)
         
         return temp_filename
     
-    def generate_pdf_report(self, df: pd.DataFrame, stats: Dict, grade_ranges: pd.DataFrame) -> str:
+    def generate_pdf_report(self, df: pd.DataFrame, stats: Dict, grade_ranges: pd.DataFrame,
+                            ranking: Optional[RankingIndex] = None) -> str:
         """
         إنتاج تقرير شامل بصيغة PDF
         
@@ -79,10 +92,13 @@ class ReportGenerator:
             df: DataFrame يحتوي على البيانات
             stats: قاموس الإحصائيات
             grade_ranges: DataFrame نطاقات الدرجات
+            ranking: فهرس ترتيب الطلاب من DataProcessor.get_ranking_index إن كان محسوباً
             
         Returns:
             مسار الملف المؤقت للتقرير
         """
+        ranking = ranking or RankingIndex.build(df, self.passing_grade)
+        
         # إنشاء ملف مؤقت
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
         temp_filename = temp_file.name
@@ -199,7 +215,7 @@ class ReportGenerator:
         
         # أفضل الطلاب
         story.append(Paragraph(self._format_arabic_text("أفضل 10 طلاب"), arabic_heading_style))
-        top_students = df.nlargest(10, 'النسبة المئوية' if 'النسبة المئوية' in df.columns else 'الدرجة')
+        top_students = ranking.top(10)
         
         top_data = [[self._format_arabic_text('المرتبة'), self._format_arabic_text('اسم الطالب'), self._format_arabic_text('الدرجة')]]
         if 'النسبة المئوية' in df.columns:
@@ -232,11 +248,8 @@ class ReportGenerator:
         story.append(top_table)
         story.append(Spacer(1, 20))
         
-        # الطلاب المتعثرين
-        if 'النسبة المئوية' in df.columns:
-            failing_students = df[df['النسبة المئوية'] < 50]
-        else:
-            failing_students = df[df['الدرجة'] < self.passing_grade]
+        # الطلاب المتعثرين (تصاعدياً من فهرس الترتيب)
+        failing_students = ranking.failing()
             
         if not failing_students.empty:
             story.append(Paragraph(self._format_arabic_text("الطلاب المتعثرين"), arabic_heading_style))
@@ -293,6 +306,55 @@ class ReportGenerator:
         
         return temp_filename
     
+    def generate_rejections_report(self, rejections: pd.DataFrame, summary: pd.DataFrame) -> str:
+        """
+        إنتاج ملف Excel بالصفوف المستبعدة أثناء التحقق من البيانات
+        
+        Args:
+            rejections: DataFrame الصفوف المرفوضة (رقم الصف، القاعدة، ...)
+            summary: DataFrame أعداد الصفوف حسب القاعدة
+            
+        Returns:
+            مسار الملف المؤقت للتقرير
+        """
+        # إنشاء ملف مؤقت
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
+        temp_filename = temp_file.name
+        temp_file.close()
+        
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "الصفوف المستبعدة"
+        ws.sheet_view.rightToLeft = True
+        
+        # ملخص القواعد
+        ws['A1'] = "ملخص الصفوف المستبعدة"
+        ws['A1'].font = Font(size=14, bold=True, color='FFFFFF')
+        ws['A1'].fill = PatternFill(start_color='D32F2F', end_color='D32F2F', fill_type='solid')
+        for r in dataframe_to_rows(summary, index=False, header=True):
+            ws.append(r)
+        
+        # تفاصيل الصفوف
+        ws.append([])
+        header_row = ws.max_row + 1
+        for r in dataframe_to_rows(rejections, index=False, header=True):
+            ws.append(r)
+        
+        for row in (2, header_row):
+            for cell in ws[row]:
+                cell.font = Font(bold=True)
+                cell.fill = PatternFill(start_color='FFCDD2', end_color='FFCDD2', fill_type='solid')
+                cell.alignment = Alignment(horizontal='center')
+        
+        # ضبط عرض الأعمدة
+        column_widths = [45, 30, 25, 15, 20, 15]
+        for col, width in enumerate(column_widths[:max(len(rejections.columns), 2)], 1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        
+        wb.save(temp_filename)
+        
+        return temp_filename
+    
     def _create_summary_sheet(self, wb: openpyxl.Workbook, stats: Dict):
         """إنشاء ورقة الملخص العام"""
         ws = wb.create_sheet("الملخص العام", 0)
@@ -348,31 +410,29 @@ class ReportGenerator:
         ws.column_dimensions['A'].width = 20
         ws.column_dimensions['B'].width = 15
         
-    def _create_detailed_data_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame):
+    def _create_detailed_data_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame, ranking: RankingIndex,
+                                    grade_details: Optional[pd.DataFrame] = None):
         """إنشاء ورقة البيانات التفصيلية"""
         ws = wb.create_sheet("البيانات التفصيلية")
         
-        # إضافة عمود التصنيف والحالة باستخدام النسبة المئوية إن وجدت
-        detailed_df = df.copy()
-        
-        if 'النسبة المئوية' in detailed_df.columns:
-            # استخدام النسبة المئوية للتصنيف والحالة
-            detailed_df['التصنيف'] = detailed_df['النسبة المئوية'].apply(self._classify_grade)
-            detailed_df['الحالة'] = detailed_df['النسبة المئوية'].apply(lambda x: 'ناجح' if x >= 50 else 'راسب')
-            detailed_df = detailed_df.sort_values('النسبة المئوية', ascending=False).reset_index(drop=True)
+        # الطلاب مرتبين مع التصنيف والحالة (النسبة المئوية إن وجدت)، من جدول التفاصيل إن كان محسوباً
+        if grade_details is not None:
+            detailed_df = grade_details
         else:
-            # استخدام الدرجة المطلقة (الطريقة التقليدية)
-            detailed_df['التصنيف'] = detailed_df['الدرجة'].apply(self._classify_grade)
-            detailed_df['الحالة'] = detailed_df['الدرجة'].apply(lambda x: 'ناجح' if x >= self.passing_grade else 'راسب')
-            detailed_df = detailed_df.sort_values('الدرجة', ascending=False).reset_index(drop=True)
-            
-        detailed_df.index = detailed_df.index + 1
+            detailed_df = ranking.ordered()
+            values, threshold, _ = classification_basis(detailed_df, self.passing_grade)
+            bands = self.grade_bands.classify(values, threshold)
+            detailed_df['التصنيف'] = bands.labels
+            detailed_df['الحالة'] = bands.status
+            rank_columns = ranking.rank_columns(self.rank_method)
+            detailed_df[list(rank_columns.columns)] = rank_columns
+        
+        # أعمدة الترتيب النسبي المتاحة (الرتبة المئينية، الدرجة المعيارية، الترتيب في الفصل والمادة)
+        rank_headers = [c for c in RANK_COLUMNS if c in detailed_df.columns]
+        column_count = 6 + len(rank_headers)
         
         # العنوان
-        if 'النسبة المئوية' in df.columns:
-            ws.merge_cells('A1:G1')
-        else:
-            ws.merge_cells('A1:F1')
+        ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=column_count)
         ws['A1'] = "البيانات التفصيلية للطلاب"
         ws['A1'].font = Font(size=16, bold=True)
         ws['A1'].alignment = Alignment(horizontal='center')
@@ -380,7 +440,7 @@ class ReportGenerator:
         ws['A1'].font = Font(size=16, bold=True, color='FFFFFF')
         
         # إضافة البيانات
-        headers = ['الترتيب', 'اسم الطالب', 'الدرجة', 'النسبة المئوية', 'التصنيف', 'الحالة']
+        headers = ['الترتيب', 'اسم الطالب', 'الدرجة', 'النسبة المئوية', 'التصنيف', 'الحالة'] + rank_headers
         for col, header in enumerate(headers, 1):
             cell = ws.cell(row=3, column=col, value=header)
             cell.font = Font(bold=True)
@@ -407,10 +467,14 @@ class ReportGenerator:
                 status_cell.fill = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid')
             else:
                 status_cell.fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
+            
+            for col, header in enumerate(rank_headers, 7):
+                value = row_data[header]
+                ws.cell(row=row_idx, column=col, value=None if pd.isna(value) else value)
         
         # تنسيق الجدول
         for row in range(3, len(detailed_df) + 4):
-            for col in range(1, 7):
+            for col in range(1, column_count + 1):
                 cell = ws.cell(row=row, column=col)
                 cell.border = Border(
                     left=Side(style='thin'),
@@ -421,7 +485,7 @@ class ReportGenerator:
                 cell.alignment = Alignment(horizontal='center')
         
         # ضبط عرض الأعمدة
-        column_widths = [10, 25, 10, 15, 15, 10]
+        column_widths = [10, 25, 10, 15, 15, 10] + [15] * len(rank_headers)
         for col, width in enumerate(column_widths, 1):
             ws.column_dimensions[get_column_letter(col)].width = width
     
@@ -465,11 +529,11 @@ class ReportGenerator:
         ws.column_dimensions['B'].width = 15
         ws.column_dimensions['C'].width = 15
     
-    def _create_top_students_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame):
+    def _create_top_students_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame, ranking: RankingIndex):
         """إنشاء ورقة الطلاب المتفوقين"""
         ws = wb.create_sheet("الطلاب المتفوقين")
         
-        top_students = df.nlargest(10, 'الدرجة').reset_index(drop=True)
+        top_students = ranking.top(10)
         
         # العنوان
         ws.merge_cells('A1:C1')
@@ -521,23 +585,20 @@ class ReportGenerator:
         if 'النسبة المئوية' in df.columns:
             ws.column_dimensions['D'].width = 15
     
-    def _create_failing_students_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame):
+    def _create_failing_students_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame, ranking: RankingIndex):
         """إنشاء ورقة الطلاب المتعثرين"""
         ws = wb.create_sheet("الطلاب المتعثرين")
         
-        # استخدام النسبة المئوية للتقييم إن وجدت
+        # المتعثرون تصاعدياً من فهرس الترتيب (النسبة المئوية للتقييم إن وجدت)
+        failing_students = ranking.failing()
         if 'النسبة المئوية' in df.columns:
-            failing_students = df[df['النسبة المئوية'] < 50].copy()
             # حساب الفجوة: 50% من الدرجة الكلية ناقص درجة الطالب
             if 'الدرجة الكلية' in df.columns:
                 failing_students['الفجوة'] = (failing_students['الدرجة الكلية'] * 0.5) - failing_students['الدرجة']
             else:
                 failing_students['الفجوة'] = 25 - failing_students['الدرجة']  # افتراض أن الدرجة من 50
-            failing_students = failing_students.sort_values('الدرجة', ascending=True).reset_index(drop=True)
         else:
-            failing_students = df[df['الدرجة'] < self.passing_grade].copy()
             failing_students['الفجوة'] = self.passing_grade - failing_students['الدرجة']
-            failing_students = failing_students.sort_values('الدرجة', ascending=True).reset_index(drop=True)
         
         # العنوان
         ws.merge_cells('A1:D1')
@@ -595,7 +656,8 @@ class ReportGenerator:
         ws.column_dimensions['C'].width = 10
         ws.column_dimensions['D'].width = 20
     
-    def _create_statistics_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame, stats: Dict):
+    def _create_statistics_sheet(self, wb: openpyxl.Workbook, df: pd.DataFrame,
+                                 grade_statistics: Optional[GradeStatistics] = None):
         """إنشاء ورقة الإحصائيات المتقدمة"""
         ws = wb.create_sheet("الإحصائيات المتقدمة")
         
@@ -607,26 +669,29 @@ class ReportGenerator:
         ws['A1'].fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
         ws['A1'].font = Font(size=16, bold=True, color='FFFFFF')
         
-        grades = df['الدرجة']
+        # جميع القيم من نتيجة نواة الإحصائيات (ترتيب واحد لعمود الدرجات)
+        result = grade_statistics or compute_statistics(
+            df, passing_grade=self.passing_grade, grade_bands=self.grade_bands)
+        grades = result.grades
         
         # الإحصائيات المتقدمة
         advanced_stats = [
             ['الإحصائية', 'القيمة'],
-            ['المتوسط الحسابي', f"{grades.mean():.3f}"],
-            ['المتوسط الهندسي', f"{grades.apply(lambda x: np.log(x) if x > 0 else 0).mean():.3f}"],
-            ['الوسيط', f"{grades.median():.3f}"],
-            ['المنوال', f"{grades.mode().iloc[0] if not grades.mode().empty else 'غير محدد'}"],
-            ['الانحراف المعياري', f"{grades.std():.3f}"],
-            ['التباين', f"{grades.var():.3f}"],
-            ['معامل الاختلاف', f"{(grades.std()/grades.mean())*100:.2f}%"],
-            ['الالتواء (Skewness)', f"{grades.skew():.3f}"],
-            ['التفلطح (Kurtosis)', f"{grades.kurtosis():.3f}"],
-            ['الربع الأول (Q1)', f"{grades.quantile(0.25):.2f}"],
-            ['الربع الثالث (Q3)', f"{grades.quantile(0.75):.2f}"],
-            ['المدى الربعي (IQR)', f"{grades.quantile(0.75) - grades.quantile(0.25):.2f}"],
-            ['المدى', f"{grades.max() - grades.min():.2f}"],
-            ['الحد الأدنى للقيم الشاذة', f"{grades.quantile(0.25) - 1.5 * (grades.quantile(0.75) - grades.quantile(0.25)):.2f}"],
-            ['الحد الأعلى للقيم الشاذة', f"{grades.quantile(0.75) + 1.5 * (grades.quantile(0.75) - grades.quantile(0.25)):.2f}"]
+            ['المتوسط الحسابي', f"{grades.mean:.3f}"],
+            ['المتوسط الهندسي', f"{grades.log_mean:.3f}"],
+            ['الوسيط', f"{grades.median:.3f}"],
+            ['المنوال', f"{grades.mode if grades.count else 'غير محدد'}"],
+            ['الانحراف المعياري', f"{grades.std:.3f}"],
+            ['التباين', f"{grades.var:.3f}"],
+            ['معامل الاختلاف', f"{(grades.std/grades.mean)*100:.2f}%" if grades.mean else "غير محدد"],
+            ['الالتواء (Skewness)', f"{grades.skew:.3f}"],
+            ['التفلطح (Kurtosis)', f"{grades.kurtosis:.3f}"],
+            ['الربع الأول (Q1)', f"{grades.q1:.2f}"],
+            ['الربع الثالث (Q3)', f"{grades.q3:.2f}"],
+            ['المدى الربعي (IQR)', f"{grades.iqr:.2f}"],
+            ['المدى', f"{grades.range:.2f}"],
+            ['الحد الأدنى للقيم الشاذة', f"{grades.lower_fence:.2f}"],
+            ['الحد الأعلى للقيم الشاذة', f"{grades.upper_fence:.2f}"]
         ]
         
         for row_idx, (stat, value) in enumerate(advanced_stats, 3):
@@ -654,18 +719,3 @@ class ReportGenerator:
         # ضبط عرض الأعمدة
         ws.column_dimensions['A'].width = 30
         ws.column_dimensions['B'].width = 15
-    
-    def _classify_grade(self, grade: float) -> str:
-        """تصنيف الدرجة حسب النطاق"""
-        if grade >= 90:
-            return 'ممتاز'
-        elif grade >= 80:
-            return 'جيد جداً'
-        elif grade >= 70:
-            return 'جيد'
-        elif grade >= 60:
-            return 'مقبول'
-        elif grade >= 50:
-            return 'ضعيف'
-        else:
-            return 'راسب'
@@ -0,0 +1,138 @@
+import dataclasses
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import GradeBands
+
+
+class ResultCache:
+    """ذاكرة مؤقتة لنتائج التحليل المشتقة (الإحصائيات، النطاقات، التفاصيل) بسياسة LRU وميزانية ذاكرة"""
+    
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_bytes: الحجم الأقصى التقريبي للنتائج في الذاكرة قبل إزالة الأقدم استخداماً
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # المفتاح ← (القيمة، الحجم)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(dataset_key: str, passing_grade: float, grade_bands: GradeBands) -> str:
+        """
+        مفتاح النتائج لمجموعة بيانات ومعاملات تحليل
+        
+        Args:
+            dataset_key: بصمة مجموعة البيانات المنظفة
+            passing_grade: درجة النجاح
+            grade_bands: جدول نطاقات التقدير
+        
+        Returns:
+            بصمة نصية
+        """
+        digest = hashlib.sha1(dataset_key.encode('utf-8'))
+        digest.update(repr((float(passing_grade), grade_bands.bands, grade_bands.upper_bound)).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get_or_compute(self, key: str, name: str, compute: Callable[..., Any], *args) -> Any:
+        """
+        استرجاع نتيجة محفوظة أو حسابها وحفظها
+        
+        Args:
+            key: مفتاح النتائج من make_key
+            name: اسم النتيجة ('statistics' أو 'ranges' أو 'details'...)
+            compute: دالة تحسب النتيجة عند عدم وجودها
+            *args: معاملات compute
+        
+        Returns:
+            نسخة من النتيجة (الجداول والقواميس تُنسخ لئلا يعدل المستدعي النسخة المحفوظة)
+        """
+        value = self.get(key, name)
+        if value is None:
+            value = compute(*args)
+            self.put(key, name, value)
+        return self._copy(value)
+    
+    def get(self, key: str, name: str) -> Optional[Any]:
+        """
+        استرجاع نتيجة محفوظة دون نسخها
+        
+        Args:
+            key: مفتاح النتائج
+            name: اسم النتيجة
+        
+        Returns:
+            النتيجة أو None إن لم توجد
+        """
+        with self._lock:
+            entry = self._entries.get((key, name))
+            if entry is None:
+                return None
+            self._entries.move_to_end((key, name))
+            return entry[0]
+    
+    def put(self, key: str, name: str, value: Any):
+        """
+        حفظ نتيجة مع إزالة الأقدم استخداماً حتى يصبح الحجم ضمن الميزانية
+        
+        النتائج الأكبر من الميزانية كلها لا تُحفظ.
+        
+        Args:
+            key: مفتاح النتائج
+            name: اسم النتيجة
+            value: النتيجة
+        """
+        size = self._estimate_size(value)
+        if size > self.max_bytes:
+            return
+        
+        with self._lock:
+            previous = self._entries.pop((key, name), None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._entries[(key, name)] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+    
+    def clear(self):
+        """مسح جميع النتائج"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+    
+    @staticmethod
+    def _copy(value: Any) -> Any:
+        """نسخة آمنة للإرجاع: الجداول تُنسخ والقواميس نسخة سطحية"""
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.copy()
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+    
+    @classmethod
+    def _estimate_size(cls, value: Any) -> int:
+        """الحجم التقريبي بالبايت (الجداول مع النصوص، المصفوفات، النصوص، محتويات القواميس والكائنات)"""
+        if isinstance(value, (str, bytes)):
+            return sys.getsizeof(value)
+        if isinstance(value, pd.DataFrame):
+            return int(value.memory_usage(index=True, deep=True).sum())
+        if isinstance(value, pd.Series):
+            return int(value.memory_usage(index=True, deep=True))
+        if isinstance(value, np.ndarray):
+            return int(value.nbytes)
+        if isinstance(value, dict):
+            return 64 + sum(cls._estimate_size(item) for item in value.values())
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return 64 + sum(cls._estimate_size(getattr(value, field.name)) for field in dataclasses.fields(value))
+        if hasattr(value, '__dict__') and not isinstance(value, type):
+            return 64 + sum(cls._estimate_size(item) for item in vars(value).values())
+        return 64
@@ -0,0 +1,233 @@
+import hashlib
+import io
+import re
+import threading
+from typing import BinaryIO, Dict, List, Optional, Union
+
+import openpyxl
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# الأعمدة المعتمدة بترتيب التصميم الموضعي (العمود 1 إلى 8)
+CANONICAL_COLUMNS = ['اسم الطالب', 'الصف', 'الفصل', 'الدرجة', 'المادة', 'الدرجة الكلية', 'المعلم', 'المدير']
+
+# الأعمدة التي يجب العثور عليها لاعتماد الربط حسب العناوين
+REQUIRED_COLUMNS = ['اسم الطالب', 'الصف', 'الفصل', 'الدرجة']
+
+# المرادفات العربية والإنجليزية لكل عمود معتمد (تُقارن بعد التطبيع). تُستبعد الكلمات العامة
+# المفردة ('name'، 'class'، 'level'، 'من'، 'max'...) لأن أول عنوان مطابق يُعتمد، فتلتقط
+# أعمدة أخرى مثل اسم المعلم أو مستوى الأداء
+HEADER_SYNONYMS = {
+    'اسم الطالب': ['اسم الطالب', 'اسم الطالبة', 'اسم الطالب/الطالبة', 'الطالب', 'الطالبة', 'الاسم',
+                   'student', 'student name', 'pupil name'],
+    'الصف': ['الصف', 'الصف الدراسي', 'المرحلة', 'grade level', 'year level', 'year group'],
+    'الفصل': ['الفصل', 'الشعبة', 'رقم الفصل', 'section', 'class section', 'homeroom'],
+    'الدرجة': ['درجة الطالب', 'الدرجة', 'درجة', 'العلامة', 'الدرجة المحصلة', 'score', 'mark', 'marks', 'points'],
+    'المادة': ['المادة', 'المادة الدراسية', 'المقرر', 'subject', 'course'],
+    'الدرجة الكلية': ['درجة التصحيح من', 'الدرجة الكلية', 'الدرجة العظمى', 'النهاية العظمى',
+                      'out of', 'max score', 'max mark', 'maximum score', 'full mark'],
+    'المعلم': ['اسم المعلم/المعلمة', 'اسم المعلم', 'اسم المعلمة', 'المعلم', 'المعلمة', 'المعلم/المعلمة',
+               'teacher', 'teacher name'],
+    'المدير': ['اسم المدير/المديرة', 'اسم المدير', 'اسم المديرة', 'المدير', 'المديرة', 'المدير/المديرة',
+               'principal', 'principal name', 'headmaster'],
+}
+
+_DIACRITICS = re.compile('[\u064B-\u0652\u0640]')  # التشكيل والتطويل
+
+
+def normalize_header(value) -> str:
+    """تطبيع عنوان العمود للمقارنة (الهمزات، التاء المربوطة، التشكيل، المسافات، حالة الأحرف)"""
+    if value is None:
+        return ''
+    text = _DIACRITICS.sub('', str(value)).strip().lower()
+    text = re.sub('[أإآ]', 'ا', text).replace('ة', 'ه').replace('ى', 'ي')
+    text = re.sub(r'[:_\-\.]+', ' ', text)
+    text = re.sub(r'\s*/\s*', '/', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+_SYNONYM_LOOKUP = {
+    normalize_header(synonym): canonical
+    for canonical, synonyms in HEADER_SYNONYMS.items()
+    for synonym in synonyms
+}
+
+
+class SchemaDetector:
+    """كاشف مخطط الأعمدة من صف العناوين وعينة من الصفوف الأولى"""
+    
+    # ربط العناوين المحسوب مسبقاً لكل بصمة عناوين (مشترك بين الجلسات)
+    _cache = {}
+    _cache_lock = threading.Lock()
+    _cache_limit = 256
+    
+    def __init__(self, sample_rows: int = 20):
+        """
+        Args:
+            sample_rows: عدد الصفوف المقروءة بعد العناوين للتحقق من الترتيب
+        """
+        self.sample_rows = sample_rows
+    
+    def detect(self, content: Union[bytes, BinaryIO], file_extension: str) -> Optional[Dict]:
+        """
+        قراءة العناوين وعينة من الصفوف وتحديد ربط الأعمدة
+        
+        Args:
+            content: محتوى الملف، أو كائن ملف ثنائي قابل للتنقل تُقرأ منه الأجزاء
+                اللازمة فقط ثم يُعاد موضع القراءة
+            file_extension: امتداد الملف
+        
+        Returns:
+            قاموس المخطط (انظر match_header) مع مفتاح 'error' عند رفض الملف،
+            أو None إذا كان الملف فارغاً
+        """
+        if isinstance(content, bytes):
+            header, sample = self._sniff(io.BytesIO(content), file_extension)
+        else:
+            position = content.tell()
+            try:
+                content.seek(0)
+                header, sample = self._sniff(content, file_extension)
+            finally:
+                content.seek(position)
+        if not header:
+            return None
+        
+        schema = self.match_header(header)
+        schema['header'] = list(header)
+        schema['error'] = None
+        
+        if len(header) < 2:
+            schema['error'] = "الملف يجب أن يحتوي على عمودين على الأقل (اسم الطالب والدرجة)"
+        elif not schema['by_header'] and len(header) < 4:
+            schema['error'] = "الملف يجب أن يحتوي على 4 أعمدة على الأقل (اسم الطالب، الصف، الفصل، درجة الطالب)"
+        elif sample:
+            schema['error'] = self._check_sample(sample, schema['layout'])
+        
+        return schema
+    
+    def match_header(self, header: List) -> Dict:
+        """
+        ربط عناوين الملف بالأعمدة المعتمدة مع التخزين المؤقت حسب بصمة العناوين
+        
+        عند العثور على جميع الأعمدة الإلزامية يُعتمد الربط حسب العناوين (بأي
+        ترتيب ومع تجاهل الأعمدة الإضافية)، وإلا يُستخدم الترتيب الموضعي.
+        
+        Args:
+            header: قائمة عناوين الأعمدة كما في الملف
+        
+        Returns:
+            قاموس: layout (موضع المصدر لكل عمود معتمد أو None)، usecols (المواضع
+            المستخدمة مرتبة)، by_header (هل تم الربط حسب العناوين)
+        """
+        normalized = tuple(normalize_header(h) for h in header)
+        fingerprint = hashlib.sha1('\x1f'.join(normalized).encode('utf-8')).hexdigest()
+        
+        with self._cache_lock:
+            cached = self._cache.get(fingerprint)
+        if cached is not None:
+            return self._copy_schema(cached)
+        
+        layout = [None] * len(CANONICAL_COLUMNS)
+        for position, name in enumerate(normalized):
+            canonical = _SYNONYM_LOOKUP.get(name)
+            if canonical is None:
+                continue
+            index = CANONICAL_COLUMNS.index(canonical)
+            if layout[index] is None:
+                layout[index] = position
+        
+        by_header = all(layout[CANONICAL_COLUMNS.index(c)] is not None for c in REQUIRED_COLUMNS)
+        if not by_header:
+            # الترتيب الموضعي: العمود n في الملف هو العمود المعتمد n
+            width = min(len(header), len(CANONICAL_COLUMNS))
+            layout = [i if i < width else None for i in range(len(CANONICAL_COLUMNS))]
+        
+        schema = {
+            'layout': layout,
+            'usecols': sorted(p for p in layout if p is not None),
+            'by_header': by_header,
+        }
+        
+        with self._cache_lock:
+            if len(self._cache) >= self._cache_limit:
+                self._cache.clear()
+            self._cache[fingerprint] = schema
+        return self._copy_schema(schema)
+    
+    @staticmethod
+    def _copy_schema(schema: Dict) -> Dict:
+        """نسخة من المخطط المخزن بقوائم مستقلة (لا يغير المستدعي ما في التخزين المؤقت)"""
+        return {**schema, 'layout': list(schema['layout']), 'usecols': list(schema['usecols'])}
+    
+    @staticmethod
+    def reduced_layout(schema: Dict) -> List[Optional[int]]:
+        """
+        مواضع الأعمدة المعتمدة داخل جدول مقروء بـ usecols (يحافظ على ترتيب الملف)
+        
+        Args:
+            schema: قاموس المخطط
+        
+        Returns:
+            قائمة المواضع داخل الجدول المختصر
+        """
+        rank = {position: i for i, position in enumerate(schema['usecols'])}
+        return [rank[p] if p is not None else None for p in schema['layout']]
+    
+    def _check_sample(self, sample: List, layout: List[Optional[int]]) -> Optional[str]:
+        """رفض الملف مبكراً إذا كان عمود الدرجات في العينة غير رقمي في معظمه"""
+        grade_position = layout[CANONICAL_COLUMNS.index('الدرجة')]
+        values = [row[grade_position] for row in sample
+                  if grade_position < len(row) and row[grade_position] not in (None, '')]
+        if len(values) < 3:
+            return None
+        
+        numeric = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').notna().sum()
+        if numeric * 2 < len(values):
+            return ("ترتيب الأعمدة غير صحيح: عمود درجة الطالب لا يحتوي على أرقام في الصفوف الأولى. "
+                    "تأكد من ترتيب الأعمدة أو من عناوينها (اسم الطالب، الصف، الفصل، درجة الطالب...)")
+        return None
+    
+    def _sniff(self, source: BinaryIO, file_extension: str):
+        """قراءة صف العناوين والصفوف الأولى فقط دون تحليل الملف كاملاً"""
+        if file_extension == 'xlsx':
+            wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+            try:
+                rows = list(wb.worksheets[0].iter_rows(max_row=self.sample_rows + 1, values_only=True))
+            finally:
+                wb.close()
+            if not rows:
+                return [], []
+            header = list(rows[0])
+            while header and header[-1] is None:
+                header.pop()
+            return header, [list(row) for row in rows[1:]]
+        
+        if file_extension == 'xls':
+            df = pd.read_excel(source, engine='xlrd', nrows=self.sample_rows)
+            return list(df.columns), df.values.tolist()
+        
+        # الصيغ العمودية: العناوين من المخطط دون قراءة البيانات (أول كتلة من csv وتذييل parquet)
+        if file_extension == 'csv':
+            if PYARROW_AVAILABLE:
+                return list(pa_csv.open_csv(source).schema.names), []
+            return list(pd.read_csv(source, nrows=0, encoding='utf-8-sig').columns), []
+        if file_extension == 'parquet' and PYARROW_AVAILABLE:
+            return list(pq.read_schema(source).names), []
+        if file_extension in ('arrow', 'feather') and PYARROW_AVAILABLE:
+            start = source.tell()
+            try:
+                schema = pa.ipc.open_file(source).schema
+            except pa.ArrowInvalid:
+                source.seek(start)
+                schema = pa.ipc.open_stream(source).schema
+            return list(schema.names), []
+        
+        return [], []
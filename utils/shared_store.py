@@ -0,0 +1,123 @@
+import os
+from typing import Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+def _string_types_mapper(arrow_type):
+    """إبقاء النصوص في مخازن Arrow (دون نسخها إلى كائنات Python)"""
+    if arrow_type in (pa.string(), pa.large_string()):
+        return pd.StringDtype('pyarrow')
+    return None
+
+
+class SharedArrowStore:
+    """مخزن Arrow IPC مربوط بالذاكرة تتشارك فيه جميع الجلسات نسخة واحدة من البيانات"""
+    
+    def __init__(self, store_dir: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        """
+        Args:
+            store_dir: مجلد ملفات Arrow المشتركة
+            max_bytes: الحجم الأقصى للمجلد قبل حذف الأقدم استخداماً
+        """
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.enabled = PYARROW_AVAILABLE
+        
+        if self.enabled:
+            os.makedirs(store_dir, exist_ok=True)
+    
+    def open(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        فتح جدول منشور دون نسخه إلى ذاكرة الجلسة
+        
+        الأعمدة الرقمية الخالية من القيم المفقودة وأعمدة النصوص تبقى مرتبطة
+        بصفحات الملف في ذاكرة نظام التشغيل، فتتشاركها جميع الجلسات والعمليات.
+        الأعمدة الناتجة للقراءة فقط؛ أي تعديل يتم على نسخة (df.copy()).
+        
+        Args:
+            key: بصمة مجموعة البيانات
+        
+        Returns:
+            DataFrame مربوط بالملف أو None إن لم يكن منشوراً
+        """
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        
+        try:
+            source = pa.memory_map(path, 'r')
+            table = pa.ipc.open_file(source).read_all()
+            os.utime(path)  # تحديث وقت الاستخدام لسياسة الإزالة
+        except (OSError, pa.ArrowInvalid):
+            return None
+        
+        return table.to_pandas(split_blocks=True, types_mapper=_string_types_mapper)
+    
+    def publish(self, key: str, df: pd.DataFrame) -> bool:
+        """
+        كتابة الجدول مرة واحدة كملف Arrow IPC غير مضغوط
+        
+        Args:
+            key: بصمة مجموعة البيانات
+            df: الجدول المنظف
+        
+        Returns:
+            True إذا أصبح الملف متاحاً للفتح
+        """
+        path = self._path(key)
+        if path is None:
+            return False
+        if os.path.exists(path):
+            return True
+        
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp_path, path)
+        except (OSError, pa.ArrowException):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        
+        self._evict()
+        return True
+    
+    def _path(self, key: str) -> Optional[str]:
+        """مسار ملف Arrow للمفتاح أو None إذا كان المخزن معطلاً"""
+        if not self.enabled:
+            return None
+        return os.path.join(self.store_dir, f"{key}.arrow")
+    
+    def _evict(self):
+        """حذف أقدم الملفات استخداماً حتى يصبح حجم المجلد ضمن الحد"""
+        # الحذف آمن مع الجلسات التي فتحت الملف مسبقاً: تبقى الصفحات مربوطة حتى إغلاقها
+        entries = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.arrow'):
+                continue
+            path = os.path.join(self.store_dir, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
@@ -0,0 +1,274 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.grade_bands import DEFAULT_GRADE_BANDS, GradeBands
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """وصف إحصائي كامل لعمود واحد محسوب من مصفوفة مرتبة مرة واحدة"""
+    
+    count: int
+    mean: float
+    std: float
+    var: float
+    min: float
+    max: float
+    q1: float
+    median: float
+    q3: float
+    mode: float
+    skew: float
+    kurtosis: float
+    log_mean: float
+    sorted_values: np.ndarray
+    
+    @property
+    def iqr(self) -> float:
+        """المدى الربعي"""
+        return self.q3 - self.q1
+    
+    @property
+    def range(self) -> float:
+        """المدى"""
+        return self.max - self.min
+    
+    @property
+    def lower_fence(self) -> float:
+        """الحد الأدنى للقيم الشاذة (Q1 - 1.5 IQR)"""
+        return self.q1 - 1.5 * self.iqr
+    
+    @property
+    def upper_fence(self) -> float:
+        """الحد الأعلى للقيم الشاذة (Q3 + 1.5 IQR)"""
+        return self.q3 + 1.5 * self.iqr
+    
+    def whiskers(self) -> Tuple[float, float]:
+        """نهايتا الشاربين: أبعد قيمتين داخل حدي القيم الشاذة"""
+        low = np.searchsorted(self.sorted_values, self.lower_fence, side='left')
+        high = np.searchsorted(self.sorted_values, self.upper_fence, side='right')
+        if high <= low:
+            return self.min, self.max
+        return self.sorted_values[low], self.sorted_values[high - 1]
+    
+    def outliers(self) -> np.ndarray:
+        """القيم خارج حدي القيم الشاذة مرتبة تصاعدياً (بحث ثنائي في المصفوفة المرتبة)"""
+        low = np.searchsorted(self.sorted_values, self.lower_fence, side='left')
+        high = np.searchsorted(self.sorted_values, self.upper_fence, side='right')
+        return np.concatenate((self.sorted_values[:low], self.sorted_values[high:]))
+    
+    def quantile(self, q: float) -> float:
+        """الكمية q بالاستيفاء الخطي (نفس طريقة pandas الافتراضية)"""
+        return _sorted_quantile(self.sorted_values, q)
+    
+    def count_at_least(self, threshold: float) -> int:
+        """عدد القيم الأكبر من أو تساوي threshold"""
+        return int(self.count - np.searchsorted(self.sorted_values, threshold, side='left'))
+
+
+@dataclass(frozen=True)
+class GradeStatistics:
+    """نتيجة نواة الإحصائيات لمجموعة بيانات منظفة"""
+    
+    grades: Distribution
+    percentages: Optional[Distribution]
+    total_mean: Optional[float]
+    total_min: Optional[float]
+    total_max: Optional[float]
+    passing_count: int        # حسب النسبة المئوية إن وجدت وإلا حسب الدرجة
+    grade_passing_count: int  # حسب الدرجة ودرجة النجاح دائماً
+    band_counts: Tuple[int, ...]  # من النطاق الأعلى إلى الأدنى
+    
+    @property
+    def count(self) -> int:
+        """عدد الطلاب"""
+        return self.grades.count
+    
+    @property
+    def failing_count(self) -> int:
+        """عدد الراسبين"""
+        return self.count - self.passing_count
+    
+    @property
+    def pass_rate(self) -> float:
+        """نسبة النجاح %"""
+        return (self.passing_count / self.count) * 100 if self.count else 0.0
+    
+    def to_stats_dict(self) -> Dict:
+        """
+        الإحصائيات بالشكل الذي تعيده DataProcessor.calculate_basic_stats
+        
+        Returns:
+            قاموس يحتوي على الإحصائيات
+        """
+        grades = self.grades
+        stats = {
+            'count': grades.count,
+            'mean': grades.mean,
+            'median': grades.median,
+            'std': grades.std,
+            'min': grades.min,
+            'max': grades.max,
+            'q1': grades.q1,
+            'q3': grades.q3,
+        }
+        
+        if self.total_mean is not None:
+            stats['total_mean'] = self.total_mean
+            stats['total_max'] = self.total_max
+            stats['total_min'] = self.total_min
+        
+        if self.percentages is not None:
+            stats['percentage_mean'] = self.percentages.mean
+            stats['percentage_median'] = self.percentages.median
+            stats['percentage_std'] = self.percentages.std
+        
+        stats['pass_rate'] = self.pass_rate
+        stats['fail_rate'] = 100 - stats['pass_rate']
+        stats['passing_count'] = self.passing_count
+        stats['failing_count'] = self.failing_count
+        
+        return stats
+
+
+def compute_statistics(df: pd.DataFrame, passing_grade: float = 50, passing_percentage: float = 50,
+                       grade_bands: GradeBands = DEFAULT_GRADE_BANDS) -> GradeStatistics:
+    """
+    حساب جميع الإحصائيات من ترتيب واحد لعمود الدرجات وآخر للنسب المئوية
+    
+    Args:
+        df: DataFrame منظف
+        passing_grade: درجة النجاح (عند غياب النسبة المئوية)
+        passing_percentage: نسبة النجاح %
+        grade_bands: جدول نطاقات التقدير
+    
+    Returns:
+        كائن GradeStatistics
+    """
+    grades = describe(df['الدرجة'])
+    
+    percentages = None
+    if 'النسبة المئوية' in df.columns:
+        percentages = describe(df['النسبة المئوية'])
+    
+    total_mean = total_min = total_max = None
+    if 'الدرجة الكلية' in df.columns:
+        totals = _values(df['الدرجة الكلية'])
+        if len(totals):
+            total_mean, total_min, total_max = float(totals.mean()), totals.min(), totals.max()
+        else:
+            total_mean = total_min = total_max = np.nan
+    
+    # النطاقات ومعيار النجاح على النسبة المئوية إن وجدت
+    basis = percentages if percentages is not None else grades
+    threshold = passing_percentage if percentages is not None else passing_grade
+    passing_count = basis.count_at_least(threshold)
+    
+    return GradeStatistics(
+        grades=grades,
+        percentages=percentages,
+        total_mean=total_mean,
+        total_min=total_min,
+        total_max=total_max,
+        passing_count=passing_count,
+        grade_passing_count=grades.count_at_least(passing_grade),
+        band_counts=grade_bands.count_sorted(basis.sorted_values),
+    )
+
+
+def describe(series: pd.Series) -> Distribution:
+    """
+    وصف عمود رقمي بعد ترتيبه مرة واحدة
+    
+    المتوسط والعزوم من تمريرة واحدة على المصفوفة، والكميات والمنوال وأصغر وأكبر
+    قيمة من المصفوفة المرتبة مباشرة. الالتواء والتفلطح بنفس صيغ pandas المصححة.
+    
+    Args:
+        series: عمود رقمي (تُتجاهل القيم المفقودة)
+    
+    Returns:
+        كائن Distribution
+    """
+    values = np.sort(_values(series), kind='stable')
+    n = len(values)
+    
+    if n == 0:
+        nan = float('nan')
+        return Distribution(0, nan, nan, nan, nan, nan, nan, nan, nan, nan, nan, nan, nan, values)
+    
+    x = values.astype(np.float64, copy=False)
+    mean = float(x.mean())
+    deviations = x - mean
+    d2 = deviations * deviations
+    m2 = float(d2.sum())
+    m3 = float((d2 * deviations).sum())
+    m4 = float((d2 * d2).sum())
+    
+    var = m2 / (n - 1) if n > 1 else float('nan')
+    
+    if n < 3:
+        skew = float('nan')
+    elif m2 == 0:
+        skew = 0.0
+    else:
+        skew = (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+    
+    if n < 4:
+        kurtosis = float('nan')
+    elif m2 == 0:
+        kurtosis = 0.0
+    else:
+        adjustment = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        kurtosis = (n * (n + 1) * (n - 1) * m4) / ((n - 2) * (n - 3) * m2 ** 2) - adjustment
+    
+    # المنوال: أطول تتابع لقيم متساوية في المصفوفة المرتبة (الأصغر عند التساوي)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    run_lengths = np.diff(np.append(starts, n))
+    mode = values[starts[np.argmax(run_lengths)]]
+    
+    positive = x > 0
+    log_mean = float(np.where(positive, np.log(np.where(positive, x, 1.0)), 0.0).mean())
+    
+    return Distribution(
+        count=n,
+        mean=mean,
+        std=float(np.sqrt(var)),
+        var=var,
+        min=values[0],
+        max=values[-1],
+        q1=_sorted_quantile(values, 0.25),
+        median=_sorted_quantile(values, 0.5),
+        q3=_sorted_quantile(values, 0.75),
+        mode=mode,
+        skew=float(skew),
+        kurtosis=float(kurtosis),
+        log_mean=log_mean,
+        sorted_values=values,
+    )
+
+
+def _values(series: pd.Series) -> np.ndarray:
+    """قيم العمود كمصفوفة NumPy دون القيم المفقودة (مع الحفاظ على نوع الأعداد الصحيحة)"""
+    values = series.to_numpy()
+    if values.dtype.kind == 'f':
+        return values[~np.isnan(values)]
+    if values.dtype.kind in 'iu':
+        return values
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    return values[~np.isnan(values)]
+
+
+def _sorted_quantile(sorted_values: np.ndarray, q: float) -> float:
+    """الكمية q من مصفوفة مرتبة بالاستيفاء الخطي"""
+    n = len(sorted_values)
+    if n == 0:
+        return float('nan')
+    position = q * (n - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, n - 1)
+    fraction = position - lower
+    low_value = float(sorted_values[lower])
+    return low_value + (float(sorted_values[upper]) - low_value) * fraction